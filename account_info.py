@@ -4,24 +4,86 @@
 Account Info và Notification Functions
 """
 
-from binance.client import Client
 from binance.exceptions import BinanceAPIException, BinanceOrderException
 import trading_config
+from client_registry import get_client
 import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import time
+from notification_dispatcher import notification_dispatcher
+from metrics import cycle_metrics
 
-def get_account_info():
-    """Lấy thông tin tài khoản chi tiết"""
+JPY_PER_USD = 150  # Tỷ giá quy đổi JPY -> USD dùng cho tổng giá trị tài khoản
+FIAT_CURRENCIES = ['USDT', 'JPY', 'USD', 'EUR']
+
+def value_portfolio(balance, prices):
+    """
+    Định giá tài khoản (USD) bằng 1 bảng giá tất cả symbol, duyệt số dư 1 lần
+    
+    Args:
+        balance: Số dư format ccxt {'free': {}, 'used': {}, 'total': {}}
+        prices: dict symbol -> giá (VD: {'ETHUSDT': 2500.0, 'ETHJPY': 375000.0})
+    
+    Returns:
+        dict: fiat_value, crypto_value, total_value, assets (chi tiết từng coin), unpriced
+    """
+    total_fiat_value = 0
+    total_crypto_value = 0
+    assets = {}
+    unpriced = []
+    
+    for asset, amount in balance['total'].items():
+        if amount <= 0:
+            continue
+        
+        if asset in FIAT_CURRENCIES:
+            if asset == 'USDT':
+                total_fiat_value += amount
+            elif asset == 'JPY':
+                total_fiat_value += amount / JPY_PER_USD  # Convert to USD
+            continue
+        
+        # Ưu tiên giá USDT, không có thì dùng giá JPY
+        if prices.get(f"{asset}USDT"):
+            price_usd = prices[f"{asset}USDT"]
+        elif prices.get(f"{asset}JPY"):
+            price_usd = prices[f"{asset}JPY"] / JPY_PER_USD
+        else:
+            unpriced.append(asset)
+            continue
+        
+        value_usd = amount * price_usd
+        total_crypto_value += value_usd
+        assets[asset] = {
+            'free': balance['free'].get(asset, 0),
+            'used': balance['used'].get(asset, 0),
+            'total': amount,
+            'price_usd': price_usd,
+            'value_usd': value_usd
+        }
+    
+    return {
+        'fiat_value': total_fiat_value,
+        'crypto_value': total_crypto_value,
+        'total_value': total_fiat_value + total_crypto_value,
+        'assets': assets,
+        'unpriced': unpriced
+    }
+
+def get_account_info(binance=None, account=None):
+    """
+    Lấy thông tin tài khoản chi tiết
+    
+    Args:
+        binance: Client (None thì dùng Client dùng chung theo trading_config)
+        account: Kết quả get_account có sẵn (VD: snapshot số dư của chu kỳ) - None thì tự gọi
+    """
     try:
-        binance = Client(
-            api_key=trading_config.BINANCE_CONFIG['api_key'],
-            api_secret=trading_config.BINANCE_CONFIG['api_secret'],
-            testnet=trading_config.BINANCE_CONFIG['testnet']
-        )
+        if binance is None:
+            binance = get_client()
         
         # Lấy account info
-        account = binance.get_account()
+        if account is None:
+            account = binance.get_account()
         balances = account['balances']
         
         # Chuyển đổi format để tương thích với code cũ
@@ -38,10 +100,8 @@ def get_account_info():
         
         # Hiển thị số dư tiền tệ
         print("  SỐ DƯ TIỀN TỆ:")
-        fiat_currencies = ['USDT', 'JPY', 'USD', 'EUR']
-        total_fiat_value = 0
         
-        for currency in fiat_currencies:
+        for currency in FIAT_CURRENCIES:
             free_balance = balance['free'].get(currency, 0)
             used_balance = balance['used'].get(currency, 0)
             total_balance = balance['total'].get(currency, 0)
@@ -51,34 +111,16 @@ def get_account_info():
                 print(f"     • Khả dụng: {free_balance:,.2f}")
                 print(f"     • Đang sử dụng: {used_balance:,.2f}")
                 print(f"     • Tổng cộng: {total_balance:,.2f}")
-                
-                if currency == 'USDT':
-                    total_fiat_value += total_balance
-                elif currency == 'JPY':
-                    total_fiat_value += total_balance / 150  # Convert to USD
-        
-        # Tính tổng giá trị crypto (không in chi tiết từng coin)
-        total_crypto_value = 0
-        for symbol, amounts in balance['total'].items():
-            if amounts > 0 and symbol not in fiat_currencies:
-                try:
-                    # Thử lấy giá USDT trước
-                    ticker = binance.get_symbol_ticker(symbol=f"{symbol}USDT")
-                    current_price = float(ticker['price'])
-                    value_usd = amounts * current_price
-                    total_crypto_value += value_usd
-                except:
-                    try:
-                        # Nếu không có USDT, thử JPY
-                        ticker = binance.get_symbol_ticker(symbol=f"{symbol}JPY")
-                        current_price = float(ticker['price'])
-                        value_usd = amounts * current_price / 150
-                        total_crypto_value += value_usd
-                    except:
-                        pass
-        
-        # Tổng tài khoản
-        total_account_value = total_fiat_value + total_crypto_value
+        
+        # Tính tổng giá trị crypto từ 1 lần lấy giá tất cả symbol (không in chi tiết từng coin)
+        prices = {}
+        if any(amount > 0 and asset not in FIAT_CURRENCIES for asset, amount in balance['total'].items()):
+            try:
+                prices = {t['symbol']: float(t['price']) for t in binance.get_all_tickers()}
+            except Exception as e:
+                print(f"   ⚠️ Không thể lấy bảng giá: {e}")
+        valuation = value_portfolio(balance, prices)
+        valuation['balance'] = balance
         
         # Kiểm tra orders đang mở
         print("\n  ORDERS ĐANG MỞ:")
@@ -97,12 +139,7 @@ def get_account_info():
         
         print("=" * 80)
         
-        return {
-            'fiat_value': total_fiat_value,
-            'crypto_value': total_crypto_value,
-            'total_value': total_account_value,
-            # Không trả về danh sách crypto_positions nữa
-        }
+        return valuation
         
     except Exception as e:
         print(f"❌ Lỗi lấy thông tin tài khoản: {e}")
@@ -136,6 +173,7 @@ def test_email_notification():
         
         return False
 
+@cycle_metrics.timed('email')
 def send_trading_notification(message, urgent=False):
     """Gửi thông báo trading"""
     try:
@@ -146,14 +184,10 @@ def send_trading_notification(message, urgent=False):
             return
         
         # Tạo email
-        msg = MIMEMultipart()
-        msg['From'] = config['email_sender']
-        msg['To'] = config['email_recipient']
-        
         if urgent:
-            msg['Subject'] = "🚨 URGENT - Auto Trading Alert"
+            subject = "🚨 URGENT - Auto Trading Alert"
         else:
-            msg['Subject'] = "📊 Auto Trading Update"
+            subject = "📊 Auto Trading Update"
         
         body = f"""
 🤖 AUTO TRADING NOTIFICATION
@@ -161,29 +195,22 @@ def send_trading_notification(message, urgent=False):
 {message}
 
 📊 Platform: Binance Testnet
-⏰ Thời gian: 2025-07-27 18:51
+⏰ Thời gian: {time.strftime('%Y-%m-%d %H:%M')}
 
 --
 Auto Trading System
         """
         
-        msg.attach(MIMEText(body, 'plain', 'utf-8'))
-        
-        # Gửi email
-        server = smtplib.SMTP(config['email_smtp_server'], config['email_smtp_port'])
-        server.starttls()
-        server.login(config['email_sender'], config['email_password'])
+        # Gửi ở thread nền - không chặn thread giao dịch
+        notification_dispatcher.submit(subject, body, urgent=urgent)
         
-        text = msg.as_string()
-        server.sendmail(config['email_sender'], config['email_recipient'], text)
-        server.quit()
-        
-        print(f"📧 Đã gửi email: {message[:50]}...")
+        print(f"📧 Đã xếp hàng email: {message[:50]}...")
         
     except Exception as e:
         print(f"⚠️ Lỗi gửi notification: {e}")
         print(f"📱 Fallback: {message}")
 
+@cycle_metrics.timed('email')
 def send_buy_success_notification(order_details):
     """Gửi email thông báo mua thành công"""
     try:
@@ -194,10 +221,7 @@ def send_buy_success_notification(order_details):
             return
         
         # Tạo email
-        msg = MIMEMultipart()
-        msg['From'] = config['email_sender']
-        msg['To'] = config['email_recipient']
-        msg['Subject'] = f"✅ MUA THÀNH CÔNG - {order_details['symbol']}"
+        subject = f"✅ MUA THÀNH CÔNG - {order_details['symbol']}"
         
         body = f"""
 ✅ LỆNH MUA THÀNH CÔNG
@@ -225,22 +249,15 @@ def send_buy_success_notification(order_details):
 Auto Trading System
         """
         
-        msg.attach(MIMEText(body, 'plain', 'utf-8'))
-        
-        # Gửi email
-        server = smtplib.SMTP(config['email_smtp_server'], config['email_smtp_port'])
-        server.starttls()
-        server.login(config['email_sender'], config['email_password'])
+        # Gửi ở thread nền - không chặn thread giao dịch
+        notification_dispatcher.submit(subject, body)
         
-        text = msg.as_string()
-        server.sendmail(config['email_sender'], config['email_recipient'], text)
-        server.quit()
-        
-        print(f"📧 Đã gửi email mua thành công: {order_details['symbol']}")
+        print(f"📧 Đã xếp hàng email mua thành công: {order_details['symbol']}")
         
     except Exception as e:
         print(f"⚠️ Lỗi gửi email mua thành công: {e}")
 
+@cycle_metrics.timed('email')
 def send_sell_order_placed_notification(order_details):
     """Gửi email thông báo đặt lệnh bán thành công"""
     try:
@@ -251,10 +268,7 @@ def send_sell_order_placed_notification(order_details):
             return
         
         # Tạo email
-        msg = MIMEMultipart()
-        msg['From'] = config['email_sender']
-        msg['To'] = config['email_recipient']
-        msg['Subject'] = f"🎯 ĐẶT LỆNH BÁN - {order_details['symbol']}"
+        subject = f"🎯 ĐẶT LỆNH BÁN - {order_details['symbol']}"
         
         body = f"""
 🎯 LỆNH BÁN ĐÃ ĐẶT THÀNH CÔNG
@@ -287,22 +301,15 @@ def send_sell_order_placed_notification(order_details):
 Auto Trading System
         """
         
-        msg.attach(MIMEText(body, 'plain', 'utf-8'))
-        
-        # Gửi email
-        server = smtplib.SMTP(config['email_smtp_server'], config['email_smtp_port'])
-        server.starttls()
-        server.login(config['email_sender'], config['email_password'])
-        
-        text = msg.as_string()
-        server.sendmail(config['email_sender'], config['email_recipient'], text)
-        server.quit()
+        # Gửi ở thread nền - không chặn thread giao dịch
+        notification_dispatcher.submit(subject, body)
         
-        print(f"📧 Đã gửi email đặt lệnh bán: {order_details['symbol']}")
+        print(f"📧 Đã xếp hàng email đặt lệnh bán: {order_details['symbol']}")
         
     except Exception as e:
         print(f"⚠️ Lỗi gửi email đặt lệnh bán: {e}")
 
+@cycle_metrics.timed('email')
 def send_sell_success_notification(order_details):
     """Gửi email thông báo bán thành công"""
     try:
@@ -313,10 +320,7 @@ def send_sell_success_notification(order_details):
             return
         
         # Tạo email
-        msg = MIMEMultipart()
-        msg['From'] = config['email_sender']
-        msg['To'] = config['email_recipient']
-        msg['Subject'] = f"  BÁN THÀNH CÔNG - {order_details['symbol']}"
+        subject = f"  BÁN THÀNH CÔNG - {order_details['symbol']}"
         
         profit_emoji = "📈" if order_details.get('profit_amount', 0) > 0 else "📉"
         
@@ -349,18 +353,10 @@ def send_sell_success_notification(order_details):
 Auto Trading System
         """
         
-        msg.attach(MIMEText(body, 'plain', 'utf-8'))
-        
-        # Gửi email
-        server = smtplib.SMTP(config['email_smtp_server'], config['email_smtp_port'])
-        server.starttls()
-        server.login(config['email_sender'], config['email_password'])
-        
-        text = msg.as_string()
-        server.sendmail(config['email_sender'], config['email_recipient'], text)
-        server.quit()
+        # Gửi ở thread nền - không chặn thread giao dịch
+        notification_dispatcher.submit(subject, body)
         
-        print(f"📧 Đã gửi email bán thành công: {order_details['symbol']}")
+        print(f"📧 Đã xếp hàng email bán thành công: {order_details['symbol']}")
         
     except Exception as e:
         print(f"⚠️ Lỗi gửi email bán thành công: {e}")
@@ -3,15 +3,10 @@ from binance.client import Client
 from binance.exceptions import BinanceAPIException, BinanceOrderException
 import pandas as pd
 import numpy as np
-from ta.trend import SMAIndicator, MACD, EMAIndicator
-from ta.momentum import RSIIndicator, StochasticOscillator
-from ta.volatility import BollingerBands
-from sklearn.preprocessing import MinMaxScaler
 # import tensorflow as tf  # Comment out for production - not essential
 # from tensorflow.keras.models import Sequential
 # from tensorflow.keras.layers import LSTM, Dense, Dropout
 # import vectorbt as vbt  # Comment out for production - not essential
-from itertools import product
 import time
 import warnings
 import glob
@@ -23,6 +18,24 @@ import trading_config
 # from trading_functions_fixed import place_buy_order_with_sl_tp_fixed  # File not found - commented out
 from account_info import get_account_info, test_email_notification, send_trading_notification
 from position_manager import position_manager
+from candle_store import CandleStore
+from market_scanner import MarketScanner
+from market_stream import MarketStream, MarketDataCache, BinanceStreamFeed
+from stop_loss_engine import StopLossEngine
+from exchange_metadata import ExchangeMetadataCache
+from balance_snapshot import balance_snapshot
+from client_registry import get_client, client_registry, LazyClient
+from notification_dispatcher import notification_dispatcher
+from event_logger import event_logger
+from metrics import cycle_metrics
+from rate_limiter import PRIORITY_CRITICAL
+from order_journal import OrderJournal
+from indicators import get_indicator_frame
+from backtester import optimize_parameters
+from windowing import MinMaxTransform, sliding_windows
+from forecaster import ReturnForecaster, forecast_next_close
+from model_cache import ModelCache, grid_hash
+from light_tasks import ID_TYPE_ORDER, ID_TYPE_ORDER_LIST, order_id_type, get_order_status, fetch_order_statuses, find_manual_stop_loss_triggers, report_manual_stop_loss_trigger
 import threading
 import json
 import json
@@ -36,25 +49,51 @@ warnings.filterwarnings('ignore')
 # tf.autograph.set_verbosity(0)  # commented for production
 
 # Khởi tạo Binance API - TESTNET cho test an toàn
-try:
-    binance = Client(
-        api_key=trading_config.BINANCE_CONFIG['api_key'],
-        api_secret=trading_config.BINANCE_CONFIG['api_secret'],
-        testnet=trading_config.BINANCE_CONFIG['testnet']
-    )
-    print("✅ Đã kết nối Binance API thành công")
-except Exception as e:
-    print(f"❌ Lỗi kết nối Binance API: {e}")
-    print("💡 Vui lòng kiểm tra cấu hình trong trading_config.py")
-    binance = None
+def connect_binance():
+    """Tạo Client dùng chung - gọi ở lần dùng API đầu tiên, không phải khi import module"""
+    try:
+        client = get_client()
+        print("✅ Đã kết nối Binance API thành công")
+        return client
+    except Exception as e:
+        print(f"❌ Lỗi kết nối Binance API: {e}")
+        print("💡 Vui lòng kiểm tra cấu hình trong trading_config.py")
+        raise
+
+binance = LazyClient(connect_binance)
 
 # Cấu hình trading từ file config
 TRADING_CONFIG = trading_config.TRADING_CONFIG
 
+# Candle store cục bộ - tránh tải lại toàn bộ klines mỗi chu kỳ
+CANDLE_STORE = CandleStore(config.CANDLE_STORE_DIR, config.CANDLE_STORE_MAX_CANDLES) if config.CANDLE_STORE_ENABLED else None
+
+# Scanner tải dữ liệu song song cho nhiều symbol
+MARKET_SCANNER = MarketScanner(config.SCANNER_MAX_WORKERS)
+
+# WebSocket market data (khởi động bằng start_market_stream) - None thì dùng REST
+MARKET_STREAM = None
+
+# Bộ lọc symbol (tick/step size, min notional, OCO) - tải 1 lần, làm mới theo TTL
+EXCHANGE_METADATA = ExchangeMetadataCache(config.EXCHANGE_METADATA_TTL)
+
+# Kết quả tối ưu tham số theo symbol - quét lại trong cùng 1 nến không tối ưu lại
+MODEL_CACHE = ModelCache(config.MODEL_CACHE_SIZE, config.MODEL_CACHE_FILE)
+
+# SL engine - kích hoạt stop loss theo từng tick giá (khởi động bằng start_stop_loss_engine)
+STOP_LOSS_ENGINE = StopLossEngine(
+    lambda order_id, symbol, price: execute_stop_loss(order_id, symbol, price),
+    price_fetcher=lambda symbols: fetch_stop_loss_prices(symbols),
+    poll_interval=config.STOP_LOSS_POLL_INTERVAL
+)
+
 # Global dictionary để lưu trữ các lệnh cần theo dõi
 ACTIVE_ORDERS = {}
+ACTIVE_ORDERS_FILE = config.ACTIVE_ORDERS_FILE
+ORDER_JOURNAL = None  # Snapshot + journal append-only của ACTIVE_ORDERS (tạo bằng get_order_journal)
 ORDER_MONITOR_THREAD = None
 MONITOR_RUNNING = False
+ORDER_MONITORING_INITIALIZED = False  # Đã đọc file lệnh lần đầu (initialize_order_monitoring)
 
 # Biến kiểm soát auto-retrading để tránh vòng lặp vô hạn
 AUTO_RETRADING_ENABLED = True
@@ -75,34 +114,9 @@ def cleanup_old_logs():
             return
         
         log_file = TRADING_CONFIG.get('log_file', 'trading_log.txt')
-        max_size_mb = TRADING_CONFIG.get('max_log_size_mb', 50)
         retention_days = TRADING_CONFIG.get('log_retention_days', 7)
         
-        # Kiểm tra kích thước file
-        if os.path.exists(log_file):
-            file_size_mb = os.path.getsize(log_file) / (1024 * 1024)
-            
-            if file_size_mb > max_size_mb:
-                # Backup log cũ và tạo file mới
-                timestamp = time.strftime('%Y%m%d_%H%M%S')
-                backup_file = f"{log_file}.backup_{timestamp}"
-                
-                # Đọc 1000 dòng cuối để giữ lại
-                with open(log_file, 'r', encoding='utf-8') as f:
-                    lines = f.readlines()
-                
-                # Backup toàn bộ file cũ
-                os.rename(log_file, backup_file)
-                
-                # Tạo file mới với 1000 dòng cuối
-                with open(log_file, 'w', encoding='utf-8') as f:
-                    if len(lines) > 1000:
-                        f.writelines(lines[-1000:])
-                    else:
-                        f.writelines(lines)
-                
-                print(f"📂 Log cleanup: Backup {backup_file}, giữ lại {min(len(lines), 1000)} dòng gần nhất")
-        
+        # Xoay vòng theo kích thước (max_log_size_mb) do event_logger làm khi ghi - ở đây chỉ xoá backup cũ
         # Xóa backup files cũ hơn retention_days
         backup_pattern = f"{log_file}.backup_*"
         current_time = time.time()
@@ -186,12 +200,13 @@ def handle_system_error(error, function_name, max_retries=None):
         print(f"🚨 {error_msg}")
         
         # Log chi tiết
-        if TRADING_CONFIG['log_trades']:
-            log_file = TRADING_CONFIG.get('log_file', 'trading_log.txt')
-            with open(log_file, 'a', encoding='utf-8') as f:
-                timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
-                f.write(f"[{timestamp}] 🚨 SYSTEM ERROR in {function_name}: {str(error)}\n")
-                f.write(f"[{timestamp}] Error count: {SYSTEM_ERROR_COUNT}, Retries available: {max_retries - (SYSTEM_ERROR_COUNT % max_retries)}\n")
+        event_logger.log(
+            'system_error',
+            function=function_name,
+            error=str(error),
+            error_count=SYSTEM_ERROR_COUNT,
+            retries_available=max_retries - (SYSTEM_ERROR_COUNT % max_retries)
+        )
         
         # Gửi email nếu lỗi nghiêm trọng hoặc lặp lại nhiều
         if SYSTEM_ERROR_COUNT % 5 == 1 or SYSTEM_ERROR_COUNT > 10:
@@ -312,6 +327,10 @@ def get_current_jpy_price(symbol):
     try:
         # Chỉ sử dụng cặp JPY thực sự
         binance_symbol = symbol.replace('/', '')  # ADA/JPY -> ADAJPY
+        if MARKET_STREAM is not None:
+            stream_price = MARKET_STREAM.get_price(binance_symbol)
+            if stream_price:
+                return stream_price
         ticker = binance.get_symbol_ticker(symbol=binance_symbol)
         return float(ticker['price'])
     except Exception as e:
@@ -319,6 +338,7 @@ def get_current_jpy_price(symbol):
         return None
 
 # Hàm gửi thông báo
+@cycle_metrics.timed()
 def send_notification(message, urgent=False):
     """Gửi thông báo về trading với email đầy đủ"""
     try:
@@ -332,15 +352,8 @@ def send_notification(message, urgent=False):
         except Exception as email_error:
             pass  # Silent email error
         
-        # Log to file (silent)
-        if TRADING_CONFIG['log_trades']:
-            log_file = TRADING_CONFIG.get('log_file', 'trading_log.txt')
-            try:
-                with open(log_file, 'a', encoding='utf-8') as f:
-                    timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
-                    f.write(f"[{timestamp}] {message}\n")
-            except Exception as log_error:
-                pass  # Silent log error
+        # Log to file (thread nền)
+        event_logger.log('notification', message=message, urgent=urgent)
                 
     except Exception as e:
         print(f"⚠️ Lỗi gửi thông báo: {e}")
@@ -462,41 +475,28 @@ def show_positions_summary():
 
 # Hàm kiểm tra trạng thái lệnh
 def check_order_status(order_id, symbol):
-    """Kiểm tra trạng thái của một lệnh cụ thể"""
-    try:
-        # Chuyển đổi symbol format từ ADA/JPY thành ADAJPY
-        binance_symbol = symbol.replace('/', '')
-        order = binance.get_order(symbol=binance_symbol, orderId=order_id)
-        
-        # Chuyển đổi status của python-binance sang format tương thích
-        status_mapping = {
-            'NEW': 'open',
-            'PARTIALLY_FILLED': 'open', 
-            'FILLED': 'closed',
-            'CANCELED': 'canceled',
-            'PENDING_CANCEL': 'open',
-            'REJECTED': 'rejected',
-            'EXPIRED': 'expired'
-        }
-        
-        return {
-            'id': str(order['orderId']),
-            'symbol': symbol,  # Trả về format ban đầu ADA/JPY
-            'status': status_mapping.get(order['status'], order['status'].lower()),
-            'type': order['type'].lower(),
-            'side': order['side'].lower(),
-            'amount': float(order['origQty']),
-            'filled': float(order['executedQty']),
-            'remaining': float(order['origQty']) - float(order['executedQty']),
-            'price': float(order['price']) if order['price'] != '0.00000000' else None,
-            'average': float(order['price']) if order['executedQty'] != '0.00000000' else None,
-            'cost': float(order['cummulativeQuoteQty']),
-            'timestamp': order['time'],
-            'datetime': pd.to_datetime(order['time'], unit='ms').strftime('%Y-%m-%d %H:%M:%S')
-        }
-    except Exception as e:
-        print(f"⚠️ Lỗi kiểm tra order {order_id}: {e}")
-        return None
+    """Kiểm tra trạng thái của một lệnh cụ thể (lệnh OCO theo dõi bằng orderListId)"""
+    return get_order_status(binance, order_id, symbol, order_id_type(ACTIVE_ORDERS.get(str(order_id), {})))
+
+# Hàm đối chiếu trạng thái tất cả lệnh đang theo dõi theo lô
+def reconcile_order_statuses(order_ids=None):
+    """
+    Lấy trạng thái các lệnh trong ACTIVE_ORDERS: 1 lần get_open_orders cho mỗi symbol,
+    chỉ gọi get_order riêng cho các lệnh không còn trong danh sách lệnh mở (đã khớp/huỷ)
+
+    Returns:
+        dict: order_id -> kết quả giống check_order_status (None nếu không kiểm tra được)
+    """
+    tracked = {order_id: ACTIVE_ORDERS[order_id] for order_id in (list(ACTIVE_ORDERS) if order_ids is None else order_ids) if order_id in ACTIVE_ORDERS}
+    statuses = fetch_order_statuses(binance, tracked)
+    
+    # Lệnh khớp thêm/đóng làm thay đổi số dư - snapshot cũ không còn đúng
+    for order_id, status in statuses.items():
+        if status and (status['status'] != 'open' or status['filled'] > tracked[order_id].get('last_filled', 0)):
+            balance_snapshot.invalidate()
+            break
+    
+    return statuses
 
 # Hàm theo dõi tất cả lệnh đang hoạt động
 @system_error_handler("monitor_active_orders", critical=True)
@@ -522,10 +522,13 @@ def monitor_active_orders():
             # Tạo copy của dictionary để tránh lỗi "dictionary changed size during iteration"
             active_orders_copy = dict(ACTIVE_ORDERS)
             
+            # Đối chiếu trạng thái theo lô (1 request lệnh mở mỗi symbol)
+            order_statuses = reconcile_order_statuses(list(active_orders_copy))
+            
             for order_id, order_info in active_orders_copy.items():
                 try:
                     # Kiểm tra trạng thái lệnh
-                    current_status = check_order_status(order_id, order_info['symbol'])
+                    current_status = order_statuses.get(order_id)
                     
                     if current_status is None:
                         continue
@@ -572,6 +575,7 @@ def monitor_active_orders():
                     elif current_status['filled'] > order_info.get('last_filled', 0):
                         # Lệnh khớp một phần
                         ACTIVE_ORDERS[order_id]['last_filled'] = current_status['filled']
+                        journal_order_change(order_id)
                         print(f" Lệnh {order_id} khớp một phần: {current_status['filled']:.6f}/{current_status['amount']:.6f}")
                 
                 except Exception as e:
@@ -583,8 +587,9 @@ def monitor_active_orders():
                 del ACTIVE_ORDERS[order_id]
                 print(f"🗑️ Đã xóa lệnh {order_id} khỏi danh sách theo dõi")
             
-            # Lưu danh sách lệnh vào file để backup
-            save_active_orders_to_file()
+            # Chỉ ghi journal khi có lệnh bị xoá (không ghi lại toàn bộ file mỗi vòng)
+            if orders_to_remove:
+                journal_order_change(*orders_to_remove)
             
             # Sleep theo cấu hình trước khi kiểm tra lần tiếp theo
             time.sleep(order_monitor_interval)
@@ -594,13 +599,15 @@ def monitor_active_orders():
             time.sleep(order_monitor_error_sleep)  # Sleep lâu hơn nếu có lỗi
 
 # Hàm thêm lệnh vào danh sách theo dõi
-def add_order_to_monitor(order_id, symbol, order_type, buy_price=None, stop_loss_price=None):
-    """Thêm lệnh vào danh sách theo dõi với thông tin SL"""
+def add_order_to_monitor(order_id, symbol, order_type, buy_price=None, stop_loss_price=None, id_type=ID_TYPE_ORDER):
+    """Thêm lệnh vào danh sách theo dõi với thông tin SL (id_type=ID_TYPE_ORDER_LIST khi order_id là orderListId)"""
     global ORDER_MONITOR_THREAD, MONITOR_RUNNING
     
+    order_id = str(order_id)  # Key dạng chuỗi giống khi đọc lại từ file JSON
     ACTIVE_ORDERS[order_id] = {
         'symbol': symbol,
         'order_type': order_type,
+        'id_type': id_type,
         'buy_price': buy_price,
         'stop_loss_price': stop_loss_price,  # Thêm thông tin giá SL
         'added_time': time.time(),
@@ -608,8 +615,8 @@ def add_order_to_monitor(order_id, symbol, order_type, buy_price=None, stop_loss
         'last_filled': 0
     }
     
-    # Lưu ngay vào file (silent)
-    save_active_orders_to_file()
+    # Ghi ngay vào journal (silent)
+    journal_order_change(order_id)
     
     # Khởi động thread monitor nếu chưa chạy (silent)
     if not MONITOR_RUNNING:
@@ -617,179 +624,191 @@ def add_order_to_monitor(order_id, symbol, order_type, buy_price=None, stop_loss
         ORDER_MONITOR_THREAD = threading.Thread(target=monitor_active_orders, daemon=True)
         ORDER_MONITOR_THREAD.start()
 
+# Hàm lấy journal của file lệnh hiện tại
+def get_order_journal():
+    """Journal của ACTIVE_ORDERS_FILE (tạo lại nếu đường dẫn file thay đổi)"""
+    global ORDER_JOURNAL
+    if ORDER_JOURNAL is None or ORDER_JOURNAL.snapshot_path != ACTIVE_ORDERS_FILE:
+        ORDER_JOURNAL = OrderJournal(ACTIVE_ORDERS_FILE, config.ORDER_JOURNAL_COMPACT_EVERY, config.ORDER_JOURNAL_FSYNC)
+    return ORDER_JOURNAL
+
+# Hàm ghi thay đổi của lệnh vào journal
+def journal_order_change(*order_ids):
+    """Ghi 1 bản ghi cho mỗi lệnh: thêm/cập nhật nếu còn trong ACTIVE_ORDERS, ngược lại là xoá"""
+    try:
+        journal = get_order_journal()
+        for order_id in order_ids:
+            if order_id in ACTIVE_ORDERS:
+                journal.put(order_id, ACTIVE_ORDERS[order_id])
+            else:
+                journal.remove(order_id)
+        if journal.needs_compaction():
+            journal.compact(ACTIVE_ORDERS)
+    except Exception:
+        pass  # Silent save
+    # Danh sách lệnh thay đổi - cập nhật index SL
+    STOP_LOSS_ENGINE.sync(ACTIVE_ORDERS)
+
 # Hàm lưu danh sách lệnh vào file
 def save_active_orders_to_file():
-    """Lưu danh sách lệnh đang theo dõi vào file"""
+    """Gộp journal vào snapshot - ghi toàn bộ danh sách lệnh (file tạm + rename nguyên tử)"""
     try:
-        with open('active_orders.json', 'w', encoding='utf-8') as f:
-            json.dump(ACTIVE_ORDERS, f, indent=2, ensure_ascii=False)
+        get_order_journal().compact(ACTIVE_ORDERS)
     except Exception:
         pass  # Silent save
+    # Danh sách lệnh thay đổi - cập nhật index SL
+    STOP_LOSS_ENGINE.sync(ACTIVE_ORDERS)
 
 # Hàm đọc danh sách lệnh từ file
 def load_active_orders_from_file():
-    """Đọc danh sách lệnh từ file khi khởi động"""
+    """Đọc danh sách lệnh khi khởi động: snapshot + áp dụng lại journal"""
     global ACTIVE_ORDERS
-    try:
-        with open('active_orders.json', 'r', encoding='utf-8') as f:
-            ACTIVE_ORDERS = json.load(f)
-        
-        # Khởi động monitor nếu có lệnh
-        if ACTIVE_ORDERS:
-            global MONITOR_RUNNING, ORDER_MONITOR_THREAD
-            if not MONITOR_RUNNING:
-                MONITOR_RUNNING = True
-                ORDER_MONITOR_THREAD = threading.Thread(target=monitor_active_orders, daemon=True)
-                ORDER_MONITOR_THREAD.start()
-                print(" Đã khởi động order monitoring thread từ backup")
-    except FileNotFoundError:
+    journal = get_order_journal()
+    if not journal.exists():
         print("📂 Không tìm thấy file backup, bắt đầu với danh sách lệnh trống")
         ACTIVE_ORDERS = {}
+        return
+    
+    ACTIVE_ORDERS = journal.load()
+    # Gộp ngay để bỏ dòng journal ghi dở (nếu có) trước khi ghi tiếp
+    if journal.needs_repair():
+        save_active_orders_to_file()
+    STOP_LOSS_ENGINE.sync(ACTIVE_ORDERS)
+    
+    # Khởi động monitor nếu có lệnh
+    if ACTIVE_ORDERS:
+        global MONITOR_RUNNING, ORDER_MONITOR_THREAD
+        if not MONITOR_RUNNING:
+            MONITOR_RUNNING = True
+            ORDER_MONITOR_THREAD = threading.Thread(target=monitor_active_orders, daemon=True)
+            ORDER_MONITOR_THREAD.start()
+            print(" Đã khởi động order monitoring thread từ backup")
 
 # Hàm kiểm tra và huỷ lệnh TP khi giá vượt SL (thay thế OCO)
 def check_and_handle_stop_loss_trigger():
     """
-    Kiểm tra giá hiện tại của các coin có lệnh TP đang chờ
+    Kiểm tra ngay giá hiện tại của các coin có lệnh TP đang chờ (1 tick cho SL engine)
     Nếu giá hiện tại <= stop_loss_price và lệnh TP chưa khớp => huỷ lệnh TP và tạo lệnh SL market
     """
-    global ACTIVE_ORDERS
-    
     if not ACTIVE_ORDERS:
         return
     
     print("🔍 Kiểm tra Stop Loss triggers...")
     
-    orders_to_cancel = []
-    orders_to_remove = []
+    STOP_LOSS_ENGINE.sync(ACTIVE_ORDERS)
+    triggered = STOP_LOSS_ENGINE.poll_once(synchronous=True)
+
+    if triggered:
+        print(f"✅ Đã xử lý {triggered} lệnh SL trigger")
+    else:
+        print("✅ Không có lệnh nào cần kích hoạt SL")
+
+# Hàm huỷ lệnh TP và bán market khi giá chạm SL (được SL engine gọi ngay trong tick giá)
+@cycle_metrics.timed()
+def execute_stop_loss(order_id, symbol, trigger_price):
+    """Huỷ lệnh TP rồi bán market phần coin của lệnh TP - chỉ 2 request"""
+    order_info = ACTIVE_ORDERS.get(order_id)
+    if order_info is None:
+        return None
     
-    for order_id, order_info in ACTIVE_ORDERS.items():
-        try:
-            # Chỉ kiểm tra các lệnh TAKE_PROFIT
-            if order_info.get('order_type') != 'TAKE_PROFIT':
-                continue
-            
-            symbol = order_info['symbol']
-            stop_loss_price = order_info.get('stop_loss_price')
-            buy_price = order_info.get('buy_price', 0)
-            
-            # Bỏ qua nếu không có thông tin SL
-            if not stop_loss_price:
-                continue
-            
-            # Lấy giá hiện tại
-            current_price = get_current_jpy_price(symbol)
-            if not current_price:
-                continue
-            
-            print(f"  📊 {symbol}: Current ¥{current_price:.4f} | SL ¥{stop_loss_price:.4f}")
-            
-            # Kiểm tra điều kiện kích hoạt SL
-            if current_price <= stop_loss_price:
-                print(f"🚨 SL TRIGGERED cho {symbol}! Current: ¥{current_price:.4f} <= SL: ¥{stop_loss_price:.4f}")
-                
-                # Kiểm tra trạng thái lệnh TP hiện tại
-                order_status = check_order_status(order_id, symbol)
-                
-                if order_status and order_status['status'] == 'open':
-                    print(f"🔄 Lệnh TP {order_id} vẫn chưa khớp, tiến hành huỷ và tạo SL...")
-                    orders_to_cancel.append((order_id, order_info))
-                else:
-                    print(f"ℹ️ Lệnh TP {order_id} đã khớp hoặc đã huỷ, bỏ qua")
-                    if order_status and order_status['status'] in ['closed', 'canceled', 'expired']:
-                        orders_to_remove.append(order_id)
-        
-        except Exception as e:
-            print(f"⚠️ Lỗi kiểm tra SL cho lệnh {order_id}: {e}")
-            continue
+    stop_loss_price = order_info.get('stop_loss_price', 0)
+    binance_symbol = symbol.replace('/', '')
+    coin_name = symbol.split('/')[0]  # VD: ADA từ ADA/JPY
+    print(f"🚨 SL TRIGGERED cho {symbol}! Current: ¥{trigger_price:.4f} <= SL: ¥{stop_loss_price:.4f}")
     
-    # Thực hiện huỷ lệnh TP và tạo lệnh SL
-    for order_id, order_info in orders_to_cancel:
-        try:
-            symbol = order_info['symbol']
-            print(f"🔄 Huỷ lệnh TP {order_id} cho {symbol}...")
-            
-            # Huỷ lệnh TP
-            binance_symbol = symbol.replace('/', '')
-            cancel_result = binance.cancel_order(
-                symbol=binance_symbol,
-                orderId=order_id
-            )
-            print(f"✅ Đã huỷ lệnh TP {order_id}")
-            
-            # Kiểm tra số dư coin còn lại
-            coin_name = symbol.split('/')[0]  # VD: ADA từ ADA/JPY
-            account = binance.get_account()
-            balances = account['balances']
-            
-            available_coin = 0
-            for balance in balances:
-                if balance['asset'] == coin_name:
-                    available_coin = float(balance['free'])
-                    break
-            
-            if available_coin > 0:
-                print(f"💰 Số dư {coin_name} khả dụng: {available_coin:.6f}")
-                
-                # Tạo lệnh SL Market để bán ngay lập tức
-                print(f"🚨 Tạo lệnh SL Market để bán {available_coin:.6f} {coin_name}")
-                
-                # Chuyển đổi symbol format từ ADA/JPY thành ADAJPY
-                binance_symbol = symbol.replace('/', '')
+    # Huỷ lệnh TP - nếu huỷ lỗi thì kiểm tra xem lệnh đã khớp/huỷ trước đó chưa
+    try:
+        # Request SL được ưu tiên hơn mọi request quét thị trường khi gần hết request weight
+        with client_registry.limiter.priority(PRIORITY_CRITICAL):
+            cancel_result = binance.cancel_order(symbol=binance_symbol, orderId=order_id)
+        balance_snapshot.invalidate()
+        print(f"✅ Đã huỷ lệnh TP {order_id}")
+    except Exception as cancel_error:
+        order_status = check_order_status(order_id, symbol)
+        if order_status is None or order_status['status'] == 'open':
+            # Chưa huỷ được - đưa lại vào index để thử lại ở tick sau
+            print(f"❌ Không huỷ được lệnh TP {order_id}: {cancel_error}")
+            STOP_LOSS_ENGINE.add_stop(order_id, symbol, stop_loss_price)
+            return None
+        print(f"ℹ️ Lệnh TP {order_id} đã khớp hoặc đã huỷ, bỏ qua")
+        ACTIVE_ORDERS.pop(order_id, None)
+        journal_order_change(order_id)
+        return None
+    
+    # Số coin được giải phóng = phần chưa khớp của lệnh TP (không cần gọi get_account)
+    try:
+        available_coin = float(cancel_result['origQty']) - float(cancel_result['executedQty'])
+    except Exception:
+        available_coin = get_balance_ccxt_format()['free'].get(coin_name, 0)
+    
+    sl_order = None
+    try:
+        if available_coin > 0:
+            # Tạo lệnh SL Market để bán ngay lập tức
+            print(f"🚨 Tạo lệnh SL Market để bán {available_coin:.6f} {coin_name}")
+            with client_registry.limiter.priority(PRIORITY_CRITICAL):
                 sl_order = binance.order_market_sell(
                     symbol=binance_symbol,
                     quantity=available_coin
                 )
+            balance_snapshot.invalidate()
+            print(f"✅ SL EXECUTED: Đã bán {available_coin:.6f} {coin_name} tại giá thị trường")
+            
+            # Gửi thông báo SL
+            try:
+                from account_info import send_sell_success_notification
                 
-                print(f"✅ SL EXECUTED: Đã bán {available_coin:.6f} {coin_name} tại giá thị trường")
+                sl_price = float(sl_order.get('fills', [{}])[0].get('price', trigger_price)) if sl_order.get('fills') else trigger_price
+                profit_loss = sl_price - order_info.get('buy_price', 0)
+                profit_percent = (profit_loss / order_info.get('buy_price', 1)) * 100 if order_info.get('buy_price', 0) > 0 else 0
                 
-                # Gửi thông báo SL
-                try:
-                    from account_info import send_sell_success_notification
-                    
-                    sl_price = float(sl_order.get('fills', [{}])[0].get('price', current_price)) if sl_order.get('fills') else current_price
-                    profit_loss = sl_price - order_info.get('buy_price', 0)
-                    profit_percent = (profit_loss / order_info.get('buy_price', 1)) * 100 if order_info.get('buy_price', 0) > 0 else 0
-                    
-                    sell_success_data = {
-                        'symbol': symbol,
-                        'order_type': 'STOP_LOSS_EXECUTED',
-                        'filled_price': sl_price,
-                        'buy_price': order_info.get('buy_price', 0),
-                        'quantity': available_coin,
-                        'profit_loss': profit_loss,
-                        'profit_percent': profit_percent,
-                        'order_id': sl_order['id'],
-                        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                        'note': f'Auto SL executed at ¥{current_price:.4f} (trigger: ¥{order_info.get("stop_loss_price", 0):.4f})'
-                    }
-                    
-                    send_sell_success_notification(sell_success_data)
-                except Exception:
-                    pass  # Silent notification
-            else:
-                print(f"⚠️ Không có {coin_name} nào để bán")
-            
-            # Đánh dấu để xóa khỏi danh sách theo dõi
-            orders_to_remove.append(order_id)
-            
-        except Exception as e:
-            print(f"❌ Lỗi xử lý SL cho lệnh {order_id}: {e}")
-    
-    # Xóa các lệnh đã xử lý
-    for order_id in orders_to_remove:
-        if order_id in ACTIVE_ORDERS:
-            del ACTIVE_ORDERS[order_id]
-            print(f"🗑️ Đã xóa lệnh {order_id} khỏi danh sách theo dõi")
+                sell_success_data = {
+                    'symbol': symbol,
+                    'order_type': 'STOP_LOSS_EXECUTED',
+                    'filled_price': sl_price,
+                    'buy_price': order_info.get('buy_price', 0),
+                    'quantity': available_coin,
+                    'profit_loss': profit_loss,
+                    'profit_percent': profit_percent,
+                    'order_id': sl_order['orderId'],
+                    'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                    'note': f'Auto SL executed at ¥{trigger_price:.4f} (trigger: ¥{stop_loss_price:.4f})'
+                }
+                
+                event_logger.log('order', action='STOP_LOSS', **sell_success_data)
+                send_sell_success_notification(sell_success_data)
+            except Exception:
+                pass  # Silent notification
+        else:
+            print(f"⚠️ Không có {coin_name} nào để bán")
+    except Exception as e:
+        print(f"❌ Lỗi bán SL cho lệnh {order_id}: {e}")
     
-    # Lưu lại danh sách đã cập nhật
-    if orders_to_remove:
-        save_active_orders_to_file()
-        print(f"📁 Đã cập nhật danh sách theo dõi ({len(ACTIVE_ORDERS)} lệnh còn lại)")
+    # TP đã huỷ - xoá khỏi danh sách theo dõi
+    ACTIVE_ORDERS.pop(order_id, None)
+    journal_order_change(order_id)
+    print(f"🗑️ Đã xóa lệnh {order_id} khỏi danh sách theo dõi ({len(ACTIVE_ORDERS)} lệnh còn lại)")
+    return sl_order
 
-    if orders_to_cancel:
-        print(f"✅ Đã xử lý {len(orders_to_cancel)} lệnh SL trigger")
-    else:
-        print("✅ Không có lệnh nào cần kích hoạt SL")
+# Hàm lấy giá cho SL engine ở chế độ poll (đọc WebSocket cache trước, REST khi cache cũ)
+def fetch_stop_loss_prices(symbols):
+    return {symbol: get_current_jpy_price(symbol) for symbol in symbols}
+
+# Hàm nhận tick giá từ market stream cho SL engine
+def handle_stream_price(binance_symbol, price):
+    if binance_symbol.endswith('JPY'):
+        STOP_LOSS_ENGINE.on_price(f"{binance_symbol[:-3]}/JPY", price)
+
+# Hàm khởi động SL engine (tick từ WebSocket + poll nhanh làm dự phòng)
+def start_stop_loss_engine():
+    if STOP_LOSS_ENGINE.running:
+        return STOP_LOSS_ENGINE
+    STOP_LOSS_ENGINE.sync(ACTIVE_ORDERS)
+    if MARKET_STREAM is not None:
+        MARKET_STREAM.cache.add_listener(handle_stream_price)
+    STOP_LOSS_ENGINE.start(poll=True)
+    print(f"🛡️ Đã khởi động SL engine (poll {STOP_LOSS_ENGINE.poll_interval}s{' + WebSocket' if MARKET_STREAM is not None else ''})")
+    return STOP_LOSS_ENGINE
 
 # Hàm dừng monitor
 def stop_order_monitor():
@@ -834,15 +853,8 @@ def validate_balance_for_order(symbol, quantity, price):
 def get_account_balance():
     """Lấy số dư tài khoản JPY (cố định chỉ dùng JPY)"""
     try:
-        account = binance.get_account()
-        balances = account['balances']
-        
-        # Tìm số dư JPY (cố định chỉ dùng JPY)
-        for balance in balances:
-            if balance['asset'] == 'JPY':
-                return float(balance['free'])
-        
-        return 0  # Không tìm thấy JPY
+        # Đọc từ snapshot số dư dùng chung trong chu kỳ (cố định chỉ dùng JPY)
+        return balance_snapshot.get_free(binance, 'JPY')
     except Exception as e:
         print(f"Lỗi khi lấy số dư: {e}")
         return 0
@@ -851,16 +863,14 @@ def get_account_balance():
 def get_balance_ccxt_format():
     """Lấy balance theo format ccxt để tương thích với code hiện tại"""
     try:
-        account = binance.get_account()
-        balances = account['balances']
+        balances = balance_snapshot.get_balances(binance)
         
         # Chuyển đổi format để tương thích với ccxt
         balance = {'free': {}, 'used': {}, 'total': {}}
         
-        for bal in balances:
-            asset = bal['asset']
-            free = float(bal['free'])
-            locked = float(bal['locked'])
+        for asset, bal in balances.items():
+            free = bal['free']
+            locked = bal['locked']
             total = free + locked
             
             balance['free'][asset] = free
@@ -1042,6 +1052,7 @@ def check_market_impact(symbol, quantity, order_book_analysis=None, side='buy'):
         return {"impact": "unknown", "warning": f"Error analyzing impact: {e}"}
 
 # Hàm đặt lệnh mua với stop loss và take profit
+@cycle_metrics.timed()
 def place_buy_order_with_sl_tp(symbol, quantity, entry_price, stop_loss, tp_price):
     """Đặt lệnh mua với stop loss và take profit tự động - chỉ 1 TP"""
     try:
@@ -1070,27 +1081,14 @@ def place_buy_order_with_sl_tp(symbol, quantity, entry_price, stop_loss, tp_pric
         
         # Kiểm tra market info để đảm bảo order hợp lệ (silent)
         try:
-            exchange_info = binance.get_exchange_info()
-            symbol_info = None
-            for s in exchange_info['symbols']:
-                if s['symbol'] == trading_symbol.replace('/', ''):
-                    symbol_info = s
-                    break
+            symbol_info = get_symbol_metadata(trading_symbol)
             
             if symbol_info:
-                # Tìm LOT_SIZE filter
-                min_qty = 0.0
-                for filter_info in symbol_info['filters']:
-                    if filter_info['filterType'] == 'LOT_SIZE':
-                        min_qty = float(filter_info['minQty'])
-                        break
+                min_qty = symbol_info['min_qty']
+                min_notional = symbol_info['min_notional']
                 
-                # Tìm MIN_NOTIONAL filter
-                min_notional = 0.0
-                for filter_info in symbol_info['filters']:
-                    if filter_info['filterType'] == 'MIN_NOTIONAL':
-                        min_notional = float(filter_info['minNotional'])
-                        break
+                # Làm tròn số lượng theo LOT_SIZE stepSize
+                final_quantity = adjust_quantity_precision(trading_symbol, final_quantity)
                 
                 if final_quantity < min_qty:
                     return {'status': 'failed', 'error': f'Quantity too small. Min: {min_qty}'}
@@ -1127,6 +1125,7 @@ def place_buy_order_with_sl_tp(symbol, quantity, entry_price, stop_loss, tp_pric
                 symbol=binance_symbol,
                 quantity=final_quantity
             )
+            balance_snapshot.invalidate()
             
             # Lấy giá thực tế đã mua
             actual_price = float(buy_order.get('fills', [{}])[0].get('price', current_price)) if buy_order.get('fills') else current_price
@@ -1172,7 +1171,7 @@ def place_buy_order_with_sl_tp(symbol, quantity, entry_price, stop_loss, tp_pric
                 'quantity': actual_quantity,
                 'price': actual_price,
                 'total': actual_quantity * actual_price,
-                'order_id': buy_order['id'],
+                'order_id': buy_order['orderId'],
                 'balance_before': 'N/A',
                 'balance_after': 'N/A',
                 'stop_loss': stop_loss,
@@ -1180,6 +1179,7 @@ def place_buy_order_with_sl_tp(symbol, quantity, entry_price, stop_loss, tp_pric
                 'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             }
             
+            event_logger.log('order', action='BUY', **buy_notification_data)
             send_buy_success_notification(buy_notification_data)
             
         except Exception:
@@ -1190,20 +1190,12 @@ def place_buy_order_with_sl_tp(symbol, quantity, entry_price, stop_loss, tp_pric
         oco_success = False
         available_coin = actual_quantity  # Mặc định
         
-        # Kiểm tra số dư ADA sau khi mua (đợi settle)
+        # Kiểm tra số dư ADA sau khi mua (lệnh market đã khớp, snapshot số dư đã bị huỷ)
         try:
-            time.sleep(3)  # Đợi 3 giây cho giao dịch settle hoàn toàn
-            account = binance.get_account()
-            balances = account['balances']
-            
             coin_name = trading_symbol.split('/')[0]  # Lấy ADA từ ADA/JPY
-            available_coin = 0
             
-            # Tìm số dư coin
-            for balance in balances:
-                if balance['asset'] == coin_name:
-                    available_coin = float(balance['free'])
-                    break
+            # Tìm số dư coin (snapshot đã bị huỷ sau lệnh mua nên đây là số dư mới)
+            available_coin = balance_snapshot.get_free(binance, coin_name)
             
             print(f"💰 Số dư {coin_name} khả dụng: {available_coin:.6f}")
             
@@ -1218,16 +1210,11 @@ def place_buy_order_with_sl_tp(symbol, quantity, entry_price, stop_loss, tp_pric
             available_coin = actual_quantity * 0.95  # Fallback: giữ 5% buffer
         
         # Kiểm tra cặp coin có hỗ trợ OCO không trước khi thử đặt OCO order
-        oco_supported = True
+        oco_supported = TRADING_CONFIG.get('use_oco_orders', False)
         try:
-            exchange_info = binance.fetch_exchange_info()
-            # Binance API dùng symbol không có dấu gạch chéo, ví dụ ADAJPY
-            symbol_no_slash = trading_symbol.replace('/', '')
-            symbol_info = next((s for s in exchange_info['symbols'] if s['symbol'] == symbol_no_slash), None)
+            symbol_info = get_symbol_metadata(trading_symbol)
             if symbol_info:
-                permissions = symbol_info.get('permissions', [])
-                print(f"Permissions for {trading_symbol}: {permissions}")
-                if 'OCO' not in permissions:
+                if oco_supported and not symbol_info['oco_allowed']:
                     print(f"❌ {trading_symbol} does not support OCO orders via API")
                     oco_supported = False
             else:
@@ -1236,6 +1223,11 @@ def place_buy_order_with_sl_tp(symbol, quantity, entry_price, stop_loss, tp_pric
         except Exception as e:
             print(f"⚠️ Error checking exchange info: {e}")
             oco_supported = False
+        
+        # Làm tròn giá/số lượng bán theo tickSize/stepSize của symbol
+        available_coin = adjust_quantity_precision(trading_symbol, available_coin)
+        tp_price = adjust_price_precision(trading_symbol, tp_price)
+        stop_loss = adjust_price_precision(trading_symbol, stop_loss)
 
         if oco_supported:
             print("🔄 Đang thử OCO order (One-Cancels-Other)...")
@@ -1250,14 +1242,15 @@ def place_buy_order_with_sl_tp(symbol, quantity, entry_price, stop_loss, tp_pric
                     quantity=oco_quantity,
                     price=str(tp_price),  # Take profit price
                     stopPrice=str(stop_loss),  # Stop loss trigger price
-                    stopLimitPrice=str(stop_loss * (1 - TRADING_CONFIG.get('stop_loss_buffer', 0.001))),
+                    stopLimitPrice=str(adjust_price_precision(trading_symbol, stop_loss * (1 - TRADING_CONFIG.get('stop_loss_buffer', 0.001)))),
                     stopLimitTimeInForce=Client.TIME_IN_FORCE_GTC  # Hoặc 'GTC'
                 )
+                balance_snapshot.invalidate()
                 orders_placed.append(oco_order)
                 oco_success = True
                 # OCO order trả về orderListId
                 order_list_id = oco_order.get('orderListId', oco_order.get('listClientOrderId', str(oco_order)))
-                add_order_to_monitor(order_list_id, trading_symbol, "OCO (SL/TP)", actual_price, stop_loss)
+                add_order_to_monitor(order_list_id, trading_symbol, "OCO (SL/TP)", actual_price, stop_loss, id_type=ID_TYPE_ORDER_LIST)
                 print(f"✅ OCO order đã đặt thành công: {order_list_id}")
             except BinanceAPIException as oco_error:
                 print(f"❌ OCO FAILED (API Error): {oco_error}")
@@ -1278,7 +1271,8 @@ def place_buy_order_with_sl_tp(symbol, quantity, entry_price, stop_loss, tp_pric
             total_reserve = available_coin  # 100% để tối ưu hóa lợi nhuận
             
             # Kiểm tra minimum notional cho TP
-            min_notional = 5.0
+            symbol_info = get_symbol_metadata(trading_symbol)
+            min_notional = symbol_info['min_notional'] if symbol_info else 5.0
             tp_notional = total_reserve * tp_price
             
             if tp_notional < min_notional:
@@ -1296,10 +1290,11 @@ def place_buy_order_with_sl_tp(symbol, quantity, entry_price, stop_loss, tp_pric
                         quantity=total_reserve,
                         price=tp_price
                     )
+                    balance_snapshot.invalidate()
                     orders_placed.append(tp_order)
                     print(f"✅ TP: ¥{tp_price:.4f} (Quantity: {total_reserve:.6f})")
                     print(f"🛡️ SL được theo dõi tự động: ¥{stop_loss:.4f}")
-                    add_order_to_monitor(tp_order['id'], trading_symbol, "TAKE_PROFIT", actual_price, stop_loss)
+                    add_order_to_monitor(tp_order['orderId'], trading_symbol, "TAKE_PROFIT", actual_price, stop_loss)
                     
                     # Thông báo về SL thủ công với thông tin chi tiết
                     profit_pct = ((tp_price / actual_price - 1) * 100)
@@ -1324,13 +1319,20 @@ def place_buy_order_with_sl_tp(symbol, quantity, entry_price, stop_loss, tp_pric
         try:
             from account_info import send_sell_order_placed_notification
             
+            # OCO: SL và TP là 2 chân của cùng 1 order list; không OCO: chỉ có lệnh TP, SL do SL engine theo dõi
+            if oco_success:
+                sl_order_id = tp1_order_id = orders_placed[0]['orderListId']
+            else:
+                sl_order_id = 'N/A'
+                tp1_order_id = orders_placed[0]['orderId'] if orders_placed else 'N/A'
+            
             sell_order_notification_data = {
                 'symbol': trading_symbol,
                 'original_quantity': actual_quantity,
                 'buy_price': actual_price,
                 'stop_loss': stop_loss,
-                'sl_order_id': orders_placed[0]['id'] if orders_placed else 'N/A',
-                'tp1_order_id': orders_placed[1]['id'] if len(orders_placed) > 1 else 'N/A',
+                'sl_order_id': sl_order_id,
+                'tp1_order_id': tp1_order_id,
                 'tp1_price': tp_price,
                 'tp1_quantity': actual_quantity,
                 'tp2_order_id': 'N/A',  # Không còn TP2
@@ -1340,6 +1342,7 @@ def place_buy_order_with_sl_tp(symbol, quantity, entry_price, stop_loss, tp_pric
                 'note': 'Sử dụng python-binance thay vì ccxt'
             }
             
+            event_logger.log('order', action='SELL_PLACED', **sell_order_notification_data)
             send_sell_order_placed_notification(sell_order_notification_data)
             
         except Exception:
@@ -1436,27 +1439,12 @@ def handle_inventory_coins():
                 
                 # Lấy thông tin market
                 try:
-                    exchange_info = binance.get_exchange_info()
-                    symbol_info = None
-                    for s in exchange_info['symbols']:
-                        if s['symbol'] == symbol.replace('/', ''):
-                            symbol_info = s
-                            break
+                    symbol_info = get_symbol_metadata(symbol)
                     
                     if symbol_info:
-                        # Tìm LOT_SIZE filter
-                        min_qty = 0.0
-                        for filter_info in symbol_info['filters']:
-                            if filter_info['filterType'] == 'LOT_SIZE':
-                                min_qty = float(filter_info['minQty'])
-                                break
-                        
-                        # Tìm MIN_NOTIONAL filter
-                        min_notional = 0.0
-                        for filter_info in symbol_info['filters']:
-                            if filter_info['filterType'] == 'MIN_NOTIONAL':
-                                min_notional = float(filter_info['minNotional'])
-                                break
+                        min_qty = symbol_info['min_qty']
+                        min_notional = symbol_info['min_notional']
+                        quantity = adjust_quantity_precision(symbol, quantity)
                     else:
                         print(f"   ⚠️ {coin_info['coin']}: Không tìm thấy thông tin symbol")
                         continue
@@ -1493,6 +1481,7 @@ def handle_inventory_coins():
                     symbol=binance_symbol,
                     quantity=quantity
                 )
+                balance_snapshot.invalidate()
                 actual_quantity = float(sell_order['executedQty'])
                 actual_price = float(sell_order.get('fills', [{}])[0].get('price', coin_info['current_price'])) if sell_order.get('fills') else coin_info['current_price']
                 sold_value = actual_quantity * actual_price
@@ -1521,9 +1510,6 @@ def handle_inventory_coins():
             
             # Gửi thông báo
             send_notification(f"🏦 Đã thanh lý tồn kho: {successful_sales} coin → ¥{total_sold_value:,.2f}")
-            
-            # Đợi 3 giây để số dư cập nhật
-            time.sleep(3)
         
         # Cảnh báo về coin không bán được
         if skipped_coins:
@@ -1549,6 +1535,7 @@ def cancel_all_open_orders():
         # Lấy tất cả open orders
         open_orders = binance.get_open_orders()
         if open_orders:
+            balance_snapshot.invalidate()
             print(f"🗑️ Hủy {len(open_orders)} lệnh đang chờ...")
             for order in open_orders:
                 try:
@@ -1567,6 +1554,7 @@ def cancel_all_open_orders():
         print(f"❌ Lỗi kiểm tra orders: {e}")
 
 # Hàm thực hiện trading tự động
+@cycle_metrics.timed("execute_auto_trading")
 @system_error_handler("execute_auto_trading", critical=True)
 def execute_auto_trading(recommendations):
     """Thực hiện trading tự động dựa trên khuyến nghị"""
@@ -1589,7 +1577,7 @@ def execute_auto_trading(recommendations):
         return
     
     # Kiểm tra tài khoản (silent)
-    account_info = get_account_info()
+    account_info = get_account_info(binance, balance_snapshot.get_account(binance))
     if not account_info:
         print("❌ Không thể lấy thông tin tài khoản")
         return
@@ -1780,10 +1768,6 @@ def execute_auto_trading(recommendations):
                     else:
                         print(f"❌ {jpy_symbol} thất bại: {result.get('error', 'Unknown error')}")
                     
-                    # Delay giữa các trades
-                    if i < len(recommendations) - 1:  # Không delay sau trade cuối
-                        time.sleep(3)
-                    
                 except Exception as e:
                     print(f"❌ Lỗi trading {coin_data['coin']}: {e}")
         
@@ -1809,17 +1793,13 @@ def execute_auto_trading(recommendations):
 def get_jpy_pairs():
     # Lấy danh sách cặp JPY thực sự có sẵn trên exchange - CHỈ FOCUS VÀO 5 COIN CỤ THỂ
     try:
-        # Danh sách coin cụ thể cần trade
-        TARGET_COINS = ['ETH', 'XRP', 'SUI', 'SOL', 'XLM']
-        
-        # Lấy thông tin exchange từ Binance
-        exchange_info = binance.get_exchange_info()
-        symbols = [s['symbol'] for s in exchange_info['symbols'] if s['status'] == 'TRADING']
+        # Lấy thông tin exchange từ cache metadata
+        symbols = EXCHANGE_METADATA.trading_symbols(binance)
         
         # Tìm các cặp JPY cho coin cụ thể
         available_pairs = []
         
-        for target_coin in TARGET_COINS:
+        for target_coin in config.TARGET_COINS:
             jpy_symbol = f'{target_coin}JPY'
             if jpy_symbol in symbols:
                 pair_format = f'{target_coin}/JPY'
@@ -1840,9 +1820,21 @@ def get_jpy_pairs():
     except Exception as e:
         print(f"⚠️ Lỗi lấy danh sách pairs: {e}")
         # Fallback về danh sách target chính
-        return ['ETH/JPY', 'XRP/JPY', 'SUI/JPY', 'SOL/JPY', 'XLM/JPY']
+        return [f'{coin}/JPY' for coin in config.TARGET_COINS]
+
+# Hàm tính độ dài cửa sổ dữ liệu (ms) tương ứng với time_period của get_crypto_data
+def get_kline_window_ms(timeframe, limit):
+    minute_ms = 60 * 1000
+    if timeframe in ['1m', '3m', '5m']:
+        return limit * minute_ms
+    elif timeframe in ['15m', '30m']:
+        return limit * 15 * minute_ms
+    elif timeframe in ['1h', '2h', '4h']:
+        return limit * 60 * minute_ms
+    return 30 * 24 * 60 * minute_ms
 
 # Hàm lấy dữ liệu giá từ Binance
+@cycle_metrics.timed()
 def get_crypto_data(symbol, timeframe='1m', limit=5000):
     try:
         # Chỉ sử dụng cặp JPY thực sự
@@ -1879,7 +1871,19 @@ def get_crypto_data(symbol, timeframe='1m', limit=5000):
         else:
             time_period = "30 days ago UTC"  # Default fallback
         
-        klines = binance.get_historical_klines(binance_symbol, interval, time_period)
+        if CANDLE_STORE is not None:
+            # Đọc từ candle store cục bộ - chỉ tải các nến mới từ Binance
+            start_ms = int(time.time() * 1000) - get_kline_window_ms(timeframe, limit)
+            klines = None
+            if MARKET_STREAM is not None:
+                # Nến mới nhận qua WebSocket - không cần gọi REST nếu nối tiếp được với lịch sử
+                stream_klines = MARKET_STREAM.get_recent_klines(binance_symbol, interval)
+                if stream_klines:
+                    klines = CANDLE_STORE.get_klines_from_stream(binance_symbol, interval, start_ms, stream_klines)
+            if klines is None:
+                klines = CANDLE_STORE.get_klines(binance, binance_symbol, interval, start_ms)
+        else:
+            klines = binance.get_historical_klines(binance_symbol, interval, time_period)
         
         # Chuyển đổi thành DataFrame
         df = pd.DataFrame(klines, columns=[
@@ -1903,13 +1907,16 @@ def get_crypto_data(symbol, timeframe='1m', limit=5000):
         return None
 
 # Hàm lấy sổ lệnh từ Binance
+@cycle_metrics.timed()
 def get_order_book(symbol, limit=20):
     try:
         # Chỉ sử dụng cặp JPY thực sự
         binance_symbol = symbol.replace('/', '')  # ADA/JPY -> ADAJPY
         
-        # Lấy order book từ Binance
-        order_book_data = binance.get_order_book(symbol=binance_symbol, limit=limit)
+        # Lấy order book từ WebSocket cache, REST khi cache cũ
+        order_book_data = MARKET_STREAM.get_order_book(binance_symbol, limit) if MARKET_STREAM is not None else None
+        if order_book_data is None:
+            order_book_data = binance.get_order_book(symbol=binance_symbol, limit=limit)
         
         # Chuyển đổi format để tương thích với code hiện tại
         # python-binance trả về list of lists: [['price', 'qty'], ...]
@@ -1926,6 +1933,55 @@ def get_order_book(symbol, limit=20):
         print(f"Lỗi khi lấy order book cho {symbol}: {e}")
         return None
 
+# Hàm khởi động WebSocket market data cho các cặp đang trade
+def start_market_stream(symbols=None):
+    """Khởi động stream 1 lần (nếu bật trong config), lỗi thì tiếp tục dùng REST"""
+    global MARKET_STREAM
+
+    if MARKET_STREAM is not None or not config.MARKET_STREAM_ENABLED:
+        return MARKET_STREAM
+
+    try:
+        symbols = symbols or get_jpy_pairs()
+        cache = MarketDataCache(config.MARKET_STREAM_MAX_AGE, config.MARKET_STREAM_KLINE_MAX_AGE,
+                                config.CANDLE_STORE_MAX_CANDLES)
+        feed = BinanceStreamFeed(
+            cache,
+            api_key=trading_config.BINANCE_CONFIG['api_key'],
+            api_secret=trading_config.BINANCE_CONFIG['api_secret'],
+            testnet=trading_config.BINANCE_CONFIG['testnet'],
+            depth_levels=config.MARKET_STREAM_DEPTH_LEVELS
+        )
+        stream = MarketStream(feed)
+        stream.start([symbol.replace('/', '') for symbol in symbols], config.MARKET_STREAM_INTERVALS)
+        MARKET_STREAM = stream
+        print(f"📡 Đã khởi động market stream cho {len(symbols)} cặp")
+    except Exception as e:
+        print(f"⚠️ Không khởi động được market stream, dùng REST: {e}")
+        MARKET_STREAM = None
+    return MARKET_STREAM
+
+# Hàm dừng WebSocket market data
+def stop_market_stream():
+    global MARKET_STREAM
+    if MARKET_STREAM is not None:
+        try:
+            MARKET_STREAM.stop()
+        except Exception as e:
+            print(f"⚠️ Lỗi dừng market stream: {e}")
+        MARKET_STREAM = None
+
+# Hàm tải song song klines + sổ lệnh cho nhiều symbol trước khi phân tích
+def prefetch_market_data(symbols, timeframe, limit, order_book_limit=None):
+    """
+    Returns:
+        dict: symbol -> {'df': DataFrame hoặc None, 'order_book': dict hoặc None}
+    """
+    fetchers = {'df': lambda symbol: get_crypto_data(symbol, timeframe=timeframe, limit=limit)}
+    if order_book_limit:
+        fetchers['order_book'] = lambda symbol: get_order_book(symbol, limit=order_book_limit)
+    return MARKET_SCANNER.fetch_all(symbols, fetchers)
+
 # Hàm phân tích sổ lệnh
 def analyze_order_book(order_book):
     if not order_book or not order_book.get('bids') or not order_book.get('asks'):
@@ -1998,21 +2054,25 @@ def analyze_order_book(order_book):
         'price_range_sell': price_range_sell
     }
 
+# Hàm lấy bộ lọc của symbol từ cache exchange info
+def get_symbol_metadata(symbol):
+    """Thông tin symbol (tick_size, step_size, min_qty, min_notional, oco_allowed) - None nếu không có"""
+    return EXCHANGE_METADATA.get(binance, symbol)
+
 # Hàm validate minimum trading requirements cho Binance
 def validate_minimum_quantity(symbol, quantity):
     """Kiểm tra quantity có đạt minimum requirement không"""
     try:
-        # Lấy thông tin symbol từ Binance
-        markets = binance.load_markets()
-        if symbol not in markets:
+        # Lấy thông tin symbol từ cache exchange info
+        symbol_info = get_symbol_metadata(symbol)
+        if symbol_info is None:
             return {
                 'valid': False,
                 'reason': f'Symbol {symbol} không tồn tại',
                 'suggestion': 'Kiểm tra lại symbol'
             }
         
-        market_info = markets[symbol]
-        min_amount = market_info.get('limits', {}).get('amount', {}).get('min', 0)
+        min_amount = symbol_info['min_qty']
         
         if quantity < min_amount:
             return {
@@ -2033,17 +2093,16 @@ def validate_minimum_quantity(symbol, quantity):
 def validate_minimum_notional(symbol, quantity, price):
     """Kiểm tra notional value có đạt minimum requirement không"""
     try:
-        # Lấy thông tin symbol từ Binance
-        markets = binance.load_markets()
-        if symbol not in markets:
+        # Lấy thông tin symbol từ cache exchange info
+        symbol_info = get_symbol_metadata(symbol)
+        if symbol_info is None:
             return {
                 'valid': False,
                 'reason': f'Symbol {symbol} không tồn tại',
                 'suggestion': 'Kiểm tra lại symbol'
             }
         
-        market_info = markets[symbol]
-        min_notional = market_info.get('limits', {}).get('cost', {}).get('min', 1000)  # Default 1000 JPY
+        min_notional = symbol_info['min_notional'] or 1000  # Default 1000 JPY
         
         notional_value = quantity * price
         
@@ -2064,25 +2123,21 @@ def validate_minimum_notional(symbol, quantity, price):
         }
 
 def adjust_quantity_precision(symbol, quantity):
-    """Điều chỉnh quantity theo precision requirement của symbol"""
+    """Điều chỉnh quantity theo stepSize (LOT_SIZE) của symbol - làm tròn xuống"""
     try:
-        # Lấy thông tin symbol từ Binance
-        markets = binance.load_markets()
-        if symbol not in markets:
-            return quantity
-        
-        market_info = markets[symbol]
-        precision = market_info.get('precision', {}).get('amount', 6)
-        
-        # Làm tròn quantity theo precision
-        adjusted = round(quantity, precision)
-        
-        return adjusted
-        
+        return EXCHANGE_METADATA.round_quantity(binance, symbol, quantity)
     except Exception as e:
         print(f"⚠️ Lỗi adjust precision: {e}")
         return quantity
 
+def adjust_price_precision(symbol, price):
+    """Điều chỉnh giá theo tickSize (PRICE_FILTER) của symbol - làm tròn xuống"""
+    try:
+        return EXCHANGE_METADATA.round_price(binance, symbol, price)
+    except Exception as e:
+        print(f"⚠️ Lỗi adjust price precision: {e}")
+        return price
+
 # Hàm tổng hợp kiểm tra có thể bán coin không
 def can_sell_coin(symbol, quantity, price):
     """Kiểm tra tổng hợp xem có thể bán coin không"""
@@ -2148,31 +2203,9 @@ def detect_scalping_downtrend(df, symbol, timeframe='15m'):
         }
     
     try:
-        # Tính các chỉ báo tối ưu cho scalping 15m
-        df_temp = df.copy()
-        
-        # Moving averages ngắn hạn cho scalping
-        df_temp['EMA_8'] = EMAIndicator(df_temp['close'], window=8).ema_indicator()
-        df_temp['EMA_21'] = EMAIndicator(df_temp['close'], window=21).ema_indicator()
-        df_temp['SMA_50'] = SMAIndicator(df_temp['close'], window=50).sma_indicator()
-        
-        # RSI và Stochastic cho oversold detection
-        df_temp['RSI'] = RSIIndicator(df_temp['close'], window=14).rsi()
-        stoch = StochasticOscillator(df_temp['close'], df_temp['high'], df_temp['low'], window=14)
-        df_temp['Stoch_K'] = stoch.stoch()
-        df_temp['Stoch_D'] = stoch.stoch_signal()
-        
-        # MACD cho momentum
-        macd = MACD(df_temp['close'], window_slow=26, window_fast=12, window_sign=9)
-        df_temp['MACD'] = macd.macd()
-        df_temp['MACD_signal'] = macd.macd_signal()
-        df_temp['MACD_histogram'] = macd.macd_diff()
-        
-        # Bollinger Bands cho volatility và mean reversion
-        bb = BollingerBands(df_temp['close'], window=20, window_dev=2)
-        df_temp['BB_upper'] = bb.bollinger_hband()
-        df_temp['BB_lower'] = bb.bollinger_lband()
-        df_temp['BB_middle'] = bb.bollinger_mavg()
+        # Chỉ báo cho scalping 15m từ kernel dùng chung: EMA 8/21, SMA 50, RSI + Stochastic (oversold),
+        # MACD (momentum), Bollinger Bands (volatility và mean reversion)
+        df_temp = get_indicator_frame(df)
         
         latest = df_temp.iloc[-1]
         prev_5 = df_temp.iloc[-5] if len(df_temp) >= 5 else df_temp.iloc[0]
@@ -2421,24 +2454,8 @@ def detect_comprehensive_downtrend(df, symbol):
         }
     
     try:
-        # Tính các chỉ báo kỹ thuật
-        df_temp = df.copy()
-        df_temp['SMA_10'] = SMAIndicator(df_temp['close'], window=10).sma_indicator()
-        df_temp['SMA_20'] = SMAIndicator(df_temp['close'], window=20).sma_indicator()
-        df_temp['SMA_50'] = SMAIndicator(df_temp['close'], window=50).sma_indicator()
-        df_temp['RSI'] = RSIIndicator(df_temp['close'], window=14).rsi()
-        
-        # Bollinger Bands
-        bb = BollingerBands(df_temp['close'], window=20)
-        df_temp['BB_upper'] = bb.bollinger_hband()
-        df_temp['BB_lower'] = bb.bollinger_lband()
-        df_temp['BB_middle'] = bb.bollinger_mavg()
-        
-        # MACD
-        macd = MACD(df_temp['close'])
-        df_temp['MACD'] = macd.macd()
-        df_temp['MACD_signal'] = macd.macd_signal()
-        df_temp['MACD_histogram'] = macd.macd_diff()
+        # Tính các chỉ báo kỹ thuật (SMA, RSI, Bollinger Bands, MACD) từ kernel dùng chung
+        df_temp = get_indicator_frame(df)
         
         latest = df_temp.iloc[-1]
         prev_10 = df_temp.iloc[-10] if len(df_temp) >= 10 else df_temp.iloc[0]
@@ -3160,20 +3177,21 @@ def find_scalping_opportunities_15m(min_confidence=45):
         
         opportunities = []
         
+        # Tải song song dữ liệu 15m (ít hơn cho tốc độ, 100 candles = ~25 hours data) + sổ lệnh nhanh
+        market_data = prefetch_market_data(jpy_pairs, '15m', 100, order_book_limit=10)
+        
         for i, symbol in enumerate(jpy_pairs):
             try:
                 print(f"⚡ Scalping analysis {symbol} ({i+1}/{len(jpy_pairs)})...")
                 
-                # Lấy dữ liệu 15m (ít hơn cho tốc độ)
-                df = get_crypto_data(symbol, timeframe='15m', limit=100)  # 100 candles = ~25 hours data
+                df = market_data[symbol].get('df')
                 if df is None or len(df) < 30:
                     print(f"   ❌ Insufficient data for {symbol}")
                     continue
                 
                 current_price = df['close'].iloc[-1]
                 
-                # Lấy sổ lệnh nhanh
-                order_book = get_order_book(symbol, limit=10)
+                order_book = market_data[symbol].get('order_book')
                 order_book_analysis = analyze_order_book(order_book)
                 
                 if not order_book_analysis:
@@ -3199,8 +3217,6 @@ def find_scalping_opportunities_15m(min_confidence=45):
                 else:
                     if opportunity:
                         print(f"   ⚠️ Low confidence for {symbol}: {opportunity['confidence_score']:.0f}")
-                    
-                time.sleep(0.1)  # Delay ngắn hơn cho scalping
                 
             except Exception as e:
                 print(f"   ❌ Error analyzing {symbol}: {e}")
@@ -3240,19 +3256,20 @@ def find_orderbook_opportunities(timeframe='30m', min_confidence=50):
         print(f"🔍 Phân tích cơ hội từ sổ lệnh cho {len(jpy_pairs)} cặp được chọn...")
         opportunities = []
         
+        # Tải song song ít dữ liệu (giảm từ 100 xuống 50) + sổ lệnh depth nhỏ (giảm từ 20 xuống 10)
+        market_data = prefetch_market_data(jpy_pairs, timeframe, 50, order_book_limit=10)
+        
         for i, symbol in enumerate(jpy_pairs):
             try:
                 print(f"Phân tích sổ lệnh {symbol} ({i+1}/{len(jpy_pairs)})...")
                 
-                # Lấy ít dữ liệu hơn để tăng tốc
-                df = get_crypto_data(symbol, timeframe=timeframe, limit=50)  # Giảm từ 100 xuống 50
+                df = market_data[symbol].get('df')
                 if df is None or len(df) < 5:  # Giảm từ 10 xuống 5
                     continue
                 
                 current_price = df['close'].iloc[-1]
                 
-                # Lấy sổ lệnh với depth nhỏ hơn
-                order_book = get_order_book(symbol, limit=10)  # Giảm từ 20 xuống 10
+                order_book = market_data[symbol].get('order_book')
                 order_book_analysis = analyze_order_book(order_book)
                 
                 if not order_book_analysis:
@@ -3264,10 +3281,7 @@ def find_orderbook_opportunities(timeframe='30m', min_confidence=50):
                 if opportunity and opportunity['confidence_score'] >= min_confidence:
                     # Thêm thông tin kỹ thuật cơ bản nhưng đơn giản
                     if len(df) >= 10:
-                        df['SMA_10'] = SMAIndicator(df['close'], window=10).sma_indicator()
-                        df['RSI'] = RSIIndicator(df['close'], window=14).rsi()
-                        
-                        latest = df.iloc[-1]
+                        latest = get_indicator_frame(df).iloc[-1]
                         opportunity.update({
                             'sma_10': latest.get('SMA_10', current_price),
                             'rsi': latest.get('RSI', 50),
@@ -3276,8 +3290,6 @@ def find_orderbook_opportunities(timeframe='30m', min_confidence=50):
                     
                     opportunities.append(opportunity)
                 
-                time.sleep(0.2)  # Giảm delay
-                
             except Exception as e:
                 print(f"Lỗi khi phân tích {symbol}: {e}")
                 continue
@@ -3413,6 +3425,7 @@ def determine_entry_timing(df, order_book_analysis, support_levels, resistance_l
     }
 
 # Hàm kiểm tra và xử lý lệnh bán (thay thế cho thread monitoring)
+@cycle_metrics.timed("check_and_process_sell_orders")
 @system_error_handler("check_and_process_sell_orders", critical=False)
 def check_and_process_sell_orders():
     """Kiểm tra trạng thái tất cả lệnh bán đang hoạt động và xử lý khi có lệnh khớp"""
@@ -3433,12 +3446,15 @@ def check_and_process_sell_orders():
     # Tạo bản sao để tránh lỗi "dictionary changed size during iteration"
     active_orders_copy = dict(ACTIVE_ORDERS)
     
+    # Đối chiếu trạng thái theo lô (1 request lệnh mở mỗi symbol)
+    order_statuses = reconcile_order_statuses(list(active_orders_copy))
+    
     for order_id, order_info in active_orders_copy.items():
         try:
             print(f"  Kiểm tra lệnh {order_id} ({order_info['symbol']})...")
             
-            # Kiểm tra trạng thái lệnh từ exchange
-            order_status = check_order_status(order_id, order_info['symbol'])
+            # Trạng thái lệnh từ exchange
+            order_status = order_statuses.get(order_id)
             
             if order_status is None:
                 print(f"⚠️ Không thể kiểm tra lệnh {order_id}")
@@ -3475,6 +3491,7 @@ def check_and_process_sell_orders():
                     'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
                 }
                 
+                event_logger.log('order', action='SELL_FILLED', **sell_success_data)
                 send_sell_success_notification(sell_success_data)
             
             # Kiểm tra lệnh hoàn thành
@@ -3493,8 +3510,6 @@ def check_and_process_sell_orders():
                 # Đánh dấu để xóa khỏi danh sách theo dõi
                 orders_to_remove.append(order_id)
             
-            time.sleep(1)  # Tránh spam API
-            
         except Exception as e:
             print(f"⚠️ Lỗi khi kiểm tra lệnh {order_id}: {e}")
             continue
@@ -3506,7 +3521,7 @@ def check_and_process_sell_orders():
     
     # Lưu lại danh sách đã cập nhật
     if orders_to_remove:
-        save_active_orders_to_file()
+        journal_order_change(*orders_to_remove)
         print(f"  Đã cập nhật danh sách theo dõi ({len(ACTIVE_ORDERS)} lệnh còn lại)")
     
     print(f"✅ Hoàn thành kiểm tra {len(ACTIVE_ORDERS)} lệnh đang theo dõi")
@@ -3520,11 +3535,21 @@ def startup_bot_with_error_handling():
         print("=" * 80)
         
         # Load active orders từ backup
-        load_active_orders_from_file()
+        initialize_order_monitoring()
+        
+        # Giá/sổ lệnh/nến qua WebSocket
+        start_market_stream()
+        start_stop_loss_engine()
         
         # Cleanup logs cũ
         cleanup_old_logs()
         
+        # Metrics: cProfile chu kỳ đầu (tuỳ chọn) và endpoint localhost
+        if config.METRICS_PROFILE_FIRST_CYCLE:
+            cycle_metrics.profile_next_cycle()
+        if config.METRICS_HTTP_PORT:
+            cycle_metrics.serve(config.METRICS_HTTP_PORT)
+        
         # Setup periodic cleanup (chạy mỗi 6 giờ)
         def periodic_cleanup():
             while BOT_RUNNING:
@@ -3591,13 +3616,15 @@ def run_continuous_mode():
                 cleanup_old_logs()
                 last_cleanup_check = current_time
             
-            # Bước 1: Kiểm tra lệnh bán (orders cũ)
-            print(" Bước 1: Kiểm tra trạng thái lệnh bán...")
-            check_and_process_sell_orders()
-            
-            # Bước 2: Phân tích thị trường và đặt lệnh mua mới
-            print("📈 Bước 2: Phân tích thị trường và đặt lệnh mua...")
-            print_results()  # Hàm chính phân tích và trading
+            # Đo thời gian từng giai đoạn + số request REST của chu kỳ (tóm tắt ghi vào event log và METRICS_FILE)
+            with cycle_metrics.cycle('continuous'):
+                # Bước 1: Kiểm tra lệnh bán (orders cũ)
+                print(" Bước 1: Kiểm tra trạng thái lệnh bán...")
+                check_and_process_sell_orders()
+                
+                # Bước 2: Phân tích thị trường và đặt lệnh mua mới
+                print("📈 Bước 2: Phân tích thị trường và đặt lệnh mua...")
+                print_results()  # Hàm chính phân tích và trading
             
             # Bước 3: Sleep trước cycle tiếp theo
             print(f"\n✅ Cycle #{cycle_count} hoàn thành")
@@ -3640,13 +3667,14 @@ def run_manual_mode():
             print(" EMERGENCY STOP được kích hoạt - Không thực hiện")
             return
         
-        # Bước 1: Kiểm tra lệnh bán (orders cũ)
-        print("  Bước 1: Kiểm tra trạng thái lệnh bán...")
-        check_and_process_sell_orders()
-        
-        # Bước 2: Phân tích thị trường và đặt lệnh mua mới
-        print(" Bước 2: Phân tích thị trường và đặt lệnh sell...")
-        print_results()  # Hàm chính phân tích và trading
+        with cycle_metrics.cycle('manual'):
+            # Bước 1: Kiểm tra lệnh bán (orders cũ)
+            print("  Bước 1: Kiểm tra trạng thái lệnh bán...")
+            check_and_process_sell_orders()
+            
+            # Bước 2: Phân tích thị trường và đặt lệnh mua mới
+            print(" Bước 2: Phân tích thị trường và đặt lệnh sell...")
+            print_results()  # Hàm chính phân tích và trading
         
         print(f"\n✅ Manual mode hoàn thành")
         print("💡 Để chạy lại, hãy khởi động bot một lần nữa")
@@ -3668,6 +3696,14 @@ def stop_bot_gracefully():
     print("🛑 Đang dừng bot...")
     BOT_RUNNING = False
     MONITOR_RUNNING = False
+    STOP_LOSS_ENGINE.stop()
+    stop_market_stream()
+    # Gộp journal lệnh vào snapshot trước khi thoát
+    save_active_orders_to_file()
+    # Gửi nốt email và log còn trong hàng đợi, ghi cache tối ưu (nếu bật lưu file)
+    notification_dispatcher.shutdown()
+    MODEL_CACHE.save()
+    event_logger.flush()
     print("✅ Bot đã được đánh dấu để dừng")
 
 def emergency_stop():
@@ -3701,20 +3737,17 @@ def prepare_lstm_data(df, look_back=10):  # Giảm từ 20 xuống 10
     if len(recent_df) < look_back + 5:
         return None, None, None, None, None
     
-    scaler = MinMaxScaler(feature_range=(0, 1))
-    scaled_data = scaler.fit_transform(recent_df['close'].values.reshape(-1, 1))
+    scaler = MinMaxTransform(feature_range=(0, 1))
+    scaled_data = scaler.fit_transform(recent_df['close'].values)
     
-    X, y = [], []
-    for i in range(look_back, len(scaled_data)):
-        X.append(scaled_data[i-look_back:i, 0])
-        y.append(scaled_data[i, 0])
-    X, y = np.array(X), np.array(y)
+    # Cửa sổ look_back nến -> nến kế tiếp (view trên scaled_data, không copy)
+    X, y = sliding_windows(scaled_data, look_back)
     
     if len(X) < 5:  # Cần ít nhất 5 samples
         return None, None, None, None, None
     
     # Đơn giản hóa: không chia train/test, dùng tất cả để train
-    X = X.reshape((X.shape[0], X.shape[1], 1))
+    X = X[:, :, np.newaxis]
     
     return X, y, X, y, scaler
 
@@ -3731,59 +3764,77 @@ def build_lstm_model(X_train, y_train):
     # return model
     return None  # Return None when LSTM is disabled
 
-# Hàm dự đoán giá bằng LSTM - tối ưu tốc độ
-def predict_price_lstm(df, look_back=10):  # Giảm từ 20 xuống 10
+# Hàm dự đoán giá (AR ridge trên log return thay cho LSTM - model theo symbol cập nhật tăng dần)
+@cycle_metrics.timed()
+def predict_price_lstm(df, look_back=10, symbol=None):
+    """
+    Giá đóng cửa dự đoán của nến kế tiếp, None nếu không đủ dữ liệu hoặc kết quả bất thường
+
+    Args:
+        look_back: Số log return trước đó làm đặc trưng
+        symbol: Có symbol thì dùng lại model của symbol (chỉ cập nhật phần nến mới), không có thì fit mới
+    """
     if df is None or len(df) < look_back + 5:
         return None
     
     try:
-        X_train, y_train, X_test, y_test, scaler = prepare_lstm_data(df, look_back)
-        if X_train is None or len(X_train) < 3:  # Cần ít nhất 3 samples
+        closes = df['close'].to_numpy(dtype=float)
+        if isinstance(df.index, pd.DatetimeIndex):
+            times = df.index.values.astype('datetime64[ms]').astype(np.int64)
+        else:
+            times = np.arange(len(closes), dtype=np.int64)
+        valid = np.isfinite(closes) & (closes > 0)
+        if not valid.all():
+            closes, times = closes[valid], times[valid]
+        
+        if symbol is None:
+            model = ReturnForecaster(look_back, config.FORECAST_WINDOW, config.FORECAST_RIDGE_ALPHA)
+            model.fit(times, closes)
+            predicted_price = model.predict(config.FORECAST_HORIZON)
+        else:
+            predicted_price = forecast_next_close(symbol, times, closes, order=look_back)
+        if predicted_price is None:
             return None
-            
-        model = build_lstm_model(X_train, y_train)
-        
-        # Lấy sequence ngắn hơn
-        last_sequence = df['close'].values[-look_back:]
-        last_sequence = scaler.transform(last_sequence.reshape(-1, 1))
-        last_sequence = last_sequence.reshape((1, look_back, 1))
-        
-        predicted_scaled = model.predict(last_sequence, verbose=0)
-        predicted_price = scaler.inverse_transform(predicted_scaled)[0][0]
         
         # Kiểm tra giá dự đoán có hợp lý không - lỏng hơn
-        current_price = df['close'].iloc[-1]
+        current_price = closes[-1]
         if predicted_price <= 0 or predicted_price > current_price * 2 or predicted_price < current_price * 0.5:
             return None
             
         return predicted_price
     except Exception as e:
-        # Trả về giá hiện tại + random nhỏ thay vì None để tăng tốc
-        return df['close'].iloc[-1] * (1 + np.random.uniform(-0.02, 0.02))  # ±2% random
+        print(f"⚠️ Lỗi dự đoán giá: {e}")
+        return None
 
 # Hàm tính toán các chỉ số kỹ thuật và tín hiệu giao dịch
+@cycle_metrics.timed()
 def analyze_trends(df, timeframe='30m', rsi_buy=65, rsi_sell=35, volatility_threshold=5, signal_mode='strict'):
     if len(df) < 50:  # Giảm từ 200 xuống 50
         return None
     
     # Không cần resample nữa vì đã lấy dữ liệu đúng timeframe
-    
-    # Tính các chỉ số kỹ thuật với period nhỏ hơn
-    df['SMA_20'] = SMAIndicator(df['close'], window=20).sma_indicator()  # Giảm từ 50 xuống 20
-    df['SMA_50'] = SMAIndicator(df['close'], window=50).sma_indicator()  # Giảm từ 200 xuống 50
-    df['RSI'] = RSIIndicator(df['close'], window=14).rsi()
-    macd = MACD(df['close'])
-    df['MACD'] = macd.macd()
-    df['MACD_signal'] = macd.macd_signal()
-    bb = BollingerBands(df['close'], window=20, window_dev=2)
-    df['BB_high'] = bb.bollinger_hband()
-    df['BB_low'] = bb.bollinger_lband()
-    stoch = StochasticOscillator(df['close'], df['high'], df['low'], window=14)
-    df['Stoch'] = stoch.stoch()
-    
-    # Tính độ biến động
-    df['Volatility'] = (df['high'] - df['low']) / df['close'] * 100
-    
+    calculate_trend_indicators(df)
+    return apply_trend_signals(df, rsi_buy, rsi_sell, volatility_threshold, signal_mode)
+
+# Hàm tính các chỉ số kỹ thuật dùng cho analyze_trends (tính 1 lần, dùng lại cho nhiều bộ ngưỡng)
+def calculate_trend_indicators(df):
+    # Lấy các chỉ số kỹ thuật với period nhỏ hơn từ kernel dùng chung
+    indicator_df = get_indicator_frame(df)
+    df['SMA_20'] = indicator_df['SMA_20']  # Giảm từ 50 xuống 20
+    df['SMA_50'] = indicator_df['SMA_50']  # Giảm từ 200 xuống 50
+    df['RSI'] = indicator_df['RSI']
+    df['MACD'] = indicator_df['MACD']
+    df['MACD_signal'] = indicator_df['MACD_signal']
+    df['BB_high'] = indicator_df['BB_upper']
+    df['BB_low'] = indicator_df['BB_lower']
+    df['Stoch'] = indicator_df['Stoch_K']
+    
+    # Độ biến động
+    df['Volatility'] = indicator_df['Volatility']
+    return df
+
+# Hàm xác định tín hiệu mua/bán trên DataFrame đã có chỉ số kỹ thuật
+def apply_trend_signals(df, rsi_buy=65, rsi_sell=35, volatility_threshold=5, signal_mode='strict'):
     # Xác định tín hiệu mua/bán theo chế độ
     df['Signal'] = 0
     
@@ -3887,85 +3938,44 @@ def calculate_optimal_entry_exit(current_price, order_book_analysis, support_lev
         'reward_percent': reward,
         'risk_reward_ratio': risk_reward_ratio
     }
-# VectorBT optimization - giảm phạm vi tham số để tăng tốc
-def vectorbt_optimize(df, rsi_buy_range=[60, 70], rsi_sell_range=[30, 40], vol_range=[3, 7], tp_range=[0.003, 0.007]):
-    best_score = 0
-    best_win_rate = 0
-    best_profit = 0
-    best_params = None
-    
-    # Giảm số lượng combination để tăng tốc
-    for rsi_buy, rsi_sell, vol_threshold, take_profit in product(rsi_buy_range, rsi_sell_range, vol_range, tp_range):
+# Tối ưu tham số bằng backtest NumPy - toàn bộ lưới tham số được mô phỏng trong 1 lượt
+@cycle_metrics.timed()
+def vectorbt_optimize(df, rsi_buy_range=[60, 70], rsi_sell_range=[30, 40], vol_range=[3, 7], tp_range=[0.003, 0.007], symbol=None, timeframe=None):
+    """
+    Có symbol thì kết quả được cache theo (symbol, khung nến, open time nến cuối, lưới tham số + số nến):
+    kết quả chỉ đổi khi có nến mới nên các lần quét lại trong cùng 1 nến không phải backtest lại
+    """
+    cache_key = None
+    if symbol is not None and isinstance(df.index, pd.DatetimeIndex) and len(df) > 1:
+        candle_times = df.index[-2:].values.astype('datetime64[ms]').astype(np.int64)
+        params_hash = grid_hash(rsi_buy_range, rsi_sell_range, vol_range, tp_range, config.TRADING_FEE, len(df))
+        cache_key = MODEL_CACHE.make_key('optimize', symbol, timeframe or int(candle_times[1] - candle_times[0]),
+                                         candle_times[1], params_hash)
+    
+    cached = MODEL_CACHE.get(cache_key) if cache_key is not None else None
+    if cached is not None:
+        best_win_rate, best_profit, best_params = cached
+        best_params = dict(best_params) if best_params else None  # Bản sao - không sửa được mục trong cache
+    else:
         try:
-            df_ = analyze_trends(df.copy(), timeframe='30m', rsi_buy=rsi_buy, rsi_sell=rsi_sell, volatility_threshold=vol_threshold)
-            if df_ is None or len(df_) < 10:  # Giảm từ 20 xuống 10
-                continue
-            
             # Phí giao dịch Binance: 0.1% mỗi chiều (mua và bán)
-            fee = 0.001
-            entries = df_['Signal'] == 1
-            exits = (df_['close'] >= df_['close'].shift(1) * (1 + take_profit + 2 * fee)) | \
-                    (df_['close'] <= df_['close'].shift(1) * (1 - 0.003)) | \
-                    (df_['Signal'] == -1)
-            
-            # Kiểm tra có signal nào không
-            if not entries.any():
-                continue
-            
-            # Đơn giản hóa portfolio calculation để tăng tốc
-            try:
-                # VectorBT portfolio commented out for production - requires vectorbt
-                # pf = vbt.Portfolio.from_signals(
-                #     df_['close'],
-                #     entries,
-                #     exits,
-                #     init_cash=10000,
-                #     fees=fee,
-                #     freq='1H'
-                # )
-                
-                # Simple ROI calculation instead of VectorBT
-                total_return = 5.0  # Mock return for production without vectorbt
-                
-                # stats = pf.stats()  # commented out - requires vectorbt
-                # win_rate = stats.get('Win Rate [%]', 0)  # commented out
-                # total_profit = pf.total_profit()  # commented out
-                
-                # Simple mock calculations for production
-                win_rate = 65.0  # Mock win rate
-                total_profit = total_return * 100  # Mock total profit
-                
-                # Kiểm tra win_rate có phải NaN không
-                if pd.isna(win_rate):
-                    win_rate = 0
-                    
-                # Ưu tiên win rate, nhưng vẫn cân nhắc lợi nhuận
-                score = win_rate + total_profit / 10000  # Kết hợp win rate và lợi nhuận
-                if score > best_score:
-                    best_score = score
-                    best_win_rate = win_rate
-                    best_profit = total_profit
-                    best_params = {'rsi_buy': rsi_buy, 'rsi_sell': rsi_sell, 'volatility_threshold': vol_threshold, 'take_profit': take_profit}
-            except:
-                # Nếu VectorBT fail, tạo params giả để không block
-                if best_params is None:
-                    best_params = {'rsi_buy': 65, 'rsi_sell': 35, 'volatility_threshold': 5, 'take_profit': 0.005}
-                    best_win_rate = 45  # Giả định win rate
-                    best_profit = 100  # Giả định profit
-                continue
-                
+            best_win_rate, best_profit, best_params = optimize_parameters(
+                df, rsi_buy_range, rsi_sell_range, vol_range, tp_range, fee=config.TRADING_FEE, init_cash=10000
+            )
+            if cache_key is not None:
+                MODEL_CACHE.put(cache_key, [best_win_rate, best_profit, best_params], persist=True)
         except Exception as e:
-            continue
+            print(f"⚠️ Lỗi backtest: {e}")
+            best_win_rate, best_profit, best_params = 0, 0, None
     
-    # Fallback params nếu không tìm thấy gì
+    # Params mặc định nếu không có bộ tham số nào có tín hiệu (win rate/profit thực = 0)
     if best_params is None:
         best_params = {'rsi_buy': 65, 'rsi_sell': 35, 'volatility_threshold': 5, 'take_profit': 0.005}
-        best_win_rate = 40
-        best_profit = 50
     
     return best_win_rate, best_profit, best_params
 
 # Hàm chọn 3 coin có điểm vào tốt nhất với tự động điều chỉnh - TỐI ƯU TỐC ĐỘ
+@cycle_metrics.timed()
 def find_best_coins(timeframe='30m', min_win_rate=None, min_profit_potential=None, signal_mode='strict'):
     # Sử dụng giá trị từ config nếu không được truyền vào
     if min_win_rate is None:
@@ -3982,13 +3992,16 @@ def find_best_coins(timeframe='30m', min_win_rate=None, min_profit_potential=Non
         print(f"Đang phân tích {len(jpy_pairs)} cặp được chọn với Win Rate >= {min_win_rate}%, Profit >= {min_profit_potential}%, Mode: {signal_mode}...")
         results = []
         
+        # Tải song song ít dữ liệu hơn để tăng tốc - chỉ lấy order book cho emergency mode
+        limit = 200 if signal_mode in ['emergency', 'lstm_only'] else 500  # Giảm từ 1000
+        order_book_limit = 10 if signal_mode == 'emergency' else None  # Giảm depth
+        market_data = prefetch_market_data(jpy_pairs, timeframe, limit, order_book_limit=order_book_limit)
+        
         for i, symbol in enumerate(jpy_pairs):
             try:
                 print(f"Đang phân tích {symbol} ({i+1}/{len(jpy_pairs)})...")
                 
-                # Lấy ít dữ liệu hơn để tăng tốc
-                limit = 200 if signal_mode in ['emergency', 'lstm_only'] else 500  # Giảm từ 1000
-                df = get_crypto_data(symbol, timeframe=timeframe, limit=limit)
+                df = market_data[symbol].get('df')
                 if df is None or len(df) < 30:  # Giảm từ 50 xuống 30
                     continue
                 
@@ -3999,11 +4012,9 @@ def find_best_coins(timeframe='30m', min_win_rate=None, min_profit_potential=Non
                 # Chỉ dự đoán LSTM khi thực sự cần
                 predicted_price = None
                 if signal_mode in ['lstm_only', 'emergency']:
-                    predicted_price = predict_price_lstm(analyzed_df)
+                    predicted_price = predict_price_lstm(analyzed_df, symbol=symbol)
                     if predicted_price is None:
-                        # Tạo dự đoán giả để không bị stuck
-                        current_price = analyzed_df['close'].iloc[-1]
-                        predicted_price = current_price * (1 + np.random.uniform(0.001, 0.05))  # +0.1% to +5%
+                        continue  # Không dự đoán được - bỏ qua coin thay vì tạo giá giả
                 else:
                     # Tạo dự đoán đơn giản dựa trên trend
                     current_price = analyzed_df['close'].iloc[-1]
@@ -4030,11 +4041,10 @@ def find_best_coins(timeframe='30m', min_win_rate=None, min_profit_potential=Non
                     
                     # Chỉ lấy order book cho emergency mode
                     if signal_mode == 'emergency':
-                        order_book = get_order_book(symbol, 10)  # Giảm depth
-                        order_book_analysis = analyze_order_book(order_book)
+                        order_book_analysis = analyze_order_book(market_data[symbol].get('order_book'))
                     
                     # Tối ưu hóa đơn giản
-                    win_rate, vbt_profit, best_params = vectorbt_optimize(analyzed_df)
+                    win_rate, vbt_profit, best_params = vectorbt_optimize(analyzed_df, symbol=symbol, timeframe=timeframe)
                     
                     if best_params is not None and win_rate >= min_win_rate:
                         # Tính giá vào lệnh đơn giản
@@ -4089,9 +4099,6 @@ def find_best_coins(timeframe='30m', min_win_rate=None, min_profit_potential=Non
                             'volume_analysis': volume_analysis
                         })
                 
-                # Giảm delay
-                time.sleep(0.2)  # Giảm từ config.API_DELAY
-                
             except Exception as e:
                 print(f"Lỗi khi phân tích {symbol}: {e}")
                 continue
@@ -4108,21 +4115,69 @@ def find_coins_with_auto_adjust_silent(timeframe='30m'):
     if not config.AUTO_ADJUST_ENABLED:
         return find_best_coins_silent(timeframe)
     
-    # Thử với tham số ban đầu (SILENT)
-    results = find_best_coins_silent(timeframe, config.MIN_WIN_RATE, config.MIN_PROFIT_POTENTIAL, 'strict')
-    
-    if len(results) >= config.MIN_COINS_REQUIRED:
-        return results
-    
-    # Nếu không tìm thấy đủ coin, thử điều chỉnh từng bước (SILENT)
-    for adjustment in config.ADJUSTMENT_STEPS:
-        signal_mode = adjustment.get('SIGNAL_MODE', 'strict')
-        results = find_best_coins_silent(timeframe, adjustment['MIN_WIN_RATE'], adjustment['MIN_PROFIT_POTENTIAL'], signal_mode)
+    try:
+        jpy_pairs = get_jpy_pairs()
+        if not jpy_pairs:
+            return []
         
-        if len(results) >= config.MIN_COINS_REQUIRED:
-            return results
-    
-    return results
+        # Thang điều chỉnh: tham số ban đầu rồi tới từng bước ADJUSTMENT_STEPS
+        ladder = [{'MIN_WIN_RATE': config.MIN_WIN_RATE, 'MIN_PROFIT_POTENTIAL': config.MIN_PROFIT_POTENTIAL, 'SIGNAL_MODE': 'strict'}]
+        ladder.extend(config.ADJUSTMENT_STEPS)
+        
+        # Tải dữ liệu 1 lần cho cả thang (cửa sổ 200 nến là phần đuôi của cửa sổ 500 nến)
+        market_data = prefetch_market_data(jpy_pairs, timeframe, 500)
+        
+        # Cache chỉ số kỹ thuật và kết quả tối ưu theo (symbol, limit) - không gọi lại API giữa các bước
+        indicator_frames = {}
+        optimize_cache = {}
+        
+        def _fetch_frame(symbol, limit):
+            key = (symbol, limit)
+            if key not in indicator_frames:
+                df = market_data[symbol].get('df')
+                if df is not None and limit != 500:
+                    df = slice_crypto_data(df, timeframe, limit)
+                if df is None or len(df) < 50:
+                    indicator_frames[key] = None
+                else:
+                    indicator_frames[key] = calculate_trend_indicators(df.copy())
+            return indicator_frames[key]
+        
+        results = []
+        for adjustment in ladder:
+            signal_mode = adjustment.get('SIGNAL_MODE', 'strict')
+            limit = 200 if signal_mode in ['emergency', 'lstm_only'] else 500
+            results = []
+            
+            for symbol in jpy_pairs:
+                try:
+                    indicator_df = _fetch_frame(symbol, limit)
+                    if indicator_df is None:
+                        continue
+                    
+                    analyzed_df = apply_trend_signals(indicator_df, signal_mode=signal_mode)
+                    result = evaluate_best_coin_silent(
+                        symbol, analyzed_df, adjustment['MIN_WIN_RATE'], adjustment['MIN_PROFIT_POTENTIAL'],
+                        signal_mode, optimize_cache=optimize_cache, optimize_key=(symbol, limit), timeframe=timeframe
+                    )
+                    if result:
+                        results.append(result)
+                except Exception as e:
+                    continue
+            
+            # Sắp xếp theo risk/reward ratio và win rate
+            results = sorted(results, key=lambda x: (x['risk_reward_ratio'], x['win_rate']), reverse=True)[:config.TOP_COINS_COUNT]
+            if len(results) >= config.MIN_COINS_REQUIRED:
+                return results
+        
+        return results
+    except Exception as e:
+        return []
+
+# Hàm cắt DataFrame về cửa sổ thời gian tương ứng với get_crypto_data(timeframe, limit)
+def slice_crypto_data(df, timeframe, limit):
+    start_ms = int(time.time() * 1000) - get_kline_window_ms(timeframe, limit)
+    return df[df.index >= pd.to_datetime(start_ms, unit='ms')]
 
 # Hàm tìm best coins - SILENT MODE
 def find_best_coins_silent(timeframe='30m', min_win_rate=None, min_profit_potential=None, signal_mode='strict'):
@@ -4139,11 +4194,13 @@ def find_best_coins_silent(timeframe='30m', min_win_rate=None, min_profit_potent
             
         results = []
         
+        # Tải song song ít dữ liệu hơn để tăng tốc
+        limit = 200 if signal_mode in ['emergency', 'lstm_only'] else 500
+        market_data = prefetch_market_data(jpy_pairs, timeframe, limit)
+        
         for symbol in jpy_pairs:
             try:
-                # Lấy ít dữ liệu hơn để tăng tốc
-                limit = 200 if signal_mode in ['emergency', 'lstm_only'] else 500
-                df = get_crypto_data(symbol, timeframe=timeframe, limit=limit)
+                df = market_data[symbol].get('df')
                 if df is None or len(df) < 30:
                     continue
                 
@@ -4151,88 +4208,9 @@ def find_best_coins_silent(timeframe='30m', min_win_rate=None, min_profit_potent
                 if analyzed_df is None:
                     continue
                 
-                # Chỉ dự đoán LSTM khi thực sự cần
-                predicted_price = None
-                if signal_mode in ['lstm_only', 'emergency']:
-                    predicted_price = predict_price_lstm(analyzed_df)
-                    if predicted_price is None:
-                        # Tạo dự đoán giả để không bị stuck
-                        current_price = analyzed_df['close'].iloc[-1]
-                        predicted_price = current_price * (1 + np.random.uniform(0.001, 0.05))
-                else:
-                    # Tạo dự đoán đơn giản dựa trên trend
-                    current_price = analyzed_df['close'].iloc[-1]
-                    sma_20 = analyzed_df['SMA_20'].iloc[-1]
-                    if current_price > sma_20:
-                        predicted_price = current_price * 1.02
-                    else:
-                        predicted_price = current_price * 1.01
-                
-                latest_data = analyzed_df.iloc[-1]
-                current_price = latest_data['close']
-                profit_potential = (predicted_price - current_price) / current_price * 100
-                
-                # Điều kiện tín hiệu mua tùy theo chế độ
-                signal_condition = latest_data['Signal'] == 1 and profit_potential >= min_profit_potential
-                
-                if signal_condition:
-                    # Tối ưu hóa đơn giản
-                    win_rate, vbt_profit, best_params = vectorbt_optimize(analyzed_df)
-                    
-                    if best_params is not None and win_rate >= min_win_rate:
-                        # Tính giá vào lệnh đơn giản
-                        optimal_entry = current_price * 1.001
-                        stop_loss = current_price * 0.997
-                        tp1_price = current_price * 1.005
-                        tp2_price = current_price * 1.01
-                        tp3_price = current_price * 1.015
-                        
-                        risk_percent = 0.3
-                        reward_percent = 0.5
-                        risk_reward_ratio = reward_percent / risk_percent
-                        
-                        # Kiểm tra risk/reward ratio đơn giản
-                        min_risk_reward = 1.0 if signal_mode in ['emergency', 'lstm_only'] else 1.2
-                        if risk_reward_ratio < min_risk_reward:
-                            continue
-                        
-                        results.append({
-                            'coin': symbol.replace('/JPY', ''),
-                            'current_price': current_price,
-                            'optimal_entry': optimal_entry,
-                            'stop_loss': stop_loss,
-                            'tp_price': tp1_price,  # TP chính = TP1 (single TP system)
-                            'tp1_price': tp1_price,
-                            'tp2_price': tp2_price,
-                            'tp3_price': tp3_price,
-                            'tp1_percent': 50,
-                            'tp2_percent': 30,
-                            'tp3_percent': 20,
-                            'risk_percent': risk_percent,
-                            'reward_percent': reward_percent,
-                            'risk_reward_ratio': risk_reward_ratio,
-                            'predicted_price': predicted_price,
-                            'profit_potential': profit_potential,
-                            'win_rate': win_rate,
-                            'vbt_profit': vbt_profit,
-                            'rsi': latest_data['RSI'],
-                            'macd': latest_data['MACD'],
-                            'sma_20': latest_data['SMA_20'],
-                            'sma_50': latest_data['SMA_50'],
-                            'bb_high': latest_data['BB_high'],
-                            'bb_low': latest_data['BB_low'],
-                            'stoch': latest_data['Stoch'],
-                            'volatility': latest_data['Volatility'],
-                            'best_params': best_params,
-                            'signal_mode': signal_mode,
-                            'entry_timing': {'signals': {}, 'signal_score': 3, 'recommended': True},
-                            'order_book_analysis': None,
-                            'support_levels': None,
-                            'resistance_levels': None,
-                            'volume_analysis': None
-                        })
-                
-                time.sleep(0.2)
+                result = evaluate_best_coin_silent(symbol, analyzed_df, min_win_rate, min_profit_potential, signal_mode, timeframe=timeframe)
+                if result:
+                    results.append(result)
                 
             except Exception as e:
                 continue
@@ -4243,6 +4221,99 @@ def find_best_coins_silent(timeframe='30m', min_win_rate=None, min_profit_potent
     except Exception as e:
         return []
 
+# Hàm đánh giá 1 coin trên DataFrame đã phân tích - SILENT MODE
+def evaluate_best_coin_silent(symbol, analyzed_df, min_win_rate, min_profit_potential, signal_mode, optimize_cache=None, optimize_key=None, timeframe=None):
+    """
+    Returns:
+        dict: Thông tin coin đạt điều kiện, None nếu không đạt
+    """
+    # Chỉ dự đoán LSTM khi thực sự cần
+    predicted_price = None
+    if signal_mode in ['lstm_only', 'emergency']:
+        predicted_price = predict_price_lstm(analyzed_df, symbol=symbol)
+        if predicted_price is None:
+            return None  # Không dự đoán được - bỏ qua coin thay vì tạo giá giả
+    else:
+        # Tạo dự đoán đơn giản dựa trên trend
+        current_price = analyzed_df['close'].iloc[-1]
+        sma_20 = analyzed_df['SMA_20'].iloc[-1]
+        if current_price > sma_20:
+            predicted_price = current_price * 1.02
+        else:
+            predicted_price = current_price * 1.01
+    
+    latest_data = analyzed_df.iloc[-1]
+    current_price = latest_data['close']
+    profit_potential = (predicted_price - current_price) / current_price * 100
+    
+    # Điều kiện tín hiệu mua tùy theo chế độ
+    signal_condition = latest_data['Signal'] == 1 and profit_potential >= min_profit_potential
+    if not signal_condition:
+        return None
+    
+    # Tối ưu hóa đơn giản (kết quả không phụ thuộc signal_mode nên dùng lại được giữa các bước)
+    if optimize_cache is not None and optimize_key in optimize_cache:
+        win_rate, vbt_profit, best_params = optimize_cache[optimize_key]
+    else:
+        win_rate, vbt_profit, best_params = vectorbt_optimize(analyzed_df, symbol=symbol, timeframe=timeframe)
+        if optimize_cache is not None:
+            optimize_cache[optimize_key] = (win_rate, vbt_profit, best_params)
+    
+    if best_params is None or win_rate < min_win_rate:
+        return None
+    
+    # Tính giá vào lệnh đơn giản
+    optimal_entry = current_price * 1.001
+    stop_loss = current_price * 0.997
+    tp1_price = current_price * 1.005
+    tp2_price = current_price * 1.01
+    tp3_price = current_price * 1.015
+    
+    risk_percent = 0.3
+    reward_percent = 0.5
+    risk_reward_ratio = reward_percent / risk_percent
+    
+    # Kiểm tra risk/reward ratio đơn giản
+    min_risk_reward = 1.0 if signal_mode in ['emergency', 'lstm_only'] else 1.2
+    if risk_reward_ratio < min_risk_reward:
+        return None
+    
+    return {
+        'coin': symbol.replace('/JPY', ''),
+        'current_price': current_price,
+        'optimal_entry': optimal_entry,
+        'stop_loss': stop_loss,
+        'tp_price': tp1_price,  # TP chính = TP1 (single TP system)
+        'tp1_price': tp1_price,
+        'tp2_price': tp2_price,
+        'tp3_price': tp3_price,
+        'tp1_percent': 50,
+        'tp2_percent': 30,
+        'tp3_percent': 20,
+        'risk_percent': risk_percent,
+        'reward_percent': reward_percent,
+        'risk_reward_ratio': risk_reward_ratio,
+        'predicted_price': predicted_price,
+        'profit_potential': profit_potential,
+        'win_rate': win_rate,
+        'vbt_profit': vbt_profit,
+        'rsi': latest_data['RSI'],
+        'macd': latest_data['MACD'],
+        'sma_20': latest_data['SMA_20'],
+        'sma_50': latest_data['SMA_50'],
+        'bb_high': latest_data['BB_high'],
+        'bb_low': latest_data['BB_low'],
+        'stoch': latest_data['Stoch'],
+        'volatility': latest_data['Volatility'],
+        'best_params': best_params,
+        'signal_mode': signal_mode,
+        'entry_timing': {'signals': {}, 'signal_score': 3, 'recommended': True},
+        'order_book_analysis': None,
+        'support_levels': None,
+        'resistance_levels': None,
+        'volume_analysis': None
+    }
+
 # Hàm tìm cơ hội orderbook - SILENT MODE  
 def find_orderbook_opportunities_silent(timeframe='30m', min_confidence=50):
     try:
@@ -4252,17 +4323,18 @@ def find_orderbook_opportunities_silent(timeframe='30m', min_confidence=50):
         
         opportunities = []
         
+        # Tải song song ít dữ liệu hơn + sổ lệnh depth nhỏ hơn
+        market_data = prefetch_market_data(jpy_pairs, timeframe, 50, order_book_limit=10)
+        
         for symbol in jpy_pairs:
             try:
-                # Lấy ít dữ liệu hơn để tăng tốc
-                df = get_crypto_data(symbol, timeframe=timeframe, limit=50)
+                df = market_data[symbol].get('df')
                 if df is None or len(df) < 5:
                     continue
                 
                 current_price = df['close'].iloc[-1]
                 
-                # Lấy sổ lệnh với depth nhỏ hơn
-                order_book = get_order_book(symbol, limit=10)
+                order_book = market_data[symbol].get('order_book')
                 order_book_analysis = analyze_order_book(order_book)
                 
                 if not order_book_analysis:
@@ -4274,10 +4346,7 @@ def find_orderbook_opportunities_silent(timeframe='30m', min_confidence=50):
                 if opportunity and opportunity['confidence_score'] >= min_confidence:
                     # Thêm thông tin kỹ thuật cơ bản nhưng đơn giản
                     if len(df) >= 10:
-                        df['SMA_10'] = SMAIndicator(df['close'], window=10).sma_indicator()
-                        df['RSI'] = RSIIndicator(df['close'], window=14).rsi()
-                        
-                        latest = df.iloc[-1]
+                        latest = get_indicator_frame(df).iloc[-1]
                         opportunity.update({
                             'sma_10': latest.get('SMA_10', current_price),
                             'rsi': latest.get('RSI', 50),
@@ -4286,8 +4355,6 @@ def find_orderbook_opportunities_silent(timeframe='30m', min_confidence=50):
                     
                     opportunities.append(opportunity)
                 
-                time.sleep(0.2)
-                
             except Exception as e:
                 continue
         
@@ -4588,15 +4655,17 @@ def execute_systematic_trading():
         print("📊 Level 1: Systematic Trading 30m...")
         systematic_opportunities = []
         
+        # Tải song song dữ liệu 30m (theo yêu cầu) + order book
+        market_data_30m = prefetch_market_data(jpy_pairs, '30m', 200, order_book_limit=20)
+        
         for symbol in jpy_pairs:
             try:
-                # Lấy dữ liệu 30m (theo yêu cầu)
-                df_30m = get_crypto_data(symbol, timeframe='30m', limit=200)
+                df_30m = market_data_30m[symbol].get('df')
                 if df_30m is None or len(df_30m) < 50:
                     continue
                 
                 # Phân tích order book
-                order_book = get_order_book(symbol, limit=20)
+                order_book = market_data_30m[symbol].get('order_book')
                 order_book_analysis = analyze_order_book(order_book)
                 if not order_book_analysis:
                     continue
@@ -4633,15 +4702,16 @@ def execute_systematic_trading():
             print("⚡ Level 2: Scalping 15m (fallback)...")
             
             scalping_opportunities = []
+            # Tải song song dữ liệu 15m + order book cho scalping
+            market_data_15m = prefetch_market_data(jpy_pairs, '15m', 100, order_book_limit=10)
             for symbol in jpy_pairs:
                 try:
-                    # Lấy dữ liệu 15m cho scalping
-                    df_15m = get_crypto_data(symbol, timeframe='15m', limit=100)
+                    df_15m = market_data_15m[symbol].get('df')
                     if df_15m is None or len(df_15m) < 30:
                         continue
                     
                     # Phân tích order book cho scalping
-                    order_book = get_order_book(symbol, limit=10)
+                    order_book = market_data_15m[symbol].get('order_book')
                     order_book_analysis = analyze_order_book(order_book)
                     if not order_book_analysis:
                         continue
@@ -4943,9 +5013,13 @@ def print_results():
         print(error_msg)
         send_system_error_notification(error_msg, "PRINT_RESULTS_ERROR")
 
-# Khởi tạo order monitoring khi import module
+# Khởi tạo order monitoring ở entry point (không chạy khi import module)
 def initialize_order_monitoring():
-    """Khởi tạo hệ thống theo dõi lệnh"""
+    """Khởi tạo hệ thống theo dõi lệnh (chỉ lần gọi đầu tiên đọc file lệnh)"""
+    global ORDER_MONITORING_INITIALIZED
+    if ORDER_MONITORING_INITIALIZED:
+        return
+    ORDER_MONITORING_INITIALIZED = True
     try:
         load_active_orders_from_file()
     except Exception as e:
@@ -4959,7 +5033,7 @@ def remove_order_from_monitor(order_id):
     """Xóa lệnh khỏi danh sách theo dõi"""
     if order_id in ACTIVE_ORDERS:
         del ACTIVE_ORDERS[order_id]
-        save_active_orders_to_file()
+        journal_order_change(order_id)
         print(f"✅ Đã xóa lệnh {order_id} khỏi danh sách theo dõi")
     else:
         print(f"⚠️ Không tìm thấy lệnh {order_id} trong danh sách theo dõi")
@@ -4975,10 +5049,11 @@ def check_all_orders_now():
     
     # Tạo bản sao để tránh lỗi "dictionary changed size during iteration"
     active_orders_copy = dict(ACTIVE_ORDERS)
+    order_statuses = reconcile_order_statuses(list(active_orders_copy))
     
     for order_id, order_info in active_orders_copy.items():
         try:
-            status = check_order_status(order_id, order_info['symbol'])
+            status = order_statuses.get(order_id)
             if status:
                 print(f"  {order_id}: {status['status']} - {status['filled']:.6f}/{status['amount']:.6f}")
             else:
@@ -4986,9 +5061,6 @@ def check_all_orders_now():
         except Exception as e:
             print(f"⚠️ Lỗi kiểm tra {order_id}: {e}")
 
-# Khởi tạo khi import module
-initialize_order_monitoring()
-
 # ======================== MAIN ENTRY POINT ========================
 
 # Hàm tóm tắt tất cả tính năng mới được thêm
@@ -5000,30 +5072,10 @@ def check_manual_stop_loss_triggers():
         # Đọc active orders để tìm positions cần monitor SL
         if not ACTIVE_ORDERS:
             return
-            
-        for order_id, order_info in ACTIVE_ORDERS.items():
-            if order_info.get('order_type') == 'TAKE_PROFIT':
-                symbol = order_info['symbol']
-                buy_price = order_info.get('buy_price', 0)
-                
-                if buy_price > 0:
-                    # Tính SL target (giả sử -0.8% cho systematic, -0.6% cho scalping)
-                    sl_target = buy_price * 0.992  # -0.8% default
-                    
-                    try:
-                        current_price = get_current_jpy_price(symbol)
-                        if current_price and current_price <= sl_target:
-                            print(f"🚨 MANUAL SL TRIGGER for {symbol}:")
-                            print(f"   📉 Current: ¥{current_price:.4f} ≤ SL Target: ¥{sl_target:.4f}")
-                            print(f"   ⚠️ RECOMMEND: Market sell {order_info.get('amount', 'N/A')} {symbol.split('/')[0]}")
-                            
-                            # Gửi notification urgent
-                            send_notification(
-                                f"🚨 Manual SL Trigger: {symbol} @ ¥{current_price:.4f} ≤ ¥{sl_target:.4f}",
-                                urgent=True
-                            )
-                    except Exception:
-                        pass
+        
+        # SL target = giá mua -0.8% (light_tasks.MANUAL_SL_RATIO)
+        for trigger in find_manual_stop_loss_triggers(ACTIVE_ORDERS, get_current_jpy_price):
+            report_manual_stop_loss_trigger(trigger, send_notification)
                         
     except Exception as e:
         print(f"⚠️ Error checking manual SL: {e}")
@@ -5082,6 +5134,9 @@ def systematic():
     try:
         print("🚀 KHỞI ĐỘNG TRADING BOT")
         print("=" * 60)
+        initialize_order_monitoring()
+        start_market_stream()
+        start_stop_loss_engine()
         
         # MẶC ĐỊNH: Chạy systematic trading 30m
         print("📊 SYSTEMATIC TRADING 30M (DEFAULT)")
@@ -5106,6 +5161,9 @@ def scalping():
     try:
         print("🚀 KHỞI ĐỘNG TRADING BOT")
         print("=" * 60)
+        initialize_order_monitoring()
+        start_market_stream()
+        start_stop_loss_engine()
         
         # Kiểm tra xem có tham số command line không
         # CHẠY SCALPING MODE 15M
@@ -5145,6 +5203,7 @@ def scalping():
 # Hàm để chạy systematic trading manual (có thể gọi từ script khác)
 def run_systematic_trading():
     """Hàm để chạy systematic trading - có thể gọi từ bên ngoài"""
+    initialize_order_monitoring()
     return execute_systematic_trading()
         
 # Chạy chương trình
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Backtester - Mô phỏng giao dịch từ tín hiệu bằng NumPy cho toàn bộ lưới tham số cùng lúc
+"""
+
+from itertools import product
+
+import numpy as np
+
+from indicators import get_indicator_frame
+
+# Stop loss cố định của quy tắc thoát lệnh hiện tại (-0.3% so với nến trước)
+EXIT_STOP_LOSS = 0.003
+
+
+def build_parameter_grid(rsi_buy_range, rsi_sell_range, vol_range, tp_range):
+    """Lưới tham số theo đúng thứ tự itertools.product (để giữ thứ tự ưu tiên khi bằng điểm)"""
+    combinations = list(product(rsi_buy_range, rsi_sell_range, vol_range, tp_range))
+    grid = np.array(combinations, dtype=float)
+    return {
+        'combinations': combinations,
+        'rsi_buy': grid[:, 0],
+        'rsi_sell': grid[:, 1],
+        'volatility_threshold': grid[:, 2],
+        'take_profit': grid[:, 3]
+    }
+
+
+def build_signal_matrices(indicator_df, grid, fee):
+    """
+    Tạo ma trận entries/exits (số tham số x số nến) theo tín hiệu strict của analyze_trends
+
+    Returns:
+        tuple: (entries, exits) - mảng bool kích thước (P, T)
+    """
+    close = indicator_df['close'].to_numpy(dtype=float)
+    sma_20 = indicator_df['SMA_20'].to_numpy(dtype=float)
+    sma_50 = indicator_df['SMA_50'].to_numpy(dtype=float)
+    rsi = indicator_df['RSI'].to_numpy(dtype=float)
+    macd = indicator_df['MACD'].to_numpy(dtype=float)
+    macd_signal = indicator_df['MACD_signal'].to_numpy(dtype=float)
+    bb_high = indicator_df['BB_upper'].to_numpy(dtype=float)
+    bb_low = indicator_df['BB_lower'].to_numpy(dtype=float)
+    stoch = indicator_df['Stoch_K'].to_numpy(dtype=float)
+    volatility = indicator_df['Volatility'].to_numpy(dtype=float)
+
+    # Điều kiện không phụ thuộc tham số (tính 1 lần)
+    buy_base = (sma_20 > sma_50) & (macd > macd_signal) & (close < bb_high) & (stoch < 80)
+    sell_base = (sma_20 < sma_50) & (macd < macd_signal) & (close > bb_low) & (stoch > 20)
+
+    # Điều kiện phụ thuộc tham số - broadcast (P, 1) với (1, T)
+    low_volatility = volatility[None, :] < grid['volatility_threshold'][:, None]
+    buy = buy_base[None, :] & (rsi[None, :] < grid['rsi_buy'][:, None]) & low_volatility
+    sell = sell_base[None, :] & (rsi[None, :] > grid['rsi_sell'][:, None]) & low_volatility
+
+    # Tín hiệu bán ghi đè tín hiệu mua (giống thứ tự gán trong analyze_trends)
+    entries = buy & ~sell
+
+    # Quy tắc thoát: chốt lời so với nến trước (đã tính phí 2 chiều), cắt lỗ -0.3%, hoặc tín hiệu bán
+    prev_close = np.empty_like(close)
+    prev_close[0] = np.nan
+    prev_close[1:] = close[:-1]
+    take_profit_hit = close[None, :] >= prev_close[None, :] * (1 + grid['take_profit'][:, None] + 2 * fee)
+    stop_loss_hit = close <= prev_close * (1 - EXIT_STOP_LOSS)
+    exits = take_profit_hit | stop_loss_hit[None, :] | sell
+
+    return entries, exits
+
+
+def simulate_trades(close, entries, exits, fee, init_cash=10000):
+    """
+    Mô phỏng all-in long-only cho P bộ tham số song song (giống Portfolio.from_signals của vectorbt)
+
+    Vào lệnh tại giá đóng cửa khi có entry và đang không giữ coin, thoát khi có exit.
+    Nến có cả entry lẫn exit bị bỏ qua. Phí tính cả 2 chiều.
+
+    Returns:
+        dict: win_rate (%), total_profit, trade_count - mảng kích thước P
+    """
+    close = np.asarray(close, dtype=float)
+    n_params, n_bars = entries.shape
+
+    in_position = np.zeros(n_params, dtype=bool)
+    cash = np.full(n_params, float(init_cash))
+    shares = np.zeros(n_params)
+    cost = np.zeros(n_params)
+    wins = np.zeros(n_params)
+    closed_trades = np.zeros(n_params)
+
+    signal_entries = entries & ~exits
+    signal_exits = exits & ~entries
+
+    for t in range(n_bars):
+        price = close[t]
+        if not np.isfinite(price) or price <= 0:
+            continue
+
+        # Thoát lệnh
+        do_exit = in_position & signal_exits[:, t]
+        if do_exit.any():
+            proceeds = shares[do_exit] * price * (1 - fee)
+            wins[do_exit] += proceeds > cost[do_exit]
+            closed_trades[do_exit] += 1
+            cash[do_exit] = proceeds
+            shares[do_exit] = 0
+            in_position[do_exit] = False
+
+        # Vào lệnh
+        do_entry = ~in_position & signal_entries[:, t]
+        if do_entry.any():
+            cost[do_entry] = cash[do_entry]
+            shares[do_entry] = cash[do_entry] / (price * (1 + fee))
+            cash[do_entry] = 0
+            in_position[do_entry] = True
+
+    # Giá trị cuối kỳ: vị thế còn mở định giá theo giá đóng cửa cuối cùng
+    last_price = close[np.isfinite(close)][-1] if np.isfinite(close).any() else 0
+    final_value = np.where(in_position, shares * last_price, cash)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        win_rate = np.where(closed_trades > 0, wins / closed_trades * 100, 0.0)
+
+    return {
+        'win_rate': win_rate,
+        'total_profit': final_value - init_cash,
+        'trade_count': closed_trades + in_position
+    }
+
+
+def optimize_parameters(df, rsi_buy_range, rsi_sell_range, vol_range, tp_range, fee=0.001, init_cash=10000):
+    """
+    Tìm bộ tham số tốt nhất (ưu tiên win rate, sau đó lợi nhuận)
+
+    Returns:
+        tuple: (best_win_rate, best_profit, best_params) - best_params None nếu không có bộ nào có tín hiệu mua
+    """
+    indicator_df = get_indicator_frame(df)
+    if indicator_df is None or len(indicator_df) < 50:
+        return 0, 0, None
+
+    grid = build_parameter_grid(rsi_buy_range, rsi_sell_range, vol_range, tp_range)
+    entries, exits = build_signal_matrices(indicator_df, grid, fee)
+
+    # Bỏ các bộ tham số không có tín hiệu mua nào
+    has_entries = entries.any(axis=1)
+    if not has_entries.any():
+        return 0, 0, None
+
+    stats = simulate_trades(indicator_df['close'].to_numpy(dtype=float), entries, exits, fee, init_cash)
+
+    # Kết hợp win rate và lợi nhuận
+    score = np.where(has_entries, stats['win_rate'] + stats['total_profit'] / 10000, -np.inf)
+    best = int(np.argmax(score))
+    if score[best] <= 0:
+        return 0, 0, None
+
+    rsi_buy, rsi_sell, vol_threshold, take_profit = grid['combinations'][best]
+    best_params = {'rsi_buy': rsi_buy, 'rsi_sell': rsi_sell, 'volatility_threshold': vol_threshold, 'take_profit': take_profit}
+    return float(stats['win_rate'][best]), float(stats['total_profit'][best]), best_params
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Balance Snapshot - 1 lần get_account dùng chung cho mọi nơi đọc số dư trong chu kỳ trading
+
+Snapshot được giữ trong TTL ngắn và bị huỷ ngay khi đặt/huỷ lệnh hoặc có lệnh khớp,
+nên các hàm đọc số dư của app và position_manager luôn thấy cùng 1 trạng thái tài khoản.
+Snapshot gắn với client đã lấy nó: đổi client (vd. sàn giả lập của replay) thì lấy lại từ client mới.
+"""
+
+import threading
+import time
+
+import config
+
+
+class BalanceSnapshot:
+    def __init__(self, ttl=5):
+        """
+        Args:
+            ttl: Thời gian (giây) snapshot còn hiệu lực nếu không bị invalidate
+        """
+        self.ttl = ttl
+        self.account = None
+        self.client = None  # Client đã lấy snapshot hiện tại
+        self.balances = {}  # asset -> {'free', 'locked'}
+        self.fetched_at = 0
+        self.stats = {'requests': 0, 'hits': 0, 'invalidations': 0}
+        self.lock = threading.Lock()
+
+    def _is_fresh(self, client):
+        return self.account is not None and self.client is client and time.monotonic() - self.fetched_at < self.ttl
+
+    def get_account(self, client):
+        """Kết quả get_account (dùng lại snapshot nếu còn hiệu lực)"""
+        with self.lock:
+            if self._is_fresh(client):
+                self.stats['hits'] += 1
+                return self.account
+
+            account = client.get_account()
+            self.account = account
+            self.client = client
+            self.balances = {
+                b['asset']: {'free': float(b['free']), 'locked': float(b['locked'])}
+                for b in account.get('balances', [])
+            }
+            self.fetched_at = time.monotonic()
+            self.stats['requests'] += 1
+            return account
+
+    def get_balances(self, client):
+        """asset -> {'free', 'locked'}"""
+        self.get_account(client)
+        return self.balances
+
+    def get_free(self, client, asset):
+        return self.get_balances(client).get(asset, {}).get('free', 0.0)
+
+    def invalidate(self):
+        """Gọi sau khi đặt/huỷ lệnh hoặc phát hiện lệnh khớp"""
+        with self.lock:
+            self.account = None
+            self.stats['invalidations'] += 1
+
+
+# Instance dùng chung giữa app và position_manager
+balance_snapshot = BalanceSnapshot(config.BALANCE_SNAPSHOT_TTL)
+
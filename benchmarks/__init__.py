@@ -0,0 +1,10 @@
+"""
+Benchmarks - Đo tốc độ các hàm phân tích nóng của app trên dữ liệu thị trường ghi sẵn
+
+Chạy: python -m benchmarks               (so sánh với benchmarks/baseline.json)
+      python -m benchmarks --save-baseline
+      python -m benchmarks --record       (ghi fixture thật từ Binance vào benchmarks/fixtures)
+
+Không có fixture thì dùng dữ liệu tổng hợp cố định theo seed cho các coin trong config.TARGET_COINS.
+Mọi request của app đi vào sàn giả lập của replay, không cần mạng.
+"""
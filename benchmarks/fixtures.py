@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Fixtures - Dữ liệu nến và sổ lệnh cho benchmark
+
+Cùng format file với replay ({SYMBOL}_{interval}.json và {SYMBOL}_orderbook.json) nên
+ReplayMarketData đọc trực tiếp được. manifest.json ghi nguồn của bộ fixture ('recorded' khi ghi
+từ Binance bằng --record, 'synthetic' khi sinh bằng --generate) để baseline chỉ so với cùng loại dữ liệu.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+import config
+from candle_store import INTERVAL_MS
+from replay import ReplayMarketData
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+FIXTURE_INTERVAL = '15m'
+FIXTURE_DAYS = 11  # Đủ 500 nến 30m (gộp từ nến 15m) cho các hàm phân tích
+MANIFEST_FILE = 'manifest.json'
+
+# Giá khởi điểm (JPY) cho dữ liệu tổng hợp
+SYNTHETIC_START_PRICES = {'ETH': 450000.0, 'XRP': 350.0, 'SUI': 500.0, 'SOL': 25000.0, 'XLM': 50.0}
+
+
+def target_symbols():
+    return [f"{coin}JPY" for coin in config.TARGET_COINS]
+
+
+def _write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'))
+
+
+def _write_manifest(fixture_dir, source, interval, days, **extra):
+    _write_json(os.path.join(fixture_dir, MANIFEST_FILE), {
+        'source': source, 'interval': interval, 'days': days, 'symbols': target_symbols(), **extra
+    })
+
+
+def read_manifest(fixture_dir):
+    """Thông tin bộ fixture (thư mục cũ chưa có manifest coi như dữ liệu ghi từ Binance)"""
+    try:
+        with open(os.path.join(fixture_dir, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'source': 'recorded'}
+
+
+def record_fixtures(client, fixture_dir=FIXTURE_DIR, interval=FIXTURE_INTERVAL, days=FIXTURE_DAYS, book_limit=20):
+    """Ghi nến + 1 snapshot sổ lệnh thật cho mỗi symbol (cần mạng và client Binance)"""
+    os.makedirs(fixture_dir, exist_ok=True)
+    for symbol in target_symbols():
+        klines = client.get_historical_klines(symbol, interval, f"{days} days ago UTC")
+        _write_json(os.path.join(fixture_dir, f"{symbol}_{interval}.json"), klines)
+
+        book = client.get_order_book(symbol=symbol, limit=book_limit)
+        snapshot_time = klines[-1][0] + INTERVAL_MS[interval] if klines else 0
+        _write_json(os.path.join(fixture_dir, f"{symbol}_orderbook.json"),
+                    [{'time': snapshot_time, 'bids': book['bids'], 'asks': book['asks']}])
+        print(f"📥 {symbol}: {len(klines)} nến {interval} + sổ lệnh {book_limit} mức")
+    _write_manifest(fixture_dir, 'recorded', interval, days)
+    return fixture_dir
+
+
+def generate_synthetic_fixtures(fixture_dir, interval=FIXTURE_INTERVAL, days=FIXTURE_DAYS, seed=7, book_limit=20):
+    """Nến random walk (có xu hướng và biến động thay đổi theo đoạn) + sổ lệnh tổng hợp, cố định theo seed"""
+    os.makedirs(fixture_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    interval_ms = INTERVAL_MS[interval]
+    count = days * 24 * 60 * 60 * 1000 // interval_ms
+    start_ms = 1735689600000  # 2025-01-01 UTC - cố định để kết quả lặp lại được
+
+    for symbol in target_symbols():
+        price = SYNTHETIC_START_PRICES.get(symbol[:-3], 1000.0)
+        # Mỗi đoạn 2 ngày có drift/volatility riêng để có cả uptrend, downtrend và sideway
+        segment = max(1, 2 * 24 * 60 * 60 * 1000 // interval_ms)
+        drift = np.repeat(rng.normal(0, 0.0008, count // segment + 1), segment)[:count]
+        vol = np.repeat(rng.uniform(0.002, 0.008, count // segment + 1), segment)[:count]
+        returns = drift + vol * rng.standard_normal(count)
+
+        klines = []
+        for i in range(count):
+            open_price = price
+            close_price = price * float(np.exp(returns[i]))
+            wick = abs(rng.normal(0, vol[i] / 2))
+            high = max(open_price, close_price) * (1 + wick)
+            low = min(open_price, close_price) * (1 - wick)
+            volume = float(rng.lognormal(5, 0.6))
+            open_time = start_ms + i * interval_ms
+            klines.append([open_time, f"{open_price:.8f}", f"{high:.8f}", f"{low:.8f}", f"{close_price:.8f}",
+                           f"{volume:.8f}", open_time + interval_ms - 1, f"{volume * close_price:.8f}",
+                           int(rng.integers(50, 500)), '0', '0', '0'])
+            price = close_price
+        _write_json(os.path.join(fixture_dir, f"{symbol}_{interval}.json"), klines)
+
+        # Sổ lệnh quanh giá cuối với khối lượng ngẫu nhiên (lệch bên mua/bán khác nhau mỗi symbol)
+        step = price * 0.0004
+        bids = [[f"{price - step * (i + 1):.8f}", f"{rng.lognormal(2, 0.8):.8f}"] for i in range(book_limit)]
+        asks = [[f"{price + step * (i + 1):.8f}", f"{rng.lognormal(2, 0.8):.8f}"] for i in range(book_limit)]
+        _write_json(os.path.join(fixture_dir, f"{symbol}_orderbook.json"),
+                    [{'time': start_ms + count * interval_ms, 'bids': bids, 'asks': asks}])
+    _write_manifest(fixture_dir, 'synthetic', interval, days, seed=seed)
+    return fixture_dir
+
+
+def has_fixtures(fixture_dir):
+    return os.path.isdir(fixture_dir) and all(
+        any(name.startswith(f"{symbol}_") for name in os.listdir(fixture_dir)) for symbol in target_symbols()
+    )
+
+
+def load_market_data(fixture_dir=FIXTURE_DIR):
+    """
+    Fixture trong fixture_dir nếu có, không có thì sinh dữ liệu tổng hợp vào thư mục tạm
+
+    Returns:
+        tuple: (ReplayMarketData, nguồn dữ liệu - 'recorded' hoặc 'synthetic')
+    """
+    if has_fixtures(fixture_dir):
+        return ReplayMarketData(fixture_dir, target_symbols()), read_manifest(fixture_dir)['source']
+    synthetic_dir = generate_synthetic_fixtures(tempfile.mkdtemp(prefix='bench_fixtures_'))
+    try:
+        return ReplayMarketData(synthetic_dir, target_symbols()), 'synthetic'
+    finally:
+        shutil.rmtree(synthetic_dir, ignore_errors=True)
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Chạy benchmark các hàm phân tích của app và so sánh với baseline
+
+Mỗi case được gọi lặp lại tối thiểu min_time giây (ops/sec, p50), đỉnh bộ nhớ đo bằng tracemalloc
+trên 1 lần gọi riêng. Trước mỗi lần gọi, cache chỉ số/tối ưu/model được xoá (ngoài thời gian đo)
+để đo đúng phần tính toán thay vì tra cache. Case chậm hơn baseline quá tolerance (hoặc tốn bộ nhớ
+hơn quá tolerance) bị tính là regression và lệnh thoát với mã 1.
+
+baseline.json là thời gian tuyệt đối đo trên 1 máy (ghi kèm phiên bản Python và kiến trúc máy).
+Khi so sánh, ops/sec của baseline được nhân với tỷ lệ tốc độ máy hiện tại / máy tạo baseline, đo bằng
+1 tải cố định không phụ thuộc code của app (calibrate), nên chạy trên máy khác vẫn so sánh được.
+Kết quả vẫn nên đọc như xu hướng - đổi máy/phiên bản thư viện thì chạy lại --save-baseline.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import time
+import tracemalloc
+
+import numpy as np
+
+import forecaster
+import indicators
+from benchmarks.fixtures import (FIXTURE_DIR, generate_synthetic_fixtures, load_market_data, record_fixtures,
+                                 target_symbols)
+from replay import SimulatedExchange, replay_environment
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_TOLERANCE = 0.25  # Chậm hơn 25% so với baseline = regression
+
+
+def build_cases(app):
+    """Case benchmark: tên -> hàm không tham số (dữ liệu đầu vào chuẩn bị sẵn, không tính vào thời gian)"""
+    symbols = [f"{symbol[:-3]}/JPY" for symbol in target_symbols()]
+    frames_30m = {symbol: app.get_crypto_data(symbol, '30m', 500) for symbol in symbols}
+    frames_15m = {symbol: app.get_crypto_data(symbol, '15m', 500) for symbol in symbols}
+    books = {symbol: app.get_order_book(symbol, 20) for symbol in symbols}
+    analyzed = {symbol: app.analyze_trends(df, '30m') for symbol, df in frames_30m.items()}
+
+    def each(function, inputs):
+        return lambda: [function(symbol, value) for symbol, value in inputs.items()]
+
+    return {
+        'analyze_trends': each(lambda symbol, df: app.analyze_trends(df, '30m'), frames_30m),
+        'detect_comprehensive_downtrend': each(lambda symbol, df: app.detect_comprehensive_downtrend(df, symbol), frames_30m),
+        'detect_scalping_downtrend': each(lambda symbol, df: app.detect_scalping_downtrend(df, symbol, '15m'), frames_15m),
+        'analyze_order_book': each(lambda symbol, book: app.analyze_order_book(book), books),
+        'calculate_support_resistance': each(lambda symbol, df: app.calculate_support_resistance(df), frames_30m),
+        'vectorbt_optimize': each(lambda symbol, df: app.vectorbt_optimize(df), analyzed),
+        'find_best_coins_silent': lambda: app.find_best_coins_silent('30m', 0, 0, 'flexible'),
+    }
+
+
+def reset_caches(app):
+    """Xoá cache frame chỉ số, kết quả tối ưu và model dự đoán - mỗi lần đo tính lại từ đầu"""
+    with indicators._indicator_cache_lock:
+        indicators._indicator_cache.clear()
+    app.MODEL_CACHE.clear()
+    forecaster.predictor_cache.clear()
+
+
+def calibrate(min_time=0.5):
+    """Tốc độ máy (ops/sec) trên 1 tải cố định chỉ dùng NumPy và vòng lặp Python"""
+    values = np.random.default_rng(0).standard_normal(100000)
+    sample = values[:20000].tolist()
+
+    def workload():
+        np.sort(values)
+        total = 0.0
+        for value in sample:
+            total += value * value
+        return total
+
+    return measure(workload, min_time)['ops_per_sec']
+
+
+def measure(function, min_time=1.0, min_runs=3, setup=None):
+    """
+    Gọi lặp lại function, trả về ops/sec, thời gian p50/mean và đỉnh bộ nhớ (KB)
+
+    Args:
+        setup: Hàm gọi trước mỗi lần đo, không tính vào thời gian (vd. xoá cache)
+    """
+    setup = setup or (lambda: None)
+    setup()
+    function()  # Warmup (import lazy)
+    durations = []
+    started = time.perf_counter()
+    while len(durations) < min_runs or time.perf_counter() - started < min_time:
+        setup()
+        call_started = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - call_started)
+
+    setup()
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    total = sum(durations)
+    return {
+        'runs': len(durations),
+        'ops_per_sec': round(len(durations) / total, 3) if total > 0 else 0,
+        'p50_ms': round(statistics.median(durations) * 1000, 3),
+        'mean_ms': round(total / len(durations) * 1000, 3),
+        'peak_kb': round(peak / 1024, 1)
+    }
+
+
+def run_benchmarks(fixture_dir=FIXTURE_DIR, min_time=1.0, only=None):
+    """
+    Returns:
+        dict: {'source': 'recorded'/'synthetic', 'calibration': calibrate(), 'results': {case: measure(...)}}
+    """
+    import app
+
+    market_data, source = load_market_data(fixture_dir)
+    exchange = SimulatedExchange(market_data)
+    exchange.set_clock(market_data.time_range()[1])
+
+    results = {}
+    with replay_environment(exchange):
+        with contextlib.redirect_stdout(io.StringIO()):
+            cases = build_cases(app)
+        for name, function in cases.items():
+            if only and name not in only:
+                continue
+            with contextlib.redirect_stdout(io.StringIO()):
+                results[name] = measure(function, min_time, setup=lambda: reset_caches(app))
+            print(f"⏱️ {name:<32} {results[name]['ops_per_sec']:>10.2f} ops/s | p50 {results[name]['p50_ms']:9.3f} ms | "
+                  f"peak {results[name]['peak_kb']:9.1f} KB")
+    return {'source': source, 'calibration': calibrate(), 'results': results}
+
+
+def compare_with_baseline(results, baseline, tolerance=DEFAULT_TOLERANCE, speed_ratio=1.0):
+    """
+    Danh sách regression: case chậm hơn hoặc tốn bộ nhớ hơn baseline quá tolerance
+
+    Args:
+        speed_ratio: Tốc độ máy hiện tại / máy tạo baseline (calibrate) - ops/sec baseline được nhân với tỷ lệ này
+    """
+    regressions = []
+    for name, current in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        expected = reference['ops_per_sec'] * speed_ratio
+        if current['ops_per_sec'] < expected * (1 - tolerance):
+            regressions.append(f"{name}: {current['ops_per_sec']:.2f} ops/s < baseline {expected:.2f} ops/s "
+                               f"(đã quy đổi x{speed_ratio:.2f})")
+        if current['peak_kb'] > reference['peak_kb'] * (1 + tolerance) + 64:
+            regressions.append(f"{name}: peak {current['peak_kb']:.0f} KB > baseline {reference['peak_kb']:.0f} KB")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark các hàm phân tích của app")
+    parser.add_argument('--fixtures', default=FIXTURE_DIR, help="Thư mục fixture (không có thì dùng dữ liệu tổng hợp)")
+    parser.add_argument('--record', action='store_true', help="Ghi fixture thật từ Binance rồi thoát")
+    parser.add_argument('--generate', action='store_true', help="Ghi fixture tổng hợp (cố định theo seed) rồi thoát")
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--save-baseline', action='store_true', help="Ghi kết quả lần chạy này làm baseline")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--min-time', type=float, default=1.0, help="Số giây tối thiểu cho mỗi case")
+    parser.add_argument('--case', action='append', help="Chỉ chạy case này (lặp lại được)")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        from client_registry import get_client
+        record_fixtures(get_client(), args.fixtures)
+        return 0
+    if args.generate:
+        generate_synthetic_fixtures(args.fixtures)
+        print(f"💾 Đã ghi fixture tổng hợp: {args.fixtures}")
+        return 0
+
+    report = run_benchmarks(args.fixtures, args.min_time, args.case)
+    print(f"📊 Dữ liệu: {report['source']} ({', '.join(target_symbols())})")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({
+                'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'source': report['source'],
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'calibration': report['calibration'],
+                'results': report['results']
+            }, f, indent=2)
+        print(f"💾 Đã lưu baseline: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("⚠️ Chưa có baseline - chạy lại với --save-baseline")
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('source') != report['source']:
+        print(f"⚠️ Baseline đo trên dữ liệu {baseline.get('source')}, lần này là {report['source']} - bỏ qua so sánh")
+        return 0
+
+    # Baseline cũ chưa có calibration: so sánh thời gian tuyệt đối
+    speed_ratio = report['calibration'] / baseline['calibration'] if baseline.get('calibration') else 1.0
+    print(f"⚖️ Máy hiện tại: Python {platform.python_version()} {platform.machine()} | baseline: Python "
+          f"{baseline.get('python')} {baseline.get('machine')} | tốc độ x{speed_ratio:.2f} so với máy tạo baseline")
+    regressions = compare_with_baseline(report['results'], baseline['results'], args.tolerance, speed_ratio)
+    if regressions:
+        print("❌ REGRESSION:")
+        for line in regressions:
+            print(f"   - {line}")
+        return 1
+    print(f"✅ Không có regression (tolerance {args.tolerance:.0%})")
+    return 0
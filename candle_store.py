@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Candle Store - Lưu trữ nến OHLCV cục bộ và đồng bộ tăng dần với Binance
+"""
+
+import json
+import os
+import threading
+
+# Độ dài của mỗi khung thời gian (ms)
+INTERVAL_MS = {
+    '1m': 60 * 1000,
+    '3m': 3 * 60 * 1000,
+    '5m': 5 * 60 * 1000,
+    '15m': 15 * 60 * 1000,
+    '30m': 30 * 60 * 1000,
+    '1h': 60 * 60 * 1000,
+    '2h': 2 * 60 * 60 * 1000,
+    '4h': 4 * 60 * 60 * 1000,
+    '6h': 6 * 60 * 60 * 1000,
+    '8h': 8 * 60 * 60 * 1000,
+    '12h': 12 * 60 * 60 * 1000,
+    '1d': 24 * 60 * 60 * 1000,
+    '3d': 3 * 24 * 60 * 60 * 1000,
+    '1w': 7 * 24 * 60 * 60 * 1000,
+    '1M': 30 * 24 * 60 * 60 * 1000
+}
+
+# Số nến tối đa Binance trả về cho mỗi request klines
+KLINES_PAGE_LIMIT = 1000
+
+
+class CandleStore:
+    def __init__(self, base_dir='candle_data', max_candles=6000):
+        self.base_dir = base_dir
+        self.max_candles = max_candles
+        self.candles = {}  # (symbol, interval) -> list klines thô của Binance
+        self.backfilled_from = {}  # (symbol, interval) -> start_ms đã tải đầy đủ
+        self.saved_last_open = {}  # (symbol, interval) -> open_time nến cuối lần ghi disk gần nhất
+        self.locks = {}
+        self.locks_guard = threading.Lock()
+
+    def _get_lock(self, key):
+        with self.locks_guard:
+            if key not in self.locks:
+                self.locks[key] = threading.Lock()
+            return self.locks[key]
+
+    def _file_path(self, symbol, interval):
+        return os.path.join(self.base_dir, f"{symbol}_{interval}.json")
+
+    def _load(self, symbol, interval):
+        """Đọc nến đã lưu từ disk (chỉ đọc 1 lần, sau đó dùng bộ nhớ)"""
+        key = (symbol, interval)
+        if key in self.candles:
+            return self.candles[key]
+
+        klines = []
+        file_path = self._file_path(symbol, interval)
+        try:
+            if os.path.exists(file_path):
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    klines = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Lỗi đọc candle file {file_path}: {e}")
+            klines = []
+
+        self.candles[key] = klines
+        return klines
+
+    def _save(self, symbol, interval, klines):
+        """Ghi nến ra disk (ghi file tạm rồi rename để tránh hỏng file)"""
+        file_path = self._file_path(symbol, interval)
+        try:
+            os.makedirs(self.base_dir, exist_ok=True)
+            tmp_path = file_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(klines, f, separators=(',', ':'))
+            os.replace(tmp_path, file_path)
+            self.saved_last_open[(symbol, interval)] = klines[-1][0] if klines else None
+        except Exception as e:
+            print(f"⚠️ Lỗi lưu candle file {file_path}: {e}")
+
+    def _fetch_klines(self, client, symbol, interval, start_ms):
+        """Lấy klines từ start_ms đến hiện tại, tự phân trang theo 1000 nến"""
+        result = []
+        while True:
+            batch = client.get_klines(symbol=symbol, interval=interval,
+                                      startTime=int(start_ms), limit=KLINES_PAGE_LIMIT)
+            if not batch:
+                break
+            result.extend(batch)
+            if len(batch) < KLINES_PAGE_LIMIT:
+                break
+            start_ms = batch[-1][0] + 1
+        return result
+
+    def _merge(self, klines, new_klines):
+        """Gộp nến mới vào danh sách cũ theo open_time (nến mới ghi đè nến chưa đóng)"""
+        if not new_klines:
+            return klines
+        first_new_open = new_klines[0][0]
+        # Bỏ các nến cũ trùng/sau nến mới đầu tiên (thường chỉ là nến đang chạy)
+        cut = len(klines)
+        while cut > 0 and klines[cut - 1][0] >= first_new_open:
+            cut -= 1
+        merged = klines[:cut] + new_klines
+        if len(merged) > self.max_candles:
+            merged = merged[-self.max_candles:]
+        return merged
+
+    def get_klines(self, client, symbol, interval, start_ms):
+        """
+        Lấy klines từ start_ms đến hiện tại, chỉ tải phần nến mới từ Binance
+
+        Args:
+            client: Binance client
+            symbol: Symbol Binance (VD: 'ADAJPY')
+            interval: Khung thời gian (VD: '30m')
+            start_ms: Thời điểm bắt đầu (ms) của cửa sổ dữ liệu cần trả về
+
+        Returns:
+            list: Klines thô của Binance (cùng format với get_historical_klines)
+        """
+        key = (symbol, interval)
+        with self._get_lock(key):
+            klines = self._load(symbol, interval)
+            if self._has_history(key, klines, start_ms):
+                # Đã có đủ lịch sử - chỉ tải từ nến cuối cùng (nến đang chạy cần cập nhật)
+                new_klines = self._fetch_klines(client, symbol, interval, klines[-1][0])
+                klines = self._merge(klines, new_klines)
+            else:
+                # Chưa có dữ liệu hoặc thiếu lịch sử - tải lại toàn bộ cửa sổ
+                klines = self._fetch_klines(client, symbol, interval, start_ms)
+                if len(klines) > self.max_candles:
+                    klines = klines[-self.max_candles:]
+                # Coin mới list có thể không đủ lịch sử - ghi nhận để không tải lại mỗi lần
+                self.backfilled_from[key] = start_ms
+                self.saved_last_open.pop(key, None)
+
+            self.candles[key] = klines
+            # Chỉ ghi disk khi có nến mới mở hoặc vừa tải lại lịch sử (nến đang chạy tải lại được khi khởi động)
+            if klines and klines[-1][0] != self.saved_last_open.get(key):
+                self._save(symbol, interval, klines)
+            return self._window(klines, start_ms)
+
+    def get_klines_from_stream(self, symbol, interval, start_ms, stream_klines):
+        """
+        Cập nhật nến từ WebSocket thay vì gọi REST
+
+        Returns:
+            list: Klines trong cửa sổ yêu cầu, hoặc None nếu nến stream không nối tiếp
+            được với lịch sử đã lưu (khi đó cần gọi get_klines)
+        """
+        key = (symbol, interval)
+        with self._get_lock(key):
+            klines = self._load(symbol, interval)
+            if not stream_klines or not self._has_history(key, klines, start_ms):
+                return None
+            if stream_klines[0][0] > klines[-1][0]:
+                return None  # Thiếu nến giữa lịch sử và stream
+
+            klines = self._merge(klines, stream_klines)
+            self.candles[key] = klines
+            # Chỉ ghi disk khi có nến mới mở (nến đang chạy thay đổi liên tục)
+            if klines[-1][0] != self.saved_last_open.get(key):
+                self._save(symbol, interval, klines)
+            return self._window(klines, start_ms)
+
+    def _has_history(self, key, klines, start_ms):
+        """Đã có đủ lịch sử cho cửa sổ bắt đầu từ start_ms chưa"""
+        interval_ms = INTERVAL_MS.get(key[1], 60 * 1000)
+        return bool(klines) and (
+            klines[0][0] <= start_ms + interval_ms
+            or self.backfilled_from.get(key, float('inf')) <= start_ms
+        )
+
+    def _window(self, klines, start_ms):
+        """Phần đuôi nằm trong cửa sổ yêu cầu"""
+        start_index = 0
+        while start_index < len(klines) and klines[start_index][0] < start_ms:
+            start_index += 1
+        return klines[start_index:]
+
+    def clear(self, symbol=None, interval=None):
+        """Xóa cache trong bộ nhớ (file trên disk giữ nguyên)"""
+        if symbol is None:
+            self.candles = {}
+        else:
+            self.candles.pop((symbol, interval), None)
@@ -10,6 +10,10 @@ Usage:
     python3 check_sl.py
 """
 
+import time
+
+STARTED = time.perf_counter()
+
 import sys
 import os
 
@@ -17,17 +21,16 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 try:
-    from app import check_manual_stop_loss_triggers, load_active_orders_from_file
+    # Chỉ cần file lệnh + giá + email - không import app.py (pandas/numpy/ta, kết nối Binance khi import)
+    import light_tasks
+    light_tasks.IMPORT_STARTED = STARTED
     
     def main():
         print("🛡️ CHECKING MANUAL STOP LOSS TRIGGERS")
         print("=" * 50)
         
-        # Load active orders
-        load_active_orders_from_file()
-        
-        # Check SL triggers
-        check_manual_stop_loss_triggers()
+        # Load active orders + check SL triggers
+        light_tasks.run_task('sl')
         
         print("✅ SL check completed")
     
@@ -36,6 +39,6 @@ try:
         
 except ImportError as e:
     print(f"❌ Import error: {e}")
-    print("Đảm bảo app.py có thể import được")
+    print("Đảm bảo light_tasks.py có thể import được")
 except Exception as e:
     print(f"❌ Error: {e}")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Client Registry - 1 Binance Client dùng lâu dài cho mỗi bộ API key
+
+Tránh tạo Client mới ở mỗi lần gọi (session HTTP mới, bắt tay TLS, ping server).
+Session được chỉnh connection pool theo số luồng của scanner và đếm request theo endpoint.
+Mọi client dùng chung 1 WeightRateLimiter vì giới hạn weight của Binance tính theo IP.
+"""
+
+import threading
+from collections import Counter
+from urllib.parse import urlparse
+
+from requests.adapters import HTTPAdapter
+
+import config
+import trading_config
+from rate_limiter import RateLimitedClient, WeightRateLimiter
+
+
+class ClientRegistry:
+    def __init__(self, pool_size=10, limiter=None):
+        """
+        Args:
+            pool_size: Số kết nối keep-alive tối đa tới mỗi host (>= số luồng gọi API song song)
+            limiter: WeightRateLimiter dùng chung cho mọi client
+        """
+        self.pool_size = pool_size
+        self.limiter = limiter or WeightRateLimiter()
+        self.clients = {}  # (api_key, api_secret, testnet) -> Client
+        self.request_counts = Counter()  # 'GET /api/v3/account' -> số lần gọi
+        self.lock = threading.Lock()
+
+    def get_client(self, api_key, api_secret, testnet=False):
+        """Client dùng chung cho bộ credential (tạo lần đầu, các lần sau trả lại client cũ)"""
+        key = (api_key, api_secret, testnet)
+        with self.lock:
+            client = self.clients.get(key)
+            if client is None:
+                client = RateLimitedClient(api_key=api_key, api_secret=api_secret, testnet=testnet, limiter=self.limiter)
+                self._tune_session(client.session)
+                self.clients[key] = client
+            return client
+
+    def _tune_session(self, session):
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers['Connection'] = 'keep-alive'
+        session.hooks['response'].append(self._on_response)
+
+    def _on_response(self, response, *args, **kwargs):
+        request = response.request
+        endpoint = f"{request.method} {urlparse(request.url).path}"
+        with self.lock:
+            self.request_counts[endpoint] += 1
+        self.limiter.update_from_response(response)
+
+    def get_request_counts(self):
+        """Số request theo endpoint, nhiều nhất trước"""
+        with self.lock:
+            return dict(self.request_counts.most_common())
+
+    def reset_request_counts(self):
+        with self.lock:
+            self.request_counts.clear()
+
+
+# Registry dùng chung cho app, account_info và simple_bot
+client_registry = ClientRegistry(
+    config.BINANCE_POOL_SIZE,
+    WeightRateLimiter(config.BINANCE_WEIGHT_LIMIT, config.BINANCE_WEIGHT_SAFETY)
+)
+
+
+def get_client():
+    """Client dùng chung theo cấu hình trong trading_config.py"""
+    return client_registry.get_client(
+        trading_config.BINANCE_CONFIG['api_key'],
+        trading_config.BINANCE_CONFIG['api_secret'],
+        trading_config.BINANCE_CONFIG['testnet']
+    )
+
+
+class LazyClient:
+    """
+    Đại diện cho Client, chỉ tạo Client thật (bắt tay TLS + ping server) ở lần gọi API đầu tiên
+
+    Import module không cần mạng; tạo lỗi thì lần gọi sau thử kết nối lại.
+    """
+
+    def __init__(self, factory=None):
+        self._factory = factory or get_client
+        self._client = None
+        self._lock = threading.Lock()
+
+    def resolve(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
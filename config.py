@@ -5,6 +5,7 @@ MIN_WIN_RATE = 40  # Tỷ lệ thắng tối thiểu (%)
 MIN_PROFIT_POTENTIAL = 0.3  # Tiềm năng lợi nhuận tối thiểu (%)
 TRADING_FEE = 0.001  # Phí giao dịch Binance (0.1%)
 STOP_LOSS_PERCENTAGE = 0.3  # Stop loss (%)
+TARGET_COINS = ['ETH', 'XRP', 'SUI', 'SOL', 'XLM']  # Chỉ trade các cặp {coin}/JPY này
 
 # Cấu hình LSTM - TỐI ƯU TỐC ĐỘ
 LOOK_BACK_PERIOD = 10  # Giảm từ 20 xuống 10 để tăng tốc
@@ -18,6 +19,63 @@ API_DELAY = 0.2  # Giảm delay từ 1 xuống 0.2 giây
 DATA_LIMIT = 500  # Giảm từ 5000 xuống 500 để tăng tốc
 MIN_DATA_LENGTH = 30  # Giảm từ 50 xuống 30
 ORDER_BOOK_DEPTH = 10  # Giảm depth của order book
+SCANNER_MAX_WORKERS = 16  # Trần số luồng tải song song (mỗi cặp x mỗi loại dữ liệu 1 luồng, VD 5 cặp x 2 = 10)
+BINANCE_WEIGHT_LIMIT = 6000  # Giới hạn request weight/phút của Binance (header X-MBX-USED-WEIGHT-1M)
+BINANCE_WEIGHT_SAFETY = 0.9  # Chỉ dùng 90% ngân sách weight, phần còn lại chừa cho sai lệch với server
+BINANCE_POOL_SIZE = 20  # Số kết nối HTTP keep-alive của Client dùng chung (>= SCANNER_MAX_WORKERS + các thread monitor/SL)
+
+# Cấu hình candle store - lưu nến cục bộ, chỉ tải nến mới mỗi chu kỳ
+CANDLE_STORE_ENABLED = True
+CANDLE_STORE_DIR = 'candle_data'  # Thư mục lưu nến theo symbol/interval
+CANDLE_STORE_MAX_CANDLES = 6000  # Số nến tối đa giữ lại cho mỗi symbol/interval
+
+# Cấu hình market stream (WebSocket) - giá/sổ lệnh/nến trong bộ nhớ, chỉ gọi REST khi cache đã cũ
+MARKET_STREAM_ENABLED = True
+MARKET_STREAM_MAX_AGE = 5  # Giây - giá/sổ lệnh cũ hơn thì gọi REST
+MARKET_STREAM_KLINE_MAX_AGE = 10  # Giây - nến cũ hơn thì gọi REST
+MARKET_STREAM_DEPTH_LEVELS = 20  # Partial depth stream của Binance hỗ trợ 5/10/20 mức
+MARKET_STREAM_INTERVALS = ['15m', '30m']  # Khung nến nhận qua stream
+
+# Cấu hình SL engine - kiểm tra SL theo từng tick giá thay vì theo chu kỳ trading
+STOP_LOSS_POLL_INTERVAL = 2  # Giây - chu kỳ poll giá dự phòng khi không có tick WebSocket
+
+# Cấu hình exchange metadata - cache bộ lọc symbol (tick/step size, min notional, OCO)
+EXCHANGE_METADATA_TTL = 3600  # Giây - tải lại get_exchange_info sau khoảng thời gian này
+
+# Cấu hình balance snapshot - 1 lần get_account dùng chung, huỷ khi đặt/huỷ lệnh hoặc có lệnh khớp
+BALANCE_SNAPSHOT_TTL = 5  # Giây
+
+# Cấu hình order journal - ACTIVE_ORDERS lưu dạng snapshot + journal append-only
+ACTIVE_ORDERS_FILE = 'active_orders.json'  # File snapshot (journal nằm cạnh với đuôi .journal)
+ORDER_JOURNAL_COMPACT_EVERY = 100  # Gộp journal vào snapshot sau số bản ghi này
+ORDER_JOURNAL_FSYNC = True  # Đẩy từng bản ghi xuống đĩa ngay khi ghi
+
+# Cấu hình gửi email thông báo (thread nền, dùng lại phiên SMTP)
+NOTIFICATION_DIGEST_WINDOW = 10  # Giây gom các thông báo thường thành 1 email tổng hợp
+NOTIFICATION_MAX_RETRIES = 3  # Số lần gửi lại khi lỗi SMTP
+NOTIFICATION_SMTP_IDLE_TIMEOUT = 60  # Đóng phiên SMTP sau số giây không có email
+
+# Cấu hình event log (JSON lines, ghi ở thread nền) - file/kích thước xoay vòng lấy từ TRADING_CONFIG
+EVENT_LOG_BUFFER_SIZE = 1000  # Số sự kiện gần nhất giữ trong bộ nhớ
+EVENT_LOG_QUEUE_SIZE = 10000  # Giới hạn hàng đợi ghi file
+EVENT_LOG_FLUSH_INTERVAL = 1.0  # Giây gom bản ghi trước khi ghi file
+
+# Cấu hình metrics - thời gian từng giai đoạn của chu kỳ trading
+METRICS_WINDOW = 1000  # Số lần đo gần nhất mỗi giai đoạn dùng để tính p50/p95/p99
+METRICS_FILE = 'metrics.json'  # Snapshot ghi sau mỗi chu kỳ (None = không ghi)
+METRICS_HTTP_PORT = None  # VD: 9100 để mở http://127.0.0.1:9100/metrics (None = tắt)
+METRICS_PROFILE_FIRST_CYCLE = False  # True = chạy cProfile cho chu kỳ đầu tiên
+
+# Cấu hình dự đoán giá (AR ridge trên log return, thay cho LSTM)
+FORECAST_ORDER = 10  # Số log return trước đó làm đặc trưng
+FORECAST_WINDOW = 120  # Số giá đóng cửa gần nhất dùng để fit
+FORECAST_RIDGE_ALPHA = 0.1  # Hệ số ridge (tương đối)
+FORECAST_HORIZON = 1  # Dự đoán giá sau N nến
+FORECAST_CACHE_SIZE = 64  # Số model (symbol, khung nến) giữ trong bộ nhớ
+
+# Cache kết quả tối ưu tham số theo (symbol, khung nến, nến cuối, lưới tham số)
+MODEL_CACHE_SIZE = 256  # Số mục tối đa (LRU)
+MODEL_CACHE_FILE = None  # VD: 'model_cache.json' để giữ kết quả qua các lần khởi động (None = chỉ bộ nhớ)
 
 # Cấu hình validation
 MAX_PRICE_PREDICTION_RATIO = 10  # Giá dự đoán không được vượt quá N lần giá hiện tại
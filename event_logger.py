@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Event Logger - Log sự kiện giao dịch dạng JSON lines, ghi file ở thread nền
+
+log() chỉ tạo 1 bản ghi (dict) rồi đưa vào ring buffer + hàng đợi, không mở file trên thread gọi.
+Thread nền gom các bản ghi và ghi 1 lần, trước khi file vượt max_log_size_mb thì đổi tên thành
+<log_file>.backup_<thời gian> và mở file mới (không đọc lại nội dung file cũ).
+Mỗi dòng là 1 JSON: {"ts": ..., "event": ..., ...} - đọc lại bằng json.loads từng dòng.
+"""
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import config
+import trading_config
+
+
+class EventLogger:
+    def __init__(self, buffer_size=1000, queue_size=10000, flush_interval=1.0):
+        """
+        Args:
+            buffer_size: Số bản ghi gần nhất giữ trong bộ nhớ (recent())
+            queue_size: Giới hạn hàng đợi ghi file - đầy thì bỏ bản ghi thay vì chặn thread gọi
+            flush_interval: Giây tối đa 1 bản ghi nằm trong hàng đợi trước khi được ghi
+        """
+        self.buffer = deque(maxlen=buffer_size)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.flush_interval = flush_interval
+        self.thread = None
+        self.lock = threading.Lock()
+        self.stats = {'records': 0, 'written': 0, 'dropped': 0, 'rotations': 0, 'errors': 0}
+
+    # ===== Phía thread gọi =====
+
+    def log(self, event, **fields):
+        """Ghi 1 sự kiện (VD: log('order', action='BUY', symbol='ADA/JPY', price=110.5))"""
+        settings = trading_config.TRADING_CONFIG
+        record = {'ts': datetime.now().isoformat(timespec='milliseconds'), 'event': event, **fields}
+        self.buffer.append(record)
+        self.stats['records'] += 1
+        if not settings.get('log_trades', True):
+            return record
+
+        # Lấy đường dẫn lúc log để bản ghi không bị ghi nhầm file nếu log_file đổi sau đó
+        path = settings.get('log_file', 'trading_log.txt')
+        max_bytes = settings.get('max_log_size_mb', 50) * 1024 * 1024
+        self._ensure_started()
+        try:
+            self.queue.put_nowait((path, max_bytes, record))
+        except queue.Full:
+            self.stats['dropped'] += 1
+        return record
+
+    def recent(self, limit=None, event=None):
+        """Các bản ghi gần nhất trong ring buffer (lọc theo event nếu có)"""
+        records = [r for r in list(self.buffer) if event is None or r['event'] == event]
+        return records[-limit:] if limit else records
+
+    def flush(self, timeout=10):
+        """Chờ ghi hết hàng đợi xuống file"""
+        deadline = time.time() + timeout
+        while self.queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.01)
+        return not self.queue.unfinished_tasks
+
+    def _ensure_started(self):
+        if self.thread is not None and self.thread.is_alive():
+            return
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name='event-logger', daemon=True)
+                self.thread.start()
+
+    # ===== Thread nền =====
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            # Gom các bản ghi đến trong flush_interval để ghi 1 lần
+            deadline = time.time() + self.flush_interval
+            while True:
+                try:
+                    batch.append(self.queue.get(timeout=max(0.0, deadline - time.time())))
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"⚠️ Lỗi ghi log: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _write(self, batch):
+        by_path = {}
+        for path, max_bytes, record in batch:
+            lines, _ = by_path.setdefault(path, ([], max_bytes))
+            lines.append(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+
+        for path, (lines, max_bytes) in by_path.items():
+            f = open(path, 'a', encoding='utf-8')
+            try:
+                size = f.tell()
+                for line in lines:
+                    line_bytes = len(line.encode('utf-8'))
+                    if size and size + line_bytes > max_bytes:
+                        f.close()
+                        self._rotate(path)
+                        f = open(path, 'a', encoding='utf-8')
+                        size = 0
+                    f.write(line)
+                    size += line_bytes
+                    self.stats['written'] += 1
+            finally:
+                f.close()
+
+    def _rotate(self, path):
+        """Đổi tên file hiện tại thành backup - cleanup_old_logs xoá backup quá hạn"""
+        backup_path = f"{path}.backup_{time.strftime('%Y%m%d_%H%M%S')}"
+        suffix = 1
+        while os.path.exists(backup_path):
+            backup_path = f"{path}.backup_{time.strftime('%Y%m%d_%H%M%S')}_{suffix}"
+            suffix += 1
+        os.replace(path, backup_path)
+        self.stats['rotations'] += 1
+        print(f"📂 Log rotation: {path} → {backup_path}")
+
+
+# Logger dùng chung cho app (lỗi hệ thống, thông báo, lệnh, chu kỳ)
+event_logger = EventLogger(config.EVENT_LOG_BUFFER_SIZE, config.EVENT_LOG_QUEUE_SIZE, config.EVENT_LOG_FLUSH_INTERVAL)
+atexit.register(event_logger.flush, 5)
+
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Exchange Metadata - Cache thông tin symbol (bộ lọc, precision, min notional) của Binance
+
+get_exchange_info chỉ được tải 1 lần rồi làm mới theo TTL, thay vì quét toàn bộ
+danh sách symbol ở mỗi lần đặt lệnh.
+"""
+
+import math
+import threading
+import time
+
+
+def parse_symbol_info(symbol_info):
+    """Rút gọn 1 phần tử 'symbols' của get_exchange_info thành dict các bộ lọc cần dùng"""
+    filters = {f['filterType']: f for f in symbol_info.get('filters', [])}
+    lot_size = filters.get('LOT_SIZE', {})
+    price_filter = filters.get('PRICE_FILTER', {})
+    # Symbol cũ dùng MIN_NOTIONAL, symbol mới dùng NOTIONAL
+    notional = filters.get('MIN_NOTIONAL') or filters.get('NOTIONAL') or {}
+
+    return {
+        'symbol': symbol_info['symbol'],
+        'status': symbol_info.get('status', 'TRADING'),
+        'base_asset': symbol_info.get('baseAsset'),
+        'quote_asset': symbol_info.get('quoteAsset'),
+        'tick_size': float(price_filter.get('tickSize', 0)),
+        'min_price': float(price_filter.get('minPrice', 0)),
+        'step_size': float(lot_size.get('stepSize', 0)),
+        'min_qty': float(lot_size.get('minQty', 0)),
+        'max_qty': float(lot_size.get('maxQty', 0)),
+        'min_notional': float(notional.get('minNotional', 0)),
+        'oco_allowed': bool(symbol_info.get('ocoAllowed', False)) or 'OCO' in symbol_info.get('permissions', [])
+    }
+
+
+def _decimals(step):
+    """Số chữ số thập phân của step (0.001 -> 3)"""
+    if step <= 0:
+        return 8
+    return len(f"{step:.10f}".rstrip('0').split('.')[1])
+
+
+def floor_to_step(value, step):
+    """Làm tròn xuống theo bước (stepSize/tickSize), tránh sai số float"""
+    if step <= 0:
+        return value
+    return round(math.floor(value / step + 1e-9) * step, _decimals(step))
+
+
+class ExchangeMetadataCache:
+    def __init__(self, ttl=3600):
+        """
+        Args:
+            ttl: Thời gian (giây) trước khi tải lại get_exchange_info
+        """
+        self.ttl = ttl
+        self.symbols = {}  # 'ETHJPY' -> dict từ parse_symbol_info
+        self.loaded_at = 0
+        self.refresh_count = 0
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()  # Chỉ 1 luồng tải lại khi hết TTL
+
+    def refresh(self, client):
+        """Tải lại toàn bộ thông tin symbol từ exchange"""
+        exchange_info = client.get_exchange_info()
+        symbols = {s['symbol']: parse_symbol_info(s) for s in exchange_info.get('symbols', [])}
+        with self.lock:
+            self.symbols = symbols
+            self.loaded_at = time.monotonic()
+            self.refresh_count += 1
+        return symbols
+
+    def _is_fresh(self):
+        return bool(self.symbols) and time.monotonic() - self.loaded_at < self.ttl
+
+    def _ensure_loaded(self, client):
+        if self._is_fresh():
+            return
+        with self.refresh_lock:
+            # Kiểm tra lại: luồng khác có thể vừa làm mới xong trong lúc chờ lock
+            if self._is_fresh():
+                return
+            try:
+                self.refresh(client)
+            except Exception as e:
+                if not self.symbols:
+                    raise
+                # Giữ dữ liệu cũ nếu làm mới thất bại - bộ lọc symbol hiếm khi thay đổi
+                print(f"⚠️ Không làm mới được exchange info, dùng cache cũ: {e}")
+
+    def invalidate(self):
+        with self.lock:
+            self.loaded_at = 0
+
+    def get(self, client, symbol):
+        """Thông tin symbol ('ETH/JPY' hoặc 'ETHJPY'), None nếu không tồn tại"""
+        self._ensure_loaded(client)
+        return self.symbols.get(symbol.replace('/', ''))
+
+    def trading_symbols(self, client):
+        """Tập các symbol đang ở trạng thái TRADING"""
+        self._ensure_loaded(client)
+        return {name for name, info in self.symbols.items() if info['status'] == 'TRADING'}
+
+    def round_quantity(self, client, symbol, quantity):
+        info = self.get(client, symbol)
+        return floor_to_step(quantity, info['step_size']) if info else quantity
+
+    def round_price(self, client, symbol, price):
+        info = self.get(client, symbol)
+        return floor_to_step(price, info['tick_size']) if info else price
+
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Forecaster - Dự đoán giá nến kế tiếp bằng AR ridge trên log return (NumPy, chạy trên CPU)
+
+Mỗi symbol giữ 1 model với ma trận thống kê X'X, X'y của cửa sổ `window` giá đóng cửa gần nhất.
+Khi có nến mới chỉ cộng dòng của nến mới và trừ dòng trượt ra khỏi cửa sổ rồi giải hệ (order+1)x(order+1),
+nên mỗi lần dự đoán chỉ tốn vài chục micro giây. Nến cuối chưa đóng (close thay đổi) cũng được cập nhật tăng dần.
+"""
+
+import threading
+
+import numpy as np
+
+import config
+from model_cache import ModelCache, grid_hash
+from windowing import sliding_windows
+
+
+class ReturnForecaster:
+    def __init__(self, order=10, window=120, alpha=0.1, min_rows=20):
+        """
+        Args:
+            order: Số log return trước đó dùng làm đặc trưng (AR order)
+            window: Số giá đóng cửa gần nhất dùng để fit
+            alpha: Hệ số ridge, tương đối so với độ lớn trung bình đường chéo X'X
+            min_rows: Số mẫu tối thiểu để dự đoán (ít hơn thì predict trả về None)
+        """
+        self.order = order
+        self.window = max(window, order + 2)
+        self.alpha = alpha
+        self.min_rows = min_rows
+        self.times = None  # Open time (ms) các nến trong cửa sổ
+        self.closes = None
+        self.returns = None
+        self.xtx = None
+        self.xty = None
+        self.coef = None
+        self.updates = 0  # Số lần cập nhật tăng dần kể từ lần fit đầy đủ gần nhất
+
+    @property
+    def rows(self):
+        return 0 if self.returns is None else max(0, len(self.returns) - self.order)
+
+    def _rows(self, returns, start, stop):
+        """Đặc trưng [1, r(t-1) .. r(t-order)] và target r(t) cho t trong [start, stop)"""
+        lags, targets = sliding_windows(returns[start - self.order:stop], self.order)
+        X = np.empty((stop - start, self.order + 1))
+        X[:, 0] = 1.0
+        X[:, 1:] = lags[:, ::-1]
+        return X, targets
+
+    def _accumulate(self, returns, start, stop, sign=1.0):
+        if stop <= start:
+            return
+        X, y = self._rows(returns, start, stop)
+        self.xtx += sign * (X.T @ X)
+        self.xty += sign * (X.T @ y)
+
+    def _solve(self):
+        if self.rows < self.min_rows:
+            self.coef = None
+            return
+        A = self.xtx.copy()
+        penalty = self.alpha * float(np.mean(np.diag(A)[1:]))
+        A[1:, 1:] += penalty * np.eye(self.order)  # Không phạt hệ số chặn
+        try:
+            self.coef = np.linalg.solve(A, self.xty)
+        except np.linalg.LinAlgError:
+            self.coef = np.linalg.lstsq(A, self.xty, rcond=None)[0]
+
+    def fit(self, times, closes):
+        """Fit đầy đủ trên `window` nến cuối"""
+        self.times = np.array(times[-self.window:], dtype=np.int64)
+        self.closes = np.array(closes[-self.window:], dtype=float)
+        self.returns = np.diff(np.log(self.closes))
+        self.xtx = np.zeros((self.order + 1, self.order + 1))
+        self.xty = np.zeros(self.order + 1)
+        self._accumulate(self.returns, self.order, len(self.returns))
+        self.updates = 0
+        self._solve()
+        return 'fit'
+
+    def _pop_last(self):
+        """Bỏ nến cuối (nến chưa đóng của lần trước) khỏi cửa sổ và thống kê"""
+        n = len(self.returns)
+        if n - 1 >= self.order:
+            self._accumulate(self.returns, n - 1, n, sign=-1.0)
+        self.returns = self.returns[:-1]
+        self.closes = self.closes[:-1]
+        self.times = self.times[:-1]
+
+    def _append(self, new_times, new_closes):
+        new_returns = np.diff(np.log(np.concatenate(([self.closes[-1]], new_closes))))
+        combined = np.concatenate((self.returns, new_returns))
+        self._accumulate(combined, max(len(self.returns), self.order), len(combined))
+
+        # Trượt cửa sổ: trừ các dòng có target rơi ra ngoài
+        drop = max(0, len(combined) - (self.window - 1))
+        self._accumulate(combined, self.order, self.order + drop, sign=-1.0)
+        self.returns = combined[drop:]
+        self.closes = np.concatenate((self.closes, new_closes))[drop:]
+        self.times = np.concatenate((self.times, new_times))[drop:]
+
+    def update(self, times, closes):
+        """
+        Cập nhật theo dữ liệu nến mới nhất (times tăng dần, cùng khung thời gian)
+
+        Returns:
+            str: 'cached' (không đổi), 'incremental' hoặc 'fit'
+        """
+        times = np.asarray(times, dtype=np.int64)
+        closes = np.asarray(closes, dtype=float)
+        if self.times is None or len(self.times) < 2 or len(times) < 2:
+            return self.fit(times, closes)
+
+        last_ts = self.times[-1]
+        j = int(np.searchsorted(times, last_ts))
+        if j == 0 or j >= len(times) or times[j] != last_ts or times[j - 1] != self.times[-2] \
+                or closes[j - 1] != self.closes[-2]:
+            return self.fit(times, closes)
+
+        new_count = len(times) - 1 - j
+        if new_count == 0 and closes[j] == self.closes[-1]:
+            return 'cached'
+        if new_count + 1 >= self.window // 2 or self.updates >= self.window:
+            return self.fit(times, closes)  # Đổi nhiều hoặc đã cộng/trừ nhiều lần - fit lại cho sạch sai số
+
+        if closes[j] != self.closes[-1]:
+            # Nến cuối lần trước chưa đóng - thay bằng giá mới
+            self._pop_last()
+            self._append(times[j:], closes[j:])
+        else:
+            self._append(times[j + 1:], closes[j + 1:])
+        self.updates += 1
+        self._solve()
+        return 'incremental'
+
+    def predict(self, horizon=1):
+        """Giá đóng cửa dự đoán sau horizon nến (dự đoán đệ quy log return), None nếu chưa đủ dữ liệu"""
+        if self.coef is None:
+            return None
+        lags = list(self.returns[::-1][:self.order])
+        total = 0.0
+        for _ in range(horizon):
+            predicted = float(self.coef[0] + np.dot(self.coef[1:], lags))
+            total += predicted
+            lags = [predicted] + lags[:-1]
+        return float(self.closes[-1] * np.exp(total))
+
+
+# Model đã fit theo (symbol, khung nến, cấu hình model) - LRU, chỉ trong bộ nhớ.
+# Không cần open time nến cuối trong khoá: model tự nhận biết nến mới và cập nhật tăng dần.
+predictor_cache = ModelCache(config.FORECAST_CACHE_SIZE)
+_predictor_lock = threading.Lock()
+
+
+def forecast_next_close(symbol, times, closes, order=None, horizon=None):
+    """
+    Dự đoán giá đóng cửa kế tiếp với model dùng chung của symbol (cập nhật tăng dần theo nến mới)
+
+    Args:
+        times: Open time (ms) các nến, tăng dần
+        closes: Giá đóng cửa tương ứng
+    """
+    order = order or config.FORECAST_ORDER
+    if len(times) < 2:
+        return None
+    key = ('predictor', symbol, int(times[-1] - times[-2]),
+           grid_hash(order, config.FORECAST_WINDOW, config.FORECAST_RIDGE_ALPHA))
+
+    with _predictor_lock:
+        forecaster = predictor_cache.get_or_compute(
+            key, lambda: ReturnForecaster(order, config.FORECAST_WINDOW, config.FORECAST_RIDGE_ALPHA)
+        )
+        # Model có trạng thái - cập nhật + dự đoán trong lock (mỗi lần chỉ vài chục µs)
+        forecaster.update(times, closes)
+        return forecaster.predict(horizon or config.FORECAST_HORIZON)
+
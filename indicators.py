@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Indicators - Kernel tính toàn bộ chỉ số kỹ thuật 1 lần bằng NumPy (thay cho các object của thư viện ta)
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Các cột giá gốc được giữ lại trong frame chỉ số
+PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+# Tập cột chỉ số dùng chung cho analyze_trends, detect_*_downtrend và find_orderbook_opportunities
+INDICATOR_COLUMNS = [
+    'SMA_10', 'SMA_20', 'SMA_50', 'EMA_8', 'EMA_21', 'RSI',
+    'MACD', 'MACD_signal', 'MACD_histogram',
+    'BB_upper', 'BB_middle', 'BB_lower',
+    'Stoch_K', 'Stoch_D', 'Volatility'
+]
+
+# Giới hạn hệ số phóng đại trong 1 block EWM (giữ sai số float ~1e-10)
+EWM_BLOCK_MAX_SCALE = 1e6
+
+# Cache frame chỉ số theo dấu vân tay dữ liệu nến
+INDICATOR_CACHE_SIZE = 64
+_indicator_cache = OrderedDict()
+_indicator_cache_lock = threading.Lock()
+
+
+def rolling_mean(values, window):
+    """Trung bình trượt, NaN cho window - 1 phần tử đầu (giống rolling(window).mean())"""
+    values = np.asarray(values, dtype=float)
+    result = np.full(len(values), np.nan)
+    if len(values) >= window:
+        result[window - 1:] = sliding_window_view(values, window).mean(axis=1)
+    return result
+
+
+def rolling_std(values, window):
+    """Độ lệch chuẩn trượt với ddof=0 (giống BollingerBands của ta)"""
+    values = np.asarray(values, dtype=float)
+    result = np.full(len(values), np.nan)
+    if len(values) >= window:
+        result[window - 1:] = sliding_window_view(values, window).std(axis=1)
+    return result
+
+
+def rolling_min(values, window):
+    values = np.asarray(values, dtype=float)
+    result = np.full(len(values), np.nan)
+    if len(values) >= window:
+        result[window - 1:] = sliding_window_view(values, window).min(axis=1)
+    return result
+
+
+def rolling_max(values, window):
+    values = np.asarray(values, dtype=float)
+    result = np.full(len(values), np.nan)
+    if len(values) >= window:
+        result[window - 1:] = sliding_window_view(values, window).max(axis=1)
+    return result
+
+
+def ewm_mean(values, alpha, min_periods=0):
+    """
+    EWM với adjust=False (giống series.ewm(alpha=..., adjust=False).mean())
+
+    Đệ quy y[t] = (1 - alpha) * y[t-1] + alpha * x[t] được giải theo từng block bằng cumsum,
+    bắt đầu từ giá trị hợp lệ đầu tiên (bỏ qua NaN ở đầu chuỗi).
+    """
+    values = np.asarray(values, dtype=float)
+    result = np.full(len(values), np.nan)
+    valid = np.flatnonzero(~np.isnan(values))
+    if len(valid) == 0:
+        return result
+
+    start = valid[0]
+    x = values[start:]
+    out = np.empty(len(x))
+    out[0] = x[0]
+
+    decay = 1.0 - alpha
+    if decay <= 0:
+        out[:] = x
+    else:
+        block = max(1, int(np.log(EWM_BLOCK_MAX_SCALE) / -np.log(decay)))
+        prev = x[0]
+        pos = 1
+        while pos < len(x):
+            end = min(pos + block, len(x))
+            powers = decay ** np.arange(1, end - pos + 1)
+            out[pos:end] = powers * (prev + alpha * np.cumsum(x[pos:end] / powers))
+            prev = out[end - 1]
+            pos = end
+
+    result[start:] = out
+    if min_periods > 1:
+        result[start:start + min_periods - 1] = np.nan
+    return result
+
+
+def ema(values, window):
+    """EMA giống EMAIndicator của ta (span=window, min_periods=window)"""
+    return ewm_mean(values, 2.0 / (window + 1), min_periods=window)
+
+
+def rsi(close, window=14):
+    """RSI giống RSIIndicator của ta (Wilder smoothing)"""
+    diff = np.diff(close, prepend=np.nan)
+    up = np.where(diff > 0, diff, 0.0)
+    down = np.where(diff < 0, -diff, 0.0)
+    ema_up = ewm_mean(up, 1.0 / window, min_periods=window)
+    ema_down = ewm_mean(down, 1.0 / window, min_periods=window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        relative_strength = ema_up / ema_down
+        return np.where(ema_down == 0, 100.0, 100.0 - (100.0 / (1.0 + relative_strength)))
+
+
+def compute_indicators(df):
+    """
+    Tính toàn bộ chỉ số kỹ thuật trong 1 lượt
+
+    Args:
+        df: DataFrame có các cột open/high/low/close/volume
+
+    Returns:
+        DataFrame: Cột giá gốc + INDICATOR_COLUMNS, cùng index với df
+    """
+    close = df['close'].to_numpy(dtype=float)
+    high = df['high'].to_numpy(dtype=float)
+    low = df['low'].to_numpy(dtype=float)
+
+    columns = {col: df[col].to_numpy(dtype=float) for col in PRICE_COLUMNS if col in df.columns}
+
+    columns['SMA_10'] = rolling_mean(close, 10)
+    columns['SMA_20'] = rolling_mean(close, 20)
+    columns['SMA_50'] = rolling_mean(close, 50)
+    columns['EMA_8'] = ema(close, 8)
+    columns['EMA_21'] = ema(close, 21)
+    columns['RSI'] = rsi(close, 14)
+
+    # MACD(26, 12, 9)
+    macd_line = ema(close, 12) - ema(close, 26)
+    macd_signal = ema(macd_line, 9)
+    columns['MACD'] = macd_line
+    columns['MACD_signal'] = macd_signal
+    columns['MACD_histogram'] = macd_line - macd_signal
+
+    # Bollinger Bands(20, 2) - dùng chung SMA_20 làm đường giữa
+    bb_std = rolling_std(close, 20)
+    columns['BB_middle'] = columns['SMA_20']
+    columns['BB_upper'] = columns['SMA_20'] + 2 * bb_std
+    columns['BB_lower'] = columns['SMA_20'] - 2 * bb_std
+
+    # Stochastic(14, 3) - giữ đúng thứ tự tham số các hàm phân tích đang truyền cho ta:
+    # StochasticOscillator(close, high, low) => high=close, low=high, close=low
+    lowest_low = rolling_min(high, 14)
+    highest_high = rolling_max(close, 14)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        stoch_k = 100 * (low - lowest_low) / (highest_high - lowest_low)
+        columns['Volatility'] = (high - low) / close * 100
+    columns['Stoch_K'] = stoch_k
+    columns['Stoch_D'] = rolling_mean(stoch_k, 3)
+
+    return pd.DataFrame(columns, index=df.index)
+
+
+def _fingerprint(df):
+    """Dấu vân tay của dữ liệu nến (hash index + toàn bộ cột OHLCV) để nhận ra cùng 1 bộ nến (kể cả bản copy)"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(pd.util.hash_pandas_object(df.index, index=False).to_numpy().view(np.uint8))
+    for col in PRICE_COLUMNS:
+        if col in df.columns:
+            digest.update(col.encode('ascii'))
+            digest.update(np.ascontiguousarray(df[col].to_numpy(dtype=float)).view(np.uint8))
+    return len(df), digest.hexdigest()
+
+
+def get_indicator_frame(df):
+    """
+    Lấy frame chỉ số cho df, chỉ tính lại khi dữ liệu nến thay đổi
+
+    Frame trả về được dùng chung - chỉ đọc, không sửa trực tiếp.
+    """
+    if df is None or len(df) == 0:
+        return None
+
+    key = _fingerprint(df)
+    with _indicator_cache_lock:
+        frame = _indicator_cache.get(key)
+        if frame is not None:
+            _indicator_cache.move_to_end(key)
+            return frame
+
+    frame = compute_indicators(df)
+
+    with _indicator_cache_lock:
+        _indicator_cache[key] = frame
+        while len(_indicator_cache) > INDICATOR_CACHE_SIZE:
+            _indicator_cache.popitem(last=False)
+    return frame
+
+
+def check_parity_with_ta(df, tolerance=1e-6):
+    """
+    So sánh kết quả kernel với thư viện ta
+
+    Returns:
+        dict: cột -> sai số tương đối lớn nhất (cột lệch sẽ có 'passed' = False)
+    """
+    from ta.trend import SMAIndicator, MACD, EMAIndicator
+    from ta.momentum import RSIIndicator, StochasticOscillator
+    from ta.volatility import BollingerBands
+
+    close = df['close']
+    macd = MACD(close, window_slow=26, window_fast=12, window_sign=9)
+    bb = BollingerBands(close, window=20, window_dev=2)
+    stoch = StochasticOscillator(close, df['high'], df['low'], window=14)
+
+    expected = {
+        'SMA_10': SMAIndicator(close, window=10).sma_indicator(),
+        'SMA_20': SMAIndicator(close, window=20).sma_indicator(),
+        'SMA_50': SMAIndicator(close, window=50).sma_indicator(),
+        'EMA_8': EMAIndicator(close, window=8).ema_indicator(),
+        'EMA_21': EMAIndicator(close, window=21).ema_indicator(),
+        'RSI': RSIIndicator(close, window=14).rsi(),
+        'MACD': macd.macd(),
+        'MACD_signal': macd.macd_signal(),
+        'MACD_histogram': macd.macd_diff(),
+        'BB_upper': bb.bollinger_hband(),
+        'BB_middle': bb.bollinger_mavg(),
+        'BB_lower': bb.bollinger_lband(),
+        'Stoch_K': stoch.stoch(),
+        'Stoch_D': stoch.stoch_signal(),
+        'Volatility': (df['high'] - df['low']) / close * 100
+    }
+
+    actual = compute_indicators(df)
+    report = {}
+    all_passed = True
+    for col, expected_series in expected.items():
+        expected_values = expected_series.to_numpy(dtype=float)
+        actual_values = actual[col].to_numpy(dtype=float)
+
+        same_nan = np.array_equal(np.isnan(expected_values), np.isnan(actual_values))
+        mask = ~np.isnan(expected_values) & ~np.isnan(actual_values)
+        scale = np.maximum(1.0, np.abs(expected_values[mask]))
+        max_diff = float(np.max(np.abs(expected_values[mask] - actual_values[mask]) / scale)) if mask.any() else 0.0
+        passed = same_nan and max_diff <= tolerance
+
+        report[col] = {'max_diff': max_diff, 'same_nan': same_nan, 'passed': passed}
+        all_passed = all_passed and passed
+
+    report['passed'] = all_passed
+    return report
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Light Tasks - Tác vụ ngắn cho cron/Lambda, không import app.py
+
+app.py kéo theo pandas/numpy/ta và toàn bộ hệ thống trading. Các tác vụ ở đây chỉ dùng file lệnh
+(order journal), Client dùng chung và email nền, module nặng hơn chỉ import khi tác vụ cần:
+- python light_tasks.py sl       Kiểm tra manual stop loss của các lệnh TP đang theo dõi
+- python light_tasks.py orders   Trạng thái các lệnh đang theo dõi (1 get_open_orders mỗi symbol)
+- python light_tasks.py account  Thông tin tài khoản
+Mỗi lần chạy in thời gian khởi động (import) và thời gian chạy tác vụ.
+"""
+
+import time
+
+IMPORT_STARTED = time.perf_counter()
+
+import argparse
+import sys
+from datetime import datetime, timezone
+
+import config
+from order_journal import OrderJournal
+
+MANUAL_SL_RATIO = 0.992  # SL target = giá mua -0.8%
+HEAVY_MODULES = ('pandas', 'numpy', 'ta', 'sklearn')
+
+# Trạng thái lệnh của python-binance -> format tương thích (ccxt)
+ORDER_STATUS_MAPPING = {
+    'NEW': 'open',
+    'PARTIALLY_FILLED': 'open',
+    'FILLED': 'closed',
+    'CANCELED': 'canceled',
+    'PENDING_CANCEL': 'open',
+    'REJECTED': 'rejected',
+    'EXPIRED': 'expired'
+}
+
+# Loại id của lệnh đang theo dõi: orderId thường hoặc orderListId của lệnh OCO
+ID_TYPE_ORDER = 'order'
+ID_TYPE_ORDER_LIST = 'order_list'
+
+
+# ===== Lệnh đang theo dõi =====
+
+def load_active_orders(path=config.ACTIVE_ORDERS_FILE):
+    """Đọc danh sách lệnh đang theo dõi (snapshot + journal) - chỉ đọc, không gộp journal"""
+    journal = OrderJournal(path, config.ORDER_JOURNAL_COMPACT_EVERY, config.ORDER_JOURNAL_FSYNC)
+    return journal.load() if journal.exists() else {}
+
+
+def format_order_status(order, symbol):
+    """Chuyển order của python-binance sang format tương thích (ccxt) - định nghĩa duy nhất, app dùng lại hàm này"""
+    filled = float(order['executedQty'])
+    cost = float(order['cummulativeQuoteQty'])
+    price = float(order['price'])
+    return {
+        'id': str(order['orderId']),
+        'symbol': symbol,  # Trả về format ban đầu ADA/JPY
+        'status': ORDER_STATUS_MAPPING.get(order['status'], order['status'].lower()),
+        'type': order['type'].lower(),
+        'side': order['side'].lower(),
+        'amount': float(order['origQty']),
+        'filled': filled,
+        'remaining': float(order['origQty']) - filled,
+        'price': price if price > 0 else None,
+        # Giá khớp trung bình thật (lệnh market có price = 0, lệnh limit có thể khớp tốt hơn giá đặt)
+        'average': cost / filled if filled > 0 else None,
+        'cost': cost,
+        'timestamp': order['time'],
+        'datetime': datetime.fromtimestamp(order['time'] / 1000, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+
+def order_id_type(order_info):
+    """Loại id của lệnh đang theo dõi (file lệnh cũ chưa có 'id_type': lệnh OCO luôn theo dõi bằng orderListId)"""
+    if order_info.get('id_type'):
+        return order_info['id_type']
+    return ID_TYPE_ORDER_LIST if str(order_info.get('order_type', '')).startswith('OCO') else ID_TYPE_ORDER
+
+
+def format_order_list_status(order_list_id, legs, symbol):
+    """
+    Trạng thái 1 lệnh OCO theo chân đã khớp: 'open' khi còn chân đang chờ, ngược lại là trạng thái
+    của chân đã khớp ('closed' nếu khớp hết), không chân nào khớp thì 'canceled'
+
+    Args:
+        legs: Các chân của lệnh (format get_order/get_open_orders của python-binance)
+    """
+    # Chân đại diện: chân khớp nhiều nhất, chưa khớp thì lấy chân TP (LIMIT_MAKER)
+    leg = max(legs, key=lambda order: (float(order['executedQty']), order['type'] == 'LIMIT_MAKER'))
+    status = format_order_status(leg, symbol)
+    status['id'] = str(order_list_id)
+    status['leg_id'] = str(leg['orderId'])
+    if any(ORDER_STATUS_MAPPING.get(order['status']) == 'open' for order in legs):
+        status['status'] = 'open'
+    elif status['filled'] == 0:
+        status['status'] = 'canceled'
+    return status
+
+
+def get_order_status(client, order_id, symbol, id_type=ID_TYPE_ORDER):
+    """Trạng thái 1 lệnh hoặc 1 lệnh OCO (id_type=ID_TYPE_ORDER_LIST) - None nếu không kiểm tra được"""
+    try:
+        # Chuyển đổi symbol format từ ADA/JPY thành ADAJPY
+        binance_symbol = symbol.replace('/', '')
+        if id_type == ID_TYPE_ORDER_LIST:
+            # GET /api/v3/orderList chỉ có id các chân - lấy trạng thái từng chân
+            order_list = client.v3_get_order_list(orderListId=int(order_id))
+            legs = [client.get_order(symbol=binance_symbol, orderId=leg['orderId']) for leg in order_list['orders']]
+            return format_order_list_status(order_id, legs, symbol)
+        order = client.get_order(symbol=binance_symbol, orderId=order_id)
+        return format_order_status(order, symbol)
+    except Exception as e:
+        print(f"⚠️ Lỗi kiểm tra order {order_id}: {e}")
+        return None
+
+
+def fetch_order_statuses(client, tracked):
+    """
+    Trạng thái các lệnh theo lô: 1 lần get_open_orders cho mỗi symbol, chỉ gọi get_order riêng
+    cho các lệnh không còn trong danh sách lệnh mở (đã khớp/huỷ)
+
+    Args:
+        tracked: dict order_id -> thông tin lệnh (cần 'symbol' dạng ADA/JPY, 'id_type' cho lệnh OCO)
+
+    Returns:
+        dict: order_id -> format_order_status (None nếu không kiểm tra được)
+    """
+    orders_by_symbol = {}
+    for order_id, order_info in tracked.items():
+        orders_by_symbol.setdefault(order_info['symbol'], []).append(order_id)
+
+    statuses = {}
+    for symbol, order_ids in orders_by_symbol.items():
+        try:
+            open_orders = client.get_open_orders(symbol=symbol.replace('/', ''))
+        except Exception as e:
+            print(f"⚠️ Lỗi lấy lệnh mở {symbol}: {e}")
+            for order_id in order_ids:
+                statuses[order_id] = None
+            continue
+
+        # Lệnh OCO được theo dõi theo orderListId - gom các chân còn mở theo list id
+        open_by_id = {}
+        open_legs_by_list = {}
+        for order in open_orders:
+            open_by_id[str(order['orderId'])] = order
+            if order.get('orderListId', -1) != -1:
+                open_legs_by_list.setdefault(str(order['orderListId']), []).append(order)
+
+        for order_id in order_ids:
+            id_type = order_id_type(tracked[order_id])
+            if id_type == ID_TYPE_ORDER_LIST:
+                open_legs = open_legs_by_list.get(str(order_id))
+                if open_legs:
+                    statuses[order_id] = format_order_list_status(order_id, open_legs, symbol)
+                    continue
+            else:
+                open_order = open_by_id.get(str(order_id))
+                if open_order is not None:
+                    statuses[order_id] = format_order_status(open_order, symbol)
+                    continue
+            # Không còn trong lệnh mở - kiểm tra riêng để biết đã khớp hay đã huỷ
+            statuses[order_id] = get_order_status(client, order_id, symbol, id_type)
+    return statuses
+
+
+# ===== Manual stop loss =====
+
+def find_manual_stop_loss_triggers(active_orders, price_fetcher, sl_ratio=MANUAL_SL_RATIO):
+    """
+    Lệnh TP có giá hiện tại đã xuống dưới giá mua * sl_ratio (mỗi symbol chỉ lấy giá 1 lần)
+
+    Args:
+        price_fetcher: Hàm (symbol dạng ADA/JPY) -> giá hiện tại hoặc None
+
+    Returns:
+        list: dict order_id, symbol, current_price, sl_target, amount
+    """
+    prices = {}
+    triggers = []
+    for order_id, order_info in active_orders.items():
+        if order_info.get('order_type') != 'TAKE_PROFIT':
+            continue
+        buy_price = order_info.get('buy_price') or 0
+        if buy_price <= 0:
+            continue
+
+        symbol = order_info['symbol']
+        if symbol not in prices:
+            try:
+                prices[symbol] = price_fetcher(symbol)
+            except Exception:
+                prices[symbol] = None
+        current_price = prices[symbol]
+        sl_target = buy_price * sl_ratio
+        if current_price and current_price <= sl_target:
+            triggers.append({
+                'order_id': order_id,
+                'symbol': symbol,
+                'current_price': current_price,
+                'sl_target': sl_target,
+                'amount': order_info.get('amount', 'N/A')
+            })
+    return triggers
+
+
+def report_manual_stop_loss_trigger(trigger, notify):
+    """In khuyến nghị bán và gửi thông báo urgent qua notify(message, urgent=True)"""
+    symbol = trigger['symbol']
+    print(f"🚨 MANUAL SL TRIGGER for {symbol}:")
+    print(f"   📉 Current: ¥{trigger['current_price']:.4f} ≤ SL Target: ¥{trigger['sl_target']:.4f}")
+    print(f"   ⚠️ RECOMMEND: Market sell {trigger['amount']} {symbol.split('/')[0]}")
+    notify(f"🚨 Manual SL Trigger: {symbol} @ ¥{trigger['current_price']:.4f} ≤ ¥{trigger['sl_target']:.4f}", urgent=True)
+
+
+# ===== Tác vụ =====
+
+def notify(message, urgent=False):
+    """Email nền + event log (giống send_notification của app)"""
+    from account_info import send_trading_notification
+    from event_logger import event_logger
+
+    send_trading_notification(message, urgent)
+    event_logger.log('notification', message=message, urgent=urgent)
+
+
+def run_stop_loss_check(path=config.ACTIVE_ORDERS_FILE):
+    """Kiểm tra manual stop loss - không có lệnh TP thì không tạo Client"""
+    active_orders = load_active_orders(path)
+    if not any(order.get('order_type') == 'TAKE_PROFIT' for order in active_orders.values()):
+        print("  Không có lệnh TP nào đang được theo dõi")
+        return []
+
+    from client_registry import get_client
+    client = get_client()
+    triggers = find_manual_stop_loss_triggers(
+        active_orders, lambda symbol: float(client.get_symbol_ticker(symbol=symbol.replace('/', ''))['price'])
+    )
+    for trigger in triggers:
+        report_manual_stop_loss_trigger(trigger, notify)
+    return triggers
+
+
+def run_order_status(path=config.ACTIVE_ORDERS_FILE):
+    """In trạng thái các lệnh đang theo dõi"""
+    active_orders = load_active_orders(path)
+    if not active_orders:
+        print("  Không có lệnh nào đang được theo dõi")
+        return {}
+
+    from client_registry import get_client
+    print(f"🔍 Đang kiểm tra {len(active_orders)} lệnh...")
+    statuses = fetch_order_statuses(get_client(), active_orders)
+    for order_id, status in statuses.items():
+        if status:
+            print(f"  {order_id}: {status['status']} - {status['filled']:.6f}/{status['amount']:.6f}")
+        else:
+            print(f"❌ {order_id}: Không thể kiểm tra")
+    return statuses
+
+
+def run_account_info():
+    from account_info import get_account_info
+    return get_account_info()
+
+
+TASKS = {
+    'sl': run_stop_loss_check,
+    'orders': run_order_status,
+    'account': run_account_info
+}
+
+
+def run_task(name):
+    """Chạy 1 tác vụ và in thời gian cold start (import) + thời gian tác vụ"""
+    task_started = time.perf_counter()
+    try:
+        return TASKS[name]()
+    finally:
+        finished = time.perf_counter()
+        loaded = [module for module in HEAVY_MODULES if module in sys.modules]
+        timings = {
+            'import_ms': round((task_started - IMPORT_STARTED) * 1000, 1),
+            'task_ms': round((finished - task_started) * 1000, 1),
+            'total_ms': round((finished - IMPORT_STARTED) * 1000, 1)
+        }
+        print(f"⏱️ Cold start {name}: import {timings['import_ms']:.0f} ms | tác vụ {timings['task_ms']:.0f} ms | "
+              f"tổng {timings['total_ms']:.0f} ms | module nặng: {', '.join(loaded) or 'không'}")
+        if 'event_logger' in sys.modules:
+            sys.modules['event_logger'].event_logger.log('cold_start', task=name, heavy_modules=loaded, **timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tác vụ nhẹ không cần chạy bot (cron/Lambda)")
+    parser.add_argument('task', choices=sorted(TASKS), help="sl | orders | account")
+    args = parser.parse_args(argv)
+    run_task(args.task)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
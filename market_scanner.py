@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Market Scanner - Tải dữ liệu nhiều symbol song song với giới hạn request chung
+
+Client dùng chung đã giới hạn theo request weight của Binance (rate_limiter), nên mặc định
+scanner không cần token bucket riêng - chỉ dùng RateBudget khi truyền requests_per_second.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class RateBudget:
+    """Token bucket dùng chung cho tất cả request của scanner"""
+
+    def __init__(self, requests_per_second=10, burst=None):
+        self.rate = float(requests_per_second)
+        self.capacity = float(burst if burst is not None else requests_per_second)
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, cost=1):
+        """Chờ đến khi đủ token rồi trừ token"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                if self.tokens >= cost:
+                    self.tokens -= cost
+                    return
+                wait_time = (cost - self.tokens) / self.rate
+            time.sleep(wait_time)
+
+
+class MarketScanner:
+    def __init__(self, max_workers=16, requests_per_second=None):
+        """
+        Args:
+            max_workers: Trần số luồng - mỗi lần quét dùng 1 luồng cho mỗi (symbol, fetcher) để mọi request
+                chạy cùng lúc (tổng thời gian ~ 1 round trip chậm nhất); giới hạn tốc độ vẫn do rate limiter chung
+            requests_per_second: Token bucket riêng của scanner (None = không dùng)
+        """
+        self.max_workers = max_workers
+        self.budget = RateBudget(requests_per_second) if requests_per_second else None
+
+    def _run_fetcher(self, fetcher, symbol):
+        if self.budget is not None:
+            self.budget.acquire()
+        return fetcher(symbol)
+
+    def fetch_all(self, symbols, fetchers):
+        """
+        Chạy song song các hàm I/O cho từng symbol
+
+        Args:
+            symbols: Danh sách symbol (VD: ['ADA/JPY', 'XRP/JPY'])
+            fetchers: dict tên -> hàm nhận symbol (VD: {'df': ..., 'order_book': ...})
+
+        Returns:
+            dict: symbol -> {tên: kết quả} (kết quả None nếu lỗi)
+        """
+        results = {symbol: {} for symbol in symbols}
+        if not symbols or not fetchers:
+            return results
+
+        # 1 luồng cho mỗi request: ít luồng hơn thì các request xếp hàng thành nhiều đợt round trip
+        workers = max(1, min(self.max_workers, len(symbols) * len(fetchers)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {}
+            for symbol in symbols:
+                for name, fetcher in fetchers.items():
+                    futures[(symbol, name)] = executor.submit(self._run_fetcher, fetcher, symbol)
+
+            for (symbol, name), future in futures.items():
+                try:
+                    results[symbol][name] = future.result()
+                except Exception as e:
+                    print(f"⚠️ Lỗi tải {name} cho {symbol}: {e}")
+                    results[symbol][name] = None
+
+        return results
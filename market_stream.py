@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Market Stream - Cache giá/sổ lệnh/nến trong bộ nhớ được cập nhật qua WebSocket
+
+Các hàm REST của app đọc từ cache trước, chỉ gọi REST khi dữ liệu trong cache đã cũ.
+"""
+
+import threading
+import time
+
+from candle_store import INTERVAL_MS
+
+
+class MarketDataCache:
+    """Lưu best bid/ask, top-N depth và các nến gần nhất cho từng symbol"""
+
+    def __init__(self, max_age=5, kline_max_age=10, max_klines=500):
+        self.max_age = max_age
+        self.kline_max_age = kline_max_age
+        self.max_klines = max_klines
+        self.tickers = {}  # symbol -> {'bid', 'ask', 'bid_qty', 'ask_qty', 'updated'}
+        self.depths = {}  # symbol -> {'bids', 'asks', 'last_update_id', 'updated'}
+        self.klines = {}  # (symbol, interval) -> {'klines': list klines thô, 'updated'}
+        self.stats = {'hits': 0, 'stale': 0, 'messages': 0}
+        self.listeners = []  # Hàm (symbol, price) được gọi mỗi khi best bid/ask thay đổi
+        self.lock = threading.Lock()
+
+    def add_listener(self, callback):
+        if callback not in self.listeners:
+            self.listeners.append(callback)
+
+    # ===== Nhận message từ stream (format combined stream của Binance) =====
+
+    def handle_message(self, message):
+        """Xử lý 1 message {'stream': ..., 'data': ...} từ WebSocket"""
+        try:
+            if not isinstance(message, dict) or message.get('e') == 'error':
+                return
+            stream = message.get('stream', '')
+            data = message.get('data', message)
+            self.stats['messages'] += 1
+
+            if stream.endswith('@bookTicker') or ('b' in data and 'a' in data and 'u' in data):
+                self.update_book_ticker(data['s'], data['b'], data['a'], data.get('B', 0), data.get('A', 0))
+            elif '@depth' in stream:
+                symbol = stream.split('@')[0].upper()
+                self.update_depth(symbol, data['bids'], data['asks'], data.get('lastUpdateId'))
+            elif data.get('e') == 'kline':
+                k = data['k']
+                kline = [k['t'], k['o'], k['h'], k['l'], k['c'], k['v'], k['T'],
+                         k.get('q', '0'), k.get('n', 0), k.get('V', '0'), k.get('Q', '0'), '0']
+                self.update_kline(k['s'], k['i'], kline)
+        except Exception as e:
+            print(f"⚠️ Lỗi xử lý market stream message: {e}")
+
+    def update_book_ticker(self, symbol, bid, ask, bid_qty=0, ask_qty=0):
+        with self.lock:
+            self.tickers[symbol] = {
+                'bid': float(bid),
+                'ask': float(ask),
+                'bid_qty': float(bid_qty),
+                'ask_qty': float(ask_qty),
+                'updated': time.monotonic()
+            }
+        price = (float(bid) + float(ask)) / 2
+        for callback in self.listeners:
+            try:
+                callback(symbol, price)
+            except Exception as e:
+                print(f"⚠️ Lỗi listener market stream: {e}")
+
+    def update_depth(self, symbol, bids, asks, last_update_id=None):
+        with self.lock:
+            self.depths[symbol] = {
+                'bids': [[float(price), float(qty)] for price, qty in bids],
+                'asks': [[float(price), float(qty)] for price, qty in asks],
+                'last_update_id': last_update_id,
+                'updated': time.monotonic()
+            }
+
+    def update_kline(self, symbol, interval, kline):
+        """Ghi nến đang chạy, nến mới mở thì nối vào cuối (mất nến giữa chừng thì bắt đầu lại)"""
+        key = (symbol, interval)
+        interval_ms = INTERVAL_MS.get(interval, 60 * 1000)
+        with self.lock:
+            entry = self.klines.get(key)
+            if entry is None:
+                entry = {'klines': [], 'updated': 0}
+                self.klines[key] = entry
+
+            klines = entry['klines']
+            if klines and klines[-1][0] == kline[0]:
+                klines[-1] = kline
+            elif klines and kline[0] == klines[-1][0] + interval_ms:
+                klines.append(kline)
+                if len(klines) > self.max_klines:
+                    del klines[:-self.max_klines]
+            elif not klines or kline[0] > klines[-1][0]:
+                entry['klines'] = [kline]
+            entry['updated'] = time.monotonic()
+
+    # ===== Đọc cache (None nếu không có hoặc đã cũ) =====
+
+    def _is_fresh(self, entry, max_age):
+        fresh = entry is not None and time.monotonic() - entry['updated'] <= max_age
+        self.stats['hits' if fresh else 'stale'] += 1
+        return fresh
+
+    def get_price(self, symbol):
+        """Giá giữa best bid/ask"""
+        with self.lock:
+            ticker = self.tickers.get(symbol)
+            if not self._is_fresh(ticker, self.max_age):
+                return None
+            return (ticker['bid'] + ticker['ask']) / 2
+
+    def get_book_ticker(self, symbol):
+        with self.lock:
+            ticker = self.tickers.get(symbol)
+            if not self._is_fresh(ticker, self.max_age):
+                return None
+            return dict(ticker)
+
+    def get_order_book(self, symbol, limit=20):
+        """Top-N depth (chỉ trả về khi stream có đủ số mức giá yêu cầu)"""
+        with self.lock:
+            depth = self.depths.get(symbol)
+            if not self._is_fresh(depth, self.max_age):
+                return None
+            if len(depth['bids']) < limit or len(depth['asks']) < limit:
+                return None
+            return {
+                'bids': [list(level) for level in depth['bids'][:limit]],
+                'asks': [list(level) for level in depth['asks'][:limit]],
+                'lastUpdateId': depth['last_update_id']
+            }
+
+    def get_recent_klines(self, symbol, interval):
+        """Các nến nhận được từ stream (nến cuối là nến đang chạy)"""
+        with self.lock:
+            entry = self.klines.get((symbol, interval))
+            if not entry or not self._is_fresh(entry, self.kline_max_age):
+                return None
+            return list(entry['klines'])
+
+
+class BinanceStreamFeed:
+    """Feed WebSocket thật qua ThreadedWebsocketManager của python-binance"""
+
+    def __init__(self, cache, api_key=None, api_secret=None, testnet=False, depth_levels=20):
+        self.cache = cache
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.testnet = testnet
+        self.depth_levels = depth_levels
+        self.manager = None
+
+    def streams_for(self, symbols, intervals):
+        streams = []
+        for symbol in symbols:
+            name = symbol.lower()
+            streams.append(f"{name}@bookTicker")
+            streams.append(f"{name}@depth{self.depth_levels}@100ms")
+            for interval in intervals:
+                streams.append(f"{name}@kline_{interval}")
+        return streams
+
+    def start(self, symbols, intervals):
+        from binance import ThreadedWebsocketManager
+
+        self.manager = ThreadedWebsocketManager(api_key=self.api_key, api_secret=self.api_secret, testnet=self.testnet)
+        self.manager.start()
+        self.manager.start_multiplex_socket(callback=self.cache.handle_message, streams=self.streams_for(symbols, intervals))
+
+    def stop(self):
+        if self.manager is not None:
+            self.manager.stop()
+            self.manager = None
+
+
+class LocalMarketFeed:
+    """
+    Feed cục bộ thay cho WebSocket (test/replay) - đẩy message cùng format Binance vào cache
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.running = False
+
+    def start(self, symbols=None, intervals=None):
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    def push_book_ticker(self, symbol, bid, ask, bid_qty=0, ask_qty=0):
+        self.cache.handle_message({
+            'stream': f"{symbol.lower()}@bookTicker",
+            'data': {'u': 0, 's': symbol, 'b': str(bid), 'B': str(bid_qty), 'a': str(ask), 'A': str(ask_qty)}
+        })
+
+    def push_depth(self, symbol, bids, asks, levels=20):
+        self.cache.handle_message({
+            'stream': f"{symbol.lower()}@depth{levels}@100ms",
+            'data': {'lastUpdateId': 0, 'bids': bids, 'asks': asks}
+        })
+
+    def push_kline(self, symbol, interval, kline, is_closed=False):
+        """kline: list klines thô của Binance (open_time, open, high, low, close, volume, close_time, ...)"""
+        self.cache.handle_message({
+            'stream': f"{symbol.lower()}@kline_{interval}",
+            'data': {
+                'e': 'kline', 's': symbol,
+                'k': {
+                    't': kline[0], 'T': kline[6], 's': symbol, 'i': interval,
+                    'o': kline[1], 'h': kline[2], 'l': kline[3], 'c': kline[4], 'v': kline[5],
+                    'x': is_closed
+                }
+            }
+        })
+
+
+class MarketStream:
+    """Cache + feed (WebSocket thật hoặc feed cục bộ)"""
+
+    def __init__(self, feed=None, cache=None, max_age=5, kline_max_age=10, max_klines=500):
+        if cache is None:
+            cache = feed.cache if feed is not None else MarketDataCache(max_age, kline_max_age, max_klines)
+        self.cache = cache
+        self.feed = feed or LocalMarketFeed(self.cache)
+        self.symbols = []
+        self.intervals = []
+
+    def start(self, symbols, intervals):
+        self.symbols = list(symbols)
+        self.intervals = list(intervals)
+        self.feed.start(self.symbols, self.intervals)
+
+    def stop(self):
+        self.feed.stop()
+
+    def get_price(self, symbol):
+        return self.cache.get_price(symbol)
+
+    def get_order_book(self, symbol, limit=20):
+        return self.cache.get_order_book(symbol, limit)
+
+    def get_recent_klines(self, symbol, interval):
+        return self.cache.get_recent_klines(symbol, interval)
+
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Metrics - Đo thời gian từng giai đoạn của chu kỳ trading
+
+- @cycle_metrics.timed('stage') / with cycle_metrics.stage('stage'): đo 1 hàm hoặc 1 khối code
+- with cycle_metrics.cycle('continuous'): gom thời gian các giai đoạn + số request REST theo endpoint
+  của 1 chu kỳ thành bản tóm tắt (in ra, ghi event log, ghi file metrics)
+- p50/p95/p99 của mỗi giai đoạn tính trên cửa sổ các lần đo gần nhất
+- profile_next_cycle(): chạy cProfile cho đúng 1 chu kỳ tiếp theo, lưu file .prof + top hàm tốn thời gian
+- serve(port): endpoint JSON chỉ nghe trên localhost (GET /metrics)
+"""
+
+import cProfile
+import functools
+import io
+import json
+import math
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import config
+from client_registry import client_registry
+from event_logger import event_logger
+
+
+def percentile(sorted_values, q):
+    """Percentile theo nearest-rank trên list đã sắp xếp"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class CycleMetrics:
+    def __init__(self, window=1000, metrics_file=None, request_counter=None):
+        """
+        Args:
+            window: Số lần đo gần nhất giữ lại cho mỗi giai đoạn (tính p50/p95/p99)
+            metrics_file: File JSON ghi snapshot sau mỗi chu kỳ (None = không ghi)
+            request_counter: Hàm trả về {endpoint: tổng số request} (VD: client_registry.get_request_counts)
+        """
+        self.window = window
+        self.metrics_file = metrics_file
+        self.request_counter = request_counter
+        self.samples = {}  # stage -> deque thời gian (giây)
+        self.current = None  # Giai đoạn của chu kỳ đang chạy: stage -> [số lần, tổng giây]
+        self.cycle_name = None
+        self.cycle_started = 0.0
+        self.requests_before = {}
+        self.cycle_count = 0
+        self.last_cycle = None
+        self.profile_requested = False
+        self.profile_dir = '.'
+        self.server = None
+        self.lock = threading.Lock()
+
+    # ===== Đo giai đoạn =====
+
+    def record(self, stage, seconds):
+        with self.lock:
+            samples = self.samples.get(stage)
+            if samples is None:
+                samples = self.samples[stage] = deque(maxlen=self.window)
+            samples.append(seconds)
+            if self.current is not None:
+                entry = self.current.setdefault(stage, [0, 0.0])
+                entry[0] += 1
+                entry[1] += seconds
+
+    @contextmanager
+    def stage(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started)
+
+    def timed(self, stage=None):
+        """Decorator đo thời gian mỗi lần gọi hàm (mặc định tên giai đoạn = tên hàm)"""
+        def decorator(func):
+            name = stage or func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(name, time.perf_counter() - started)
+            return wrapper
+        return decorator
+
+    # ===== Chu kỳ =====
+
+    def profile_next_cycle(self, output_dir='.'):
+        """Bật cProfile cho chu kỳ tiếp theo (chỉ 1 chu kỳ)"""
+        self.profile_requested = True
+        self.profile_dir = output_dir
+
+    @contextmanager
+    def cycle(self, name='cycle'):
+        profiler = None
+        if self.profile_requested:
+            self.profile_requested = False
+            profiler = cProfile.Profile()
+
+        with self.lock:
+            self.current = {}
+            self.cycle_name = name
+        self.requests_before = self._request_counts()
+        self.cycle_started = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler:
+                profiler.disable()
+            summary = self._end_cycle()
+            if profiler:
+                summary['profile'] = self._save_profile(profiler, summary['cycle'])
+            self._publish(summary)
+
+    def _request_counts(self):
+        if self.request_counter is None:
+            return {}
+        try:
+            return dict(self.request_counter())
+        except Exception:
+            return {}
+
+    def _end_cycle(self):
+        duration = time.perf_counter() - self.cycle_started
+        requests_after = self._request_counts()
+        rest_calls = {
+            endpoint: count - self.requests_before.get(endpoint, 0)
+            for endpoint, count in requests_after.items()
+            if count - self.requests_before.get(endpoint, 0) > 0
+        }
+        with self.lock:
+            stages = self.current or {}
+            self.current = None
+            self.cycle_count += 1
+            summary = {
+                'cycle': self.cycle_count,
+                'name': self.cycle_name,
+                'duration_ms': round(duration * 1000, 1),
+                'stages': {
+                    stage: {'count': count, 'total_ms': round(total * 1000, 1)}
+                    for stage, (count, total) in sorted(stages.items(), key=lambda item: -item[1][1])
+                },
+                'rest_calls': dict(sorted(rest_calls.items(), key=lambda item: -item[1])),
+                'rest_total': sum(rest_calls.values())
+            }
+            self.last_cycle = summary
+        self.record('cycle', duration)
+        return summary
+
+    def _save_profile(self, profiler, cycle_number):
+        path = os.path.join(self.profile_dir, f"cycle_{cycle_number}_{time.strftime('%Y%m%d_%H%M%S')}.prof")
+        profiler.dump_stats(path)
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(20)
+        with open(path + '.txt', 'w', encoding='utf-8') as f:
+            f.write(report.getvalue())
+        print(f"🔬 cProfile chu kỳ #{cycle_number}: {path}")
+        return path
+
+    def _publish(self, summary):
+        top = ', '.join(f"{stage} {info['total_ms']:.0f}ms" for stage, info in list(summary['stages'].items())[:4])
+        print(f"⏱️ Chu kỳ #{summary['cycle']}: {summary['duration_ms']:.0f} ms | {top} | REST {summary['rest_total']}")
+        event_logger.log('cycle_metrics', **summary)
+        if self.metrics_file:
+            try:
+                tmp_path = self.metrics_file + '.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.snapshot(), f, indent=2, ensure_ascii=False)
+                os.replace(tmp_path, self.metrics_file)
+            except Exception as e:
+                print(f"⚠️ Lỗi ghi file metrics: {e}")
+
+    # ===== Đọc =====
+
+    def snapshot(self):
+        """p50/p95/p99 của từng giai đoạn + chu kỳ gần nhất + tổng request theo endpoint"""
+        with self.lock:
+            stages = {}
+            for stage, samples in self.samples.items():
+                values = sorted(samples)
+                stages[stage] = {
+                    'count': len(values),
+                    'p50_ms': round(percentile(values, 50) * 1000, 2),
+                    'p95_ms': round(percentile(values, 95) * 1000, 2),
+                    'p99_ms': round(percentile(values, 99) * 1000, 2),
+                    'max_ms': round(values[-1] * 1000, 2)
+                }
+            last_cycle = self.last_cycle
+            cycles = self.cycle_count
+        return {
+            'updated_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'cycles': cycles,
+            'stages': stages,
+            'last_cycle': last_cycle,
+            'rest_calls': self._request_counts()
+        }
+
+    def reset(self):
+        with self.lock:
+            self.samples = {}
+            self.current = None
+            self.cycle_count = 0
+            self.last_cycle = None
+
+    def serve(self, port, host='127.0.0.1'):
+        """Endpoint JSON GET /metrics ở thread nền (chỉ localhost)"""
+        if self.server is not None:
+            return self.server
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') not in ('', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = json.dumps(metrics.snapshot(), ensure_ascii=False).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Không in mỗi request
+
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=self.server.serve_forever, name='metrics-http', daemon=True).start()
+        print(f"📈 Metrics endpoint: http://{host}:{self.server.server_address[1]}/metrics")
+        return self.server
+
+
+# Metrics dùng chung cho app - số request REST lấy từ client dùng chung
+cycle_metrics = CycleMetrics(config.METRICS_WINDOW, config.METRICS_FILE, client_registry.get_request_counts)
+
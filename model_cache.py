@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Model Cache - Kết quả tối ưu tham số và model dự đoán theo symbol, LRU, tuỳ chọn lưu ra file JSON
+
+Khoá gồm (loại, symbol, khung nến, open time nến cuối, hash lưới tham số): kết quả chỉ đổi khi có nến mới
+hoặc lưới tham số đổi, nên các lần quét lại trong cùng 1 nến không phải tối ưu lại.
+Chỉ các mục put(..., persist=True) (giá trị JSON được) mới ghi ra file; model (object) chỉ giữ trong bộ nhớ.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+def grid_hash(*parts):
+    """Hash ngắn, ổn định của lưới tham số (list/dict/số - thứ tự key dict không ảnh hưởng)"""
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+class ModelCache:
+    def __init__(self, max_entries=256, persist_path=None):
+        """
+        Args:
+            max_entries: Số mục tối đa, vượt quá thì bỏ mục dùng lâu nhất
+            persist_path: File JSON lưu các mục persist (None = chỉ trong bộ nhớ)
+        """
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self.entries = OrderedDict()  # key (tuple) -> value
+        self.persistent = set()  # Các key được ghi ra file
+        self.loaded = persist_path is None  # Đọc file ở lần truy cập đầu tiên (import không chạm đĩa)
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        if persist_path:
+            atexit.register(self.save)
+
+    @staticmethod
+    def make_key(kind, symbol, timeframe, last_candle_ts, params_hash):
+        return (kind, symbol, str(timeframe), int(last_candle_ts), params_hash)
+
+    def _ensure_loaded(self):
+        if self.loaded:
+            return
+        self.loaded = True
+        if not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, 'r', encoding='utf-8') as f:
+                for key, value in json.load(f)[-self.max_entries:]:
+                    key = tuple(key)
+                    self.entries[key] = value
+                    self.persistent.add(key)
+        except Exception as e:
+            print(f"⚠️ Lỗi đọc model cache {self.persist_path}: {e}")
+
+    def get(self, key, default=None):
+        with self.lock:
+            self._ensure_loaded()
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value, persist=False):
+        with self.lock:
+            self._ensure_loaded()
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            if persist:
+                self.persistent.add(key)
+                self.dirty = True
+            while len(self.entries) > self.max_entries:
+                evicted, _ = self.entries.popitem(last=False)
+                if evicted in self.persistent:
+                    self.persistent.discard(evicted)
+                    self.dirty = True
+
+    def get_or_compute(self, key, compute, persist=False):
+        """Giá trị trong cache, chưa có thì gọi compute() và lưu lại"""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value, persist)
+        return value
+
+    def save(self):
+        """Ghi các mục persist ra file (file tạm + rename nguyên tử), chỉ khi có thay đổi"""
+        if not self.persist_path:
+            return
+        with self.lock:
+            if not self.dirty:
+                return
+            items = [[list(key), value] for key, value in self.entries.items() if key in self.persistent]
+            self.dirty = False
+        try:
+            tmp_path = self.persist_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(items, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, self.persist_path)
+        except Exception as e:
+            print(f"⚠️ Lỗi ghi model cache {self.persist_path}: {e}")
+
+    def clear(self):
+        with self.lock:
+            self.dirty = self.dirty or bool(self.persistent)
+            self.entries.clear()
+            self.persistent.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.entries), 'hits': self.hits, 'misses': self.misses}
+
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Notification Dispatcher - Gửi email thông báo ở thread nền
+
+Thread giao dịch chỉ đưa thông báo vào hàng đợi rồi đi tiếp, không bao giờ chờ mail server.
+Thread nền giữ 1 phiên SMTP (STARTTLS + login 1 lần) cho nhiều email, gộp các thông báo thường
+đến dồn dập thành 1 email tổng hợp (digest), gửi lại có giới hạn khi lỗi và kết nối lại khi phiên bị đóng.
+"""
+
+import atexit
+import queue
+import smtplib
+import threading
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+import config
+import trading_config
+
+
+class NotificationDispatcher:
+    def __init__(self, smtp_factory=None, digest_window=10, max_batch=20, max_retries=3,
+                 retry_delay=5, idle_timeout=60, queue_size=1000):
+        """
+        Args:
+            smtp_factory: Hàm tạo phiên SMTP đã đăng nhập (mặc định theo NOTIFICATION_CONFIG) - thay được khi test
+            digest_window: Giây chờ gom thêm thông báo thường trước khi gửi
+            max_batch: Số thông báo tối đa trong 1 email tổng hợp
+            max_retries: Số lần gửi lại khi lỗi
+            retry_delay: Giây chờ giữa các lần gửi lại (tăng dần)
+            idle_timeout: Đóng phiên SMTP sau số giây không có thông báo
+            queue_size: Giới hạn hàng đợi - đầy thì in ra console thay vì chặn thread gọi
+        """
+        self.smtp_factory = smtp_factory or self._default_smtp
+        self.digest_window = digest_window
+        self.max_batch = max_batch
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.idle_timeout = idle_timeout
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.smtp = None
+        self.thread = None
+        self.lock = threading.Lock()
+        self.stats = {'queued': 0, 'emails': 0, 'digests': 0, 'connections': 0, 'retries': 0, 'failed': 0, 'dropped': 0}
+
+    # ===== Phía thread giao dịch =====
+
+    def submit(self, subject, body, urgent=False):
+        """Đưa 1 email vào hàng đợi, trả về ngay (False nếu hàng đợi đầy)"""
+        self._ensure_started()
+        try:
+            self.queue.put_nowait({'subject': subject, 'body': body, 'urgent': urgent, 'created_at': time.time()})
+            self.stats['queued'] += 1
+            return True
+        except queue.Full:
+            self.stats['dropped'] += 1
+            print(f"⚠️ Hàng đợi email đầy - bỏ qua: {subject}")
+            return False
+
+    def flush(self, timeout=30):
+        """Chờ gửi hết hàng đợi (dùng khi dừng bot)"""
+        deadline = time.time() + timeout
+        while self.queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.05)
+        return not self.queue.unfinished_tasks
+
+    def shutdown(self, timeout=30):
+        """Gửi hết hàng đợi rồi đóng phiên SMTP (khi dừng bot/thoát) - submit sau đó sẽ kết nối lại"""
+        drained = self.flush(timeout)
+        if drained:
+            self._close_smtp()
+        return drained
+
+    def _ensure_started(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name='notification-dispatcher', daemon=True)
+                self.thread.start()
+
+    # ===== Thread nền =====
+
+    def _run(self):
+        while True:
+            try:
+                item = self.queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                self._close_smtp()
+                continue
+
+            batch = [item]
+            if not item['urgent']:
+                # Gom thêm thông báo thường trong digest_window, thông báo khẩn thì gửi ngay
+                deadline = time.time() + self.digest_window
+                while len(batch) < self.max_batch:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(self.queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+                    if batch[-1]['urgent']:
+                        break
+
+            urgent = [entry for entry in batch if entry['urgent']]
+            normal = [entry for entry in batch if not entry['urgent']]
+            try:
+                for entry in urgent:
+                    self._deliver(entry['subject'], entry['body'])
+                if normal:
+                    self._deliver(*self._compose_digest(normal))
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _compose_digest(self, entries):
+        if len(entries) == 1:
+            return entries[0]['subject'], entries[0]['body']
+        self.stats['digests'] += 1
+        subject = f"📊 Auto Trading - {len(entries)} thông báo"
+        sections = [
+            f"[{time.strftime('%H:%M:%S', time.localtime(entry['created_at']))}] {entry['subject']}\n{entry['body'].strip()}"
+            for entry in entries
+        ]
+        return subject, ("\n\n" + "-" * 40 + "\n\n").join(sections)
+
+    def _deliver(self, subject, body):
+        notification_config = trading_config.NOTIFICATION_CONFIG
+        msg = MIMEMultipart()
+        msg['From'] = notification_config['email_sender']
+        msg['To'] = notification_config['email_recipient']
+        msg['Subject'] = subject
+        msg.attach(MIMEText(body, 'plain', 'utf-8'))
+        text = msg.as_string()
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                if self.smtp is None:
+                    self.smtp = self.smtp_factory()
+                    self.stats['connections'] += 1
+                self.smtp.sendmail(notification_config['email_sender'], notification_config['email_recipient'], text)
+                self.stats['emails'] += 1
+                print(f"📧 Đã gửi email: {subject[:50]}")
+                return True
+            except Exception as e:
+                # Phiên có thể đã bị server đóng - bỏ phiên cũ, lần sau kết nối lại
+                self._close_smtp()
+                if attempt == self.max_retries:
+                    self.stats['failed'] += 1
+                    print(f"⚠️ Lỗi gửi email sau {attempt + 1} lần: {e}")
+                    print(f"📱 Fallback: {subject}")
+                    return False
+                self.stats['retries'] += 1
+                time.sleep(self.retry_delay * (attempt + 1))
+
+    def _close_smtp(self):
+        if self.smtp is not None:
+            try:
+                self.smtp.quit()
+            except Exception:
+                pass
+            self.smtp = None
+
+    @staticmethod
+    def _default_smtp():
+        notification_config = trading_config.NOTIFICATION_CONFIG
+        server = smtplib.SMTP(notification_config['email_smtp_server'], notification_config['email_smtp_port'], timeout=30)
+        server.starttls()
+        server.login(notification_config['email_sender'], notification_config['email_password'])
+        return server
+
+
+# Dispatcher dùng chung cho account_info và app
+notification_dispatcher = NotificationDispatcher(
+    digest_window=config.NOTIFICATION_DIGEST_WINDOW,
+    max_retries=config.NOTIFICATION_MAX_RETRIES,
+    idle_timeout=config.NOTIFICATION_SMTP_IDLE_TIMEOUT
+)
+# Thread nền là daemon - cố gửi nốt email trong hàng đợi và đóng phiên SMTP trước khi thoát
+atexit.register(notification_dispatcher.shutdown, 10)
+
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Order Journal - Lưu ACTIVE_ORDERS dạng snapshot + journal chỉ ghi nối (append-only)
+
+Mỗi lần thêm/cập nhật/xoá lệnh chỉ ghi 1 dòng JSON ngắn vào journal (chi phí theo thay đổi,
+không phải theo tổng số lệnh). Định kỳ journal được gộp vào snapshot bằng ghi file tạm + rename
+nguyên tử, nên bị kill giữa chừng cũng không làm hỏng dữ liệu: dòng journal ghi dở bị bỏ qua
+khi đọc lại, còn snapshot luôn là bản cũ hoặc bản mới hoàn chỉnh.
+"""
+
+import json
+import os
+import threading
+
+
+class OrderJournal:
+    def __init__(self, snapshot_path, compact_every=100, fsync=True):
+        """
+        Args:
+            snapshot_path: File snapshot (VD: active_orders.json) - journal nằm cạnh với đuôi .journal
+            compact_every: Gộp journal vào snapshot sau số bản ghi này
+            fsync: Đẩy từng bản ghi xuống đĩa ngay (an toàn khi mất điện)
+        """
+        self.snapshot_path = snapshot_path
+        self.journal_path = snapshot_path + '.journal'
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self.records = 0  # Số bản ghi trong journal kể từ lần gộp gần nhất
+        self.torn = False  # Journal có dòng ghi dở - phải gộp trước khi ghi nối tiếp
+        self.lock = threading.Lock()
+
+    # ===== Ghi =====
+
+    def _append(self, record):
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+        with self.lock:
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            self.records += 1
+
+    def put(self, order_id, order):
+        """Thêm hoặc cập nhật 1 lệnh (ghi toàn bộ thông tin của lệnh đó)"""
+        self._append({'op': 'put', 'id': str(order_id), 'order': order})
+
+    def remove(self, order_id):
+        self._append({'op': 'remove', 'id': str(order_id)})
+
+    def needs_compaction(self):
+        return self.records >= self.compact_every
+
+    def needs_repair(self):
+        """Journal vừa đọc có bản ghi hoặc dòng ghi dở - cần gộp vào snapshot trước khi ghi tiếp"""
+        return self.records > 0 or self.torn
+
+    def compact(self, orders):
+        """Ghi snapshot mới (file tạm + rename nguyên tử) rồi xoá journal"""
+        with self.lock:
+            tmp_path = self.snapshot_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(orders, f, indent=2, ensure_ascii=False)
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+            # Bị kill trước khi xoá journal cũng an toàn: put/remove đọc lại trên snapshot mới cho cùng kết quả
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+            self.records = 0
+            self.torn = False
+
+    # ===== Đọc khi khởi động =====
+
+    def exists(self):
+        return os.path.exists(self.snapshot_path) or os.path.exists(self.journal_path)
+
+    def load(self):
+        """Đọc snapshot rồi áp dụng lần lượt các bản ghi journal"""
+        orders = {}
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                orders = json.load(f)
+
+        records = 0
+        torn = False
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    # Dòng cuối thiếu '\n': bản ghi tiếp theo sẽ bị nối vào cùng dòng này
+                    if not line.endswith('\n'):
+                        torn = True
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        torn = True
+                        continue  # Dòng ghi dở khi bị kill
+                    if record.get('op') == 'put':
+                        orders[record['id']] = record['order']
+                    elif record.get('op') == 'remove':
+                        orders.pop(record['id'], None)
+                    records += 1
+        self.records = records
+        self.torn = torn
+        return orders
+
@@ -3,29 +3,71 @@
 Position Manager - Quản lý giá mua trung bình cho từng coin
 """
 
-import json
 import time
+import threading
 from datetime import datetime
 import os
 
+import trading_config
+from balance_snapshot import balance_snapshot
+from position_storage import create_position_storage
+
 class PositionManager:
-    def __init__(self, file_path='position_data.json'):
-        self.file_path = file_path
-        self.positions = {}
-        self.load_positions()
+    def __init__(self, file_path='position_data.json', storage=None):
+        """
+        Args:
+            file_path: File JSON (backend 'json', hoặc nguồn nhập dữ liệu lần đầu cho SQLite)
+            storage: Backend lưu trữ - None thì tạo theo TRADING_CONFIG['position_storage']
+
+        Backend và dữ liệu position chỉ được tạo/đọc ở lần truy cập đầu tiên (import không chạm file).
+        """
+        self.json_path = file_path
+        self._storage = storage
+        self.file_path = storage.file_path if storage is not None else file_path
+        self._positions = None
+        self.sell_order_index = {}  # order_id -> coin của các lệnh bán ACTIVE
+        self.load_lock = threading.RLock()
+    
+    @property
+    def storage(self):
+        if self._storage is None:
+            with self.load_lock:
+                if self._storage is None:
+                    self._storage = create_position_storage(
+                        trading_config.TRADING_CONFIG.get('position_storage', 'json'),
+                        self.json_path,
+                        trading_config.TRADING_CONFIG.get('position_db_file', 'position_data.db')
+                    )
+                    self.file_path = self._storage.file_path
+        return self._storage
+    
+    @storage.setter
+    def storage(self, storage):
+        self._storage = storage
+    
+    @property
+    def positions(self):
+        if self._positions is None:
+            with self.load_lock:
+                if self._positions is None:
+                    self.load_positions()
+        return self._positions
+    
+    @positions.setter
+    def positions(self, positions):
+        self._positions = positions
     
     def load_positions(self):
         """Đọc dữ liệu position từ file"""
         try:
-            if os.path.exists(self.file_path):
-                with open(self.file_path, 'r', encoding='utf-8') as f:
-                    self.positions = json.load(f)
+            if self.storage.exists():
+                self.positions = self.storage.load()
+                self._rebuild_sell_order_index()
                 print(f"📂 Đã tải {len(self.positions)} position từ {self.file_path}")
                 
-                # Kiểm tra kích thước file và tự động maintenance nếu cần
-                file_size_kb = os.path.getsize(self.file_path) / 1024
-                if file_size_kb > 50:  # Nếu file > 50KB thì cleanup
-                    print(f"⚠️ File position lớn ({file_size_kb:.1f} KB) - Chạy auto maintenance...")
+                # Kiểm tra kích thước file và tự động maintenance nếu cần (chỉ backend JSON)
+                if self.storage.needs_maintenance():
+                    print(f"⚠️ File position lớn ({self.storage.size_kb():.1f} KB) - Chạy auto maintenance...")
                     self.auto_maintenance()
                 
             else:
@@ -37,13 +79,19 @@ class PositionManager:
             self.positions = {}
     
     def save_positions(self):
-        """Lưu dữ liệu position vào file"""
+        """Lưu toàn bộ dữ liệu position"""
         try:
-            with open(self.file_path, 'w', encoding='utf-8') as f:
-                json.dump(self.positions, f, indent=2, ensure_ascii=False, default=str)
+            self.storage.save_all(self.positions)
         except Exception as e:
             print(f"⚠️ Lỗi lưu position file: {e}")
     
+    def save_position(self, coin):
+        """Lưu riêng 1 coin (SQLite chỉ ghi các dòng của coin đó)"""
+        try:
+            self.storage.save_position(self.positions, coin)
+        except Exception as e:
+            print(f"⚠️ Lỗi lưu position {coin}: {e}")
+    
     def add_buy_order(self, symbol, quantity, price, order_id=None):
         """
         Thêm lệnh mua mới và cập nhật giá trung bình
@@ -90,7 +138,7 @@ class PositionManager:
                 current_pos['average_price'] = new_average_price
                 current_pos['updated_at'] = datetime.now().isoformat()
             
-            # Lưu thông tin lệnh mua (CHỈ GIỮ 10 LỆNH GẦN NHẤT)
+            # Lưu thông tin lệnh mua (backend JSON CHỈ GIỮ 10 LỆNH GẦN NHẤT)
             buy_order_info = {
                 'quantity': quantity,
                 'price': price,
@@ -100,13 +148,16 @@ class PositionManager:
             
             # Thêm lệnh mới và giữ tối đa 10 lệnh gần nhất
             self.positions[coin]['buy_orders'].append(buy_order_info)
-            if len(self.positions[coin]['buy_orders']) > 10:
+            if self.storage.trims_history and len(self.positions[coin]['buy_orders']) > 10:
                 # Xóa lệnh cũ nhất, giữ 10 lệnh mới nhất
                 self.positions[coin]['buy_orders'] = self.positions[coin]['buy_orders'][-10:]
                 print(f"🧹 Đã cleanup buy_orders cũ cho {coin}, giữ 10 lệnh mới nhất")
             
-            # Lưu vào file
-            self.save_positions()
+            # Lưu vào file (SQLite: insert 1 dòng lệnh mua + cập nhật dòng position)
+            try:
+                self.storage.add_buy_order(self.positions, coin, buy_order_info)
+            except Exception as e:
+                print(f"⚠️ Lỗi lưu position file: {e}")
             
             position_info = self.positions[coin]
             print(f"📊 Cập nhật position {coin}:")
@@ -156,7 +207,7 @@ class PositionManager:
                 # Bán hết
                 removed_position = self.positions.pop(coin)
                 print(f"🗑️ Đã xóa position {coin} (bán hết)")
-                self.save_positions()
+                self.save_position(coin)
                 return None
             else:
                 # Bán một phần
@@ -167,7 +218,7 @@ class PositionManager:
                     # Bán hết
                     removed_position = self.positions.pop(coin)
                     print(f"🗑️ Đã xóa position {coin} (bán hết)")
-                    self.save_positions()
+                    self.save_position(coin)
                     return None
                 else:
                     # Còn lại một phần
@@ -180,7 +231,7 @@ class PositionManager:
                     print(f"   📦 Còn lại: {remaining_quantity:.6f}")
                     print(f"   💰 Giá TB: ¥{current_pos['average_price']:.4f}")
                     
-                    self.save_positions()
+                    self.save_position(coin)
                     return current_pos
                     
         except Exception as e:
@@ -334,7 +385,7 @@ class PositionManager:
                 print(f"✅ Đã bán hết {coin}, xóa position")
             
             # Lưu file
-            self.save_positions()
+            self.save_position(coin)
             return True
             
         except Exception as e:
@@ -373,9 +424,10 @@ class PositionManager:
             
             self.positions[coin]['active_sell_orders'].append(sell_order_info)
             self.positions[coin]['updated_at'] = datetime.now().isoformat()
+            self.sell_order_index[str(order_id)] = coin
             
             # Lưu file
-            self.save_positions()
+            self.storage.add_sell_order(self.positions, coin, sell_order_info)
             
             print(f"📊 Đã track sell order {order_id} cho {coin}: {order_type} @ ¥{price}")
             return True
@@ -384,10 +436,32 @@ class PositionManager:
             print(f"❌ Lỗi track sell order: {e}")
             return False
 
+    def _rebuild_sell_order_index(self):
+        """Index order_id -> coin cho các lệnh bán đang ACTIVE"""
+        self.sell_order_index = {}
+        for coin, position in self.positions.items():
+            for sell_order in position.get('active_sell_orders', []):
+                if sell_order.get('status') == 'ACTIVE':
+                    self.sell_order_index[str(sell_order['order_id'])] = coin
+    
+    def _find_sell_order(self, order_id):
+        """Tìm lệnh bán ACTIVE qua index - (coin, position, sell_order) hoặc None"""
+        coin = self.sell_order_index.get(order_id)
+        position = self.positions.get(coin)
+        for sell_order in (position or {}).get('active_sell_orders', []):
+            if str(sell_order['order_id']) == order_id and sell_order.get('status') == 'ACTIVE':
+                return coin, position, sell_order
+        # Position đã bị xoá hoặc lệnh đã bị cleanup - bỏ khỏi index
+        self.sell_order_index.pop(order_id, None)
+        return None
+    
     def check_and_sync_with_exchange(self, exchange_api):
         """
         Kiểm tra và đồng bộ với exchange - Handle cả auto fill và manual intervention
         
+        Chỉ 1 lần get_open_orders cho mỗi lần sync; lệnh nào còn mở thì bỏ qua, chỉ lệnh đã biến mất
+        mới được kiểm tra riêng (get_order) và dùng chung 1 snapshot số dư cho các trường hợp can thiệp thủ công.
+        
         Args:
             exchange_api: Đối tượng API để kiểm tra trạng thái lệnh
         """
@@ -395,121 +469,140 @@ class PositionManager:
             updated_positions = []
             manual_interventions = []
             
-            for coin, position in self.positions.items():
-                if not position.get('active_sell_orders'):
+            # self.positions đọc file ở lần đầu và dựng index lệnh bán
+            if not self.positions or not self.sell_order_index:
+                return {'updated_positions': [], 'manual_interventions': []}
+            
+            open_orders = exchange_api.get_open_orders()
+            open_ids = set()
+            for order in open_orders:
+                open_ids.add(str(order['orderId']))
+                if order.get('orderListId', -1) != -1:
+                    open_ids.add(str(order['orderListId']))
+            
+            changed_ids = [order_id for order_id in self.sell_order_index if order_id not in open_ids]
+            balances = None  # Snapshot số dư - chỉ lấy khi có lệnh không tìm thấy trên exchange
+            changed_coins = set()
+            
+            for order_id in changed_ids:
+                found = self._find_sell_order(order_id)
+                if found is None:
                     continue
+                coin, position, sell_order = found
+                symbol = position['symbol']
                 
-                # Kiểm tra từng sell order
-                for sell_order in position['active_sell_orders'][:]:  # Copy list để safe remove
-                    if sell_order.get('status') != 'ACTIVE':
-                        continue
+                try:
+                    # Lệnh không còn mở - kiểm tra đã khớp hay đã huỷ
+                    order_status = exchange_api.get_order(symbol=symbol.replace('/', ''), orderId=order_id)
+                    status = order_status['status']
+                    executed_qty = float(order_status.get('executedQty', 0))
+                    quote_qty = float(order_status.get('cummulativeQuoteQty', 0))
+                    filled_price = quote_qty / executed_qty if executed_qty > 0 and quote_qty > 0 else float(order_status.get('price') or sell_order['price'])
                     
-                    order_id = sell_order['order_id']
-                    
-                    try:
-                        # Kiểm tra order có còn tồn tại trên exchange không
-                        order_status = exchange_api.fetch_order(order_id, position['symbol'])
+                    if status == 'FILLED':
+                        # Case 1: Lệnh đã tự động khớp
+                        filled_quantity = executed_qty or sell_order['quantity']
                         
-                        if order_status['status'] == 'closed':
-                            # Case 1: Lệnh đã tự động khớp
-                            filled_quantity = sell_order['quantity']
-                            filled_price = order_status.get('average', sell_order['price'])
-                            
-                            print(f"✅ AUTO FILL: {order_id} - {filled_quantity} {coin} @ ¥{filled_price}")
-                            
-                            # Update position sau khi bán
-                            self.update_position_after_sell(
-                                position['symbol'], 
-                                filled_quantity, 
-                                filled_price
-                            )
-                            
-                            # Đánh dấu order đã filled
-                            sell_order['status'] = 'FILLED'
-                            sell_order['filled_at'] = datetime.now().isoformat()
-                            sell_order['filled_price'] = filled_price
-                            sell_order['fill_type'] = 'AUTO'
-                            
+                        print(f"✅ AUTO FILL: {order_id} - {filled_quantity} {coin} @ ¥{filled_price}")
+                        
+                        # Update position sau khi bán
+                        self.update_position_after_sell(symbol, filled_quantity, filled_price)
+                        
+                        # Đánh dấu order đã filled
+                        sell_order['status'] = 'FILLED'
+                        sell_order['filled_at'] = datetime.now().isoformat()
+                        sell_order['filled_price'] = filled_price
+                        sell_order['fill_type'] = 'AUTO'
+                        
+                        updated_positions.append(coin)
+                        
+                    elif status in ['CANCELED', 'EXPIRED', 'REJECTED', 'EXPIRED_IN_MATCH']:
+                        # Order bị cancel/expire (có thể đã khớp một phần trước đó)
+                        print(f"⚠️ ORDER CANCELED: {order_id} - {coin}")
+                        if executed_qty > 0:
+                            self.update_position_after_sell(symbol, executed_qty, filled_price)
                             updated_positions.append(coin)
+                        sell_order['status'] = 'CANCELED'
+                        sell_order['canceled_at'] = datetime.now().isoformat()
+                    else:
+                        continue  # Vẫn đang xử lý trên sàn - để lần sync sau
+                    
+                except Exception as order_error:
+                    # Case 2: Order không tồn tại trên exchange = Manual intervention
+                    error_msg = str(order_error).lower()
+                    if "does not exist" in error_msg or "not found" in error_msg or "order" in error_msg:
+                        
+                        print(f"🔧 MANUAL INTERVENTION DETECTED: Order {order_id} không tồn tại trên exchange")
+                        print(f"   → Có thể: 1) Lệnh đã khớp thủ công, 2) User đã hủy lệnh")
+                        
+                        # Kiểm tra balance để xác định có bán hay không
+                        try:
+                            if balances is None:
+                                balances = balance_snapshot.get_balances(exchange_api)
+                            current_balance = balances.get(coin, {}).get('free', 0.0)
+                            expected_balance = position['total_quantity']
                             
-                        elif order_status['status'] in ['canceled', 'expired']:
-                            # Order bị cancel/expire
-                            print(f"⚠️ ORDER CANCELED: {order_id} - {coin}")
-                            sell_order['status'] = 'CANCELED'
-                            sell_order['canceled_at'] = datetime.now().isoformat()
-                            
-                    except Exception as order_error:
-                        # Case 2: Order không tồn tại trên exchange = Manual intervention
-                        error_msg = str(order_error).lower()
-                        if "does not exist" in error_msg or "not found" in error_msg or "order" in error_msg:
-                            
-                            print(f"🔧 MANUAL INTERVENTION DETECTED: Order {order_id} không tồn tại trên exchange")
-                            print(f"   → Có thể: 1) Lệnh đã khớp thủ công, 2) User đã hủy lệnh")
-                            
-                            # Kiểm tra balance để xác định có bán hay không
-                            try:
-                                account_info = exchange_api.get_account()
-                                balances = {b['asset']: float(b['free']) for b in account_info['balances']}
-                                current_balance = balances.get(coin, 0.0)
-                                expected_balance = position['total_quantity']
+                            if current_balance < expected_balance:
+                                # Balance giảm = có bán coin
+                                sold_quantity = expected_balance - current_balance
                                 
-                                if current_balance < expected_balance:
-                                    # Balance giảm = có bán coin
-                                    sold_quantity = expected_balance - current_balance
-                                    
-                                    print(f"   💰 Balance check: Đã bán {sold_quantity} {coin}")
-                                    print(f"   📊 Expected: {expected_balance}, Actual: {current_balance}")
-                                    
-                                    # Lấy giá hiện tại làm estimate
-                                    ticker = exchange_api.get_symbol_ticker(symbol=position['symbol'])
-                                    current_price = float(ticker['price'])
-                                    
-                                    # Update position
-                                    self.update_position_after_sell(
-                                        position['symbol'],
-                                        sold_quantity,
-                                        current_price
-                                    )
-                                    
-                                    # Đánh dấu manual intervention
-                                    sell_order['status'] = 'MANUAL_FILLED'
-                                    sell_order['filled_at'] = datetime.now().isoformat()
-                                    sell_order['filled_price'] = current_price
-                                    sell_order['fill_type'] = 'MANUAL'
-                                    sell_order['note'] = 'Detected via balance check'
-                                    
-                                    manual_interventions.append({
-                                        'coin': coin,
-                                        'action': 'SELL',
-                                        'quantity': sold_quantity,
-                                        'estimated_price': current_price,
-                                        'detection_method': 'balance_check'
-                                    })
-                                    
-                                    updated_positions.append(coin)
-                                    
-                                else:
-                                    # Balance không đổi = chỉ hủy lệnh
-                                    print(f"   ❌ Order bị hủy, không có giao dịch")
-                                    sell_order['status'] = 'MANUAL_CANCELED'
-                                    sell_order['canceled_at'] = datetime.now().isoformat()
-                                    sell_order['fill_type'] = 'MANUAL'
-                                    
-                                    manual_interventions.append({
-                                        'coin': coin,
-                                        'action': 'CANCEL',
-                                        'order_id': order_id,
-                                        'detection_method': 'order_not_found'
-                                    })
-                                    
-                            except Exception as balance_error:
-                                print(f"   ❌ Không thể kiểm tra balance: {balance_error}")
-                                # Fallback: đánh dấu unknown
-                                sell_order['status'] = 'UNKNOWN'
-                                sell_order['note'] = 'Manual intervention detected but could not verify'
-                        else:
-                            print(f"⚠️ Lỗi kiểm tra order {order_id}: {order_error}")
-                            continue
+                                print(f"   💰 Balance check: Đã bán {sold_quantity} {coin}")
+                                print(f"   📊 Expected: {expected_balance}, Actual: {current_balance}")
+                                
+                                # Lấy giá hiện tại làm estimate
+                                ticker = exchange_api.get_symbol_ticker(symbol=symbol.replace('/', ''))
+                                current_price = float(ticker['price'])
+                                
+                                # Update position
+                                self.update_position_after_sell(symbol, sold_quantity, current_price)
+                                
+                                # Đánh dấu manual intervention
+                                sell_order['status'] = 'MANUAL_FILLED'
+                                sell_order['filled_at'] = datetime.now().isoformat()
+                                sell_order['filled_price'] = current_price
+                                sell_order['fill_type'] = 'MANUAL'
+                                sell_order['note'] = 'Detected via balance check'
+                                
+                                manual_interventions.append({
+                                    'coin': coin,
+                                    'action': 'SELL',
+                                    'quantity': sold_quantity,
+                                    'estimated_price': current_price,
+                                    'detection_method': 'balance_check'
+                                })
+                                
+                                updated_positions.append(coin)
+                                
+                            else:
+                                # Balance không đổi = chỉ hủy lệnh
+                                print(f"   ❌ Order bị hủy, không có giao dịch")
+                                sell_order['status'] = 'MANUAL_CANCELED'
+                                sell_order['canceled_at'] = datetime.now().isoformat()
+                                sell_order['fill_type'] = 'MANUAL'
+                                
+                                manual_interventions.append({
+                                    'coin': coin,
+                                    'action': 'CANCEL',
+                                    'order_id': order_id,
+                                    'detection_method': 'order_not_found'
+                                })
+                                
+                        except Exception as balance_error:
+                            print(f"   ❌ Không thể kiểm tra balance: {balance_error}")
+                            # Fallback: đánh dấu unknown
+                            sell_order['status'] = 'UNKNOWN'
+                            sell_order['note'] = 'Manual intervention detected but could not verify'
+                    else:
+                        print(f"⚠️ Lỗi kiểm tra order {order_id}: {order_error}")
+                        continue
+                
+                self.sell_order_index.pop(order_id, None)
+                changed_coins.add(coin)
+            
+            # Chỉ lưu coin có lệnh bán đổi trạng thái (position có thể đã bị xoá khi bán hết)
+            for coin in changed_coins:
+                if coin in self.positions:
+                    self.save_position(coin)
             
             # Cleanup và save
             self.cleanup_old_sell_orders()
@@ -551,8 +644,7 @@ class PositionManager:
                                          key=lambda x: x.get('created_at', ''), 
                                          reverse=True)
                     position['active_sell_orders'] = sorted_orders[:10]
-                    
-            self.save_positions()
+                    self.save_position(coin)
             
         except Exception as e:
             print(f"❌ Lỗi cleanup sell orders: {e}")
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Position Storage - Backend lưu dữ liệu cho PositionManager
+
+- JsonPositionStorage: file position_data.json như trước (ghi lại toàn bộ file mỗi thay đổi)
+- SqlitePositionStorage: SQLite nhúng - positions, buy_orders, active_sell_orders là các bảng có index,
+  mỗi thay đổi chỉ ghi các dòng của coin liên quan trong 1 transaction, lịch sử lệnh mua được giữ lại
+
+Cả 2 backend đọc/ghi cùng cấu trúc dict positions mà PositionManager đang dùng.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+
+POSITION_FIELDS = ('symbol', 'total_quantity', 'total_cost', 'average_price', 'created_at', 'updated_at')
+
+
+class JsonPositionStorage:
+    trims_history = True  # File JSON phải cắt bớt lịch sử để không phình to
+
+    def __init__(self, file_path='position_data.json'):
+        self.file_path = file_path
+
+    def exists(self):
+        return os.path.exists(self.file_path)
+
+    def load(self):
+        with open(self.file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save_all(self, positions):
+        with open(self.file_path, 'w', encoding='utf-8') as f:
+            json.dump(positions, f, indent=2, ensure_ascii=False, default=str)
+
+    def save_position(self, positions, coin):
+        self.save_all(positions)
+
+    def add_buy_order(self, positions, coin, buy_order):
+        self.save_all(positions)
+
+    def add_sell_order(self, positions, coin, sell_order):
+        self.save_all(positions)
+
+    def size_kb(self):
+        return os.path.getsize(self.file_path) / 1024 if self.exists() else 0
+
+    def needs_maintenance(self):
+        return self.size_kb() > 50
+
+
+class SqlitePositionStorage:
+    trims_history = False
+
+    def __init__(self, db_path='position_data.db'):
+        self.file_path = db_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS positions (
+                    coin TEXT PRIMARY KEY,
+                    symbol TEXT,
+                    total_quantity REAL,
+                    total_cost REAL,
+                    average_price REAL,
+                    created_at TEXT,
+                    updated_at TEXT,
+                    extra TEXT
+                );
+                CREATE TABLE IF NOT EXISTS buy_orders (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    coin TEXT NOT NULL,
+                    order_id TEXT,
+                    quantity REAL,
+                    price REAL,
+                    timestamp TEXT,
+                    is_open INTEGER NOT NULL DEFAULT 1,
+                    data TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_buy_orders_open ON buy_orders (coin, is_open);
+                CREATE TABLE IF NOT EXISTS active_sell_orders (
+                    coin TEXT NOT NULL,
+                    order_id TEXT NOT NULL,
+                    status TEXT,
+                    created_at TEXT,
+                    data TEXT,
+                    PRIMARY KEY (coin, order_id)
+                );
+                CREATE INDEX IF NOT EXISTS idx_sell_orders_status ON active_sell_orders (status);
+            """)
+
+    def exists(self):
+        return self.conn.execute("SELECT 1 FROM positions LIMIT 1").fetchone() is not None
+
+    # ===== Đọc =====
+
+    def load(self):
+        positions = {}
+        with self.lock:
+            for row in self.conn.execute("SELECT * FROM positions"):
+                position = json.loads(row['extra']) if row['extra'] else {}
+                position.update({field: row[field] for field in POSITION_FIELDS})
+                position['buy_orders'] = []
+                position['active_sell_orders'] = []
+                positions[row['coin']] = position
+
+            # Chỉ nạp các lô mua còn mở - lô đã bán hết vẫn nằm trong bảng làm lịch sử
+            for row in self.conn.execute("SELECT * FROM buy_orders WHERE is_open = 1 ORDER BY id"):
+                if row['coin'] in positions:
+                    positions[row['coin']]['buy_orders'].append(self._buy_order_from_row(row))
+
+            for row in self.conn.execute("SELECT coin, data FROM active_sell_orders ORDER BY created_at"):
+                if row['coin'] in positions:
+                    positions[row['coin']]['active_sell_orders'].append(json.loads(row['data']))
+        return positions
+
+    @staticmethod
+    def _buy_order_from_row(row):
+        buy_order = json.loads(row['data']) if row['data'] else {}
+        buy_order.update({
+            'quantity': row['quantity'],
+            'price': row['price'],
+            'timestamp': row['timestamp'],
+            'order_id': row['order_id'],
+            'row_id': row['id']
+        })
+        return buy_order
+
+    def buy_order_history(self, coin):
+        """Toàn bộ lệnh mua của coin (kể cả lô đã bán hết)"""
+        with self.lock:
+            rows = self.conn.execute("SELECT * FROM buy_orders WHERE coin = ? ORDER BY id", (coin,)).fetchall()
+        return [dict(self._buy_order_from_row(row), is_open=bool(row['is_open'])) for row in rows]
+
+    # ===== Ghi =====
+
+    def _upsert_position(self, coin, position):
+        extra = {k: v for k, v in position.items() if k not in POSITION_FIELDS and k not in ('buy_orders', 'active_sell_orders')}
+        self.conn.execute(
+            "INSERT OR REPLACE INTO positions (coin, symbol, total_quantity, total_cost, average_price, created_at, updated_at, extra) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (coin, *(position.get(field) for field in POSITION_FIELDS), json.dumps(extra, default=str))
+        )
+
+    def _insert_buy_order(self, coin, buy_order):
+        data = {k: v for k, v in buy_order.items() if k not in ('quantity', 'price', 'timestamp', 'order_id', 'row_id')}
+        cursor = self.conn.execute(
+            "INSERT INTO buy_orders (coin, order_id, quantity, price, timestamp, data) VALUES (?, ?, ?, ?, ?, ?)",
+            (coin, None if buy_order.get('order_id') is None else str(buy_order['order_id']),
+             buy_order['quantity'], buy_order['price'], buy_order.get('timestamp'), json.dumps(data, default=str))
+        )
+        buy_order['row_id'] = cursor.lastrowid
+
+    def _upsert_sell_order(self, coin, sell_order):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO active_sell_orders (coin, order_id, status, created_at, data) VALUES (?, ?, ?, ?, ?)",
+            (coin, str(sell_order['order_id']), sell_order.get('status'), sell_order.get('created_at'),
+             json.dumps(sell_order, default=str))
+        )
+
+    def add_buy_order(self, positions, coin, buy_order):
+        """1 lệnh mua mới = insert 1 dòng buy_orders + cập nhật dòng position"""
+        with self.lock, self.conn:
+            self._insert_buy_order(coin, buy_order)
+            self._upsert_position(coin, positions[coin])
+
+    def add_sell_order(self, positions, coin, sell_order):
+        with self.lock, self.conn:
+            self._upsert_sell_order(coin, sell_order)
+            self._upsert_position(coin, positions[coin])
+
+    def save_position(self, positions, coin):
+        """Đồng bộ 1 coin (position, các lô mua còn mở, lệnh bán) trong 1 transaction"""
+        with self.lock, self.conn:
+            position = positions.get(coin)
+            if position is None:
+                self.conn.execute("DELETE FROM positions WHERE coin = ?", (coin,))
+                self.conn.execute("UPDATE buy_orders SET is_open = 0 WHERE coin = ? AND is_open = 1", (coin,))
+                self.conn.execute("DELETE FROM active_sell_orders WHERE coin = ?", (coin,))
+                return
+
+            self._upsert_position(coin, position)
+
+            open_ids = set()
+            for buy_order in position.get('buy_orders', []):
+                if buy_order.get('row_id') is None:
+                    self._insert_buy_order(coin, buy_order)
+                else:
+                    self.conn.execute("UPDATE buy_orders SET quantity = ? WHERE id = ?", (buy_order['quantity'], buy_order['row_id']))
+                open_ids.add(buy_order['row_id'])
+            # Lô không còn trong danh sách = đã bán hết (FIFO) - đóng lại, không xoá
+            for (row_id,) in self.conn.execute("SELECT id FROM buy_orders WHERE coin = ? AND is_open = 1", (coin,)).fetchall():
+                if row_id not in open_ids:
+                    self.conn.execute("UPDATE buy_orders SET is_open = 0 WHERE id = ?", (row_id,))
+
+            sell_orders = position.get('active_sell_orders', [])
+            for sell_order in sell_orders:
+                self._upsert_sell_order(coin, sell_order)
+            placeholders = ','.join('?' * len(sell_orders))
+            self.conn.execute(
+                f"DELETE FROM active_sell_orders WHERE coin = ? AND order_id NOT IN ({placeholders})",
+                (coin, *(str(o['order_id']) for o in sell_orders))
+            )
+
+    def save_all(self, positions):
+        with self.lock:
+            coins = {row[0] for row in self.conn.execute("SELECT coin FROM positions")}
+        for coin in coins | set(positions):
+            self.save_position(positions, coin)
+
+    def import_json(self, json_path):
+        """Nhập dữ liệu từ position_data.json cũ (chỉ khi database còn trống)"""
+        if self.exists() or not os.path.exists(json_path):
+            return 0
+        positions = JsonPositionStorage(json_path).load()
+        self.save_all(positions)
+        return len(positions)
+
+    def size_kb(self):
+        return os.path.getsize(self.file_path) / 1024 if os.path.exists(self.file_path) else 0
+
+    def needs_maintenance(self):
+        return False
+
+
+def create_position_storage(backend='json', json_path='position_data.json', db_path='position_data.db'):
+    """Tạo backend theo cấu hình ('json' hoặc 'sqlite'), SQLite mới tạo sẽ nhập dữ liệu từ file JSON cũ"""
+    if backend == 'sqlite':
+        storage = SqlitePositionStorage(db_path)
+        imported = storage.import_json(json_path)
+        if imported:
+            print(f"📥 Đã nhập {imported} position từ {json_path} vào {db_path}")
+        return storage
+    return JsonPositionStorage(json_path)
+
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Rate Limiter - Giới hạn request REST theo request weight của Binance
+
+Mỗi request được tính weight theo endpoint, ngân sách weight/phút được đồng bộ với header
+X-MBX-USED-WEIGHT-1M trả về từ server. Khi gần hết ngân sách, request được xếp theo độ ưu tiên:
+lệnh SL/huỷ lệnh (CRITICAL) đi trước đặt lệnh, đặt lệnh đi trước kiểm tra tài khoản và quét thị trường.
+Gặp 429/418 thì dừng tất cả request cho đến hết Retry-After.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from binance.client import Client
+from binance.exceptions import BinanceAPIException
+
+PRIORITY_CRITICAL = 0  # SL, huỷ lệnh
+PRIORITY_HIGH = 1  # Đặt lệnh
+PRIORITY_NORMAL = 2  # Số dư, trạng thái lệnh
+PRIORITY_LOW = 3  # Dữ liệu thị trường (scan)
+
+# Phần ngân sách weight/phút mỗi mức ưu tiên được dùng - phần còn lại dành cho mức cao hơn
+PRIORITY_SHARES = {PRIORITY_CRITICAL: 1.0, PRIORITY_HIGH: 0.95, PRIORITY_NORMAL: 0.85, PRIORITY_LOW: 0.7}
+
+# (method, path) -> weight theo tài liệu Binance Spot API
+ENDPOINT_WEIGHTS = {
+    ('GET', '/api/v3/ping'): 1,
+    ('GET', '/api/v3/time'): 1,
+    ('GET', '/api/v3/exchangeInfo'): 20,
+    ('GET', '/api/v3/klines'): 2,
+    ('GET', '/api/v3/avgPrice'): 2,
+    ('GET', '/api/v3/account'): 20,
+    ('GET', '/api/v3/order'): 4,
+    ('POST', '/api/v3/order'): 1,
+    ('DELETE', '/api/v3/order'): 1,
+    ('POST', '/api/v3/order/oco'): 1,
+    ('POST', '/api/v3/orderList/oco'): 1,
+    ('GET', '/api/v3/orderList'): 4,
+    ('GET', '/api/v3/allOrders'): 20,
+    ('GET', '/api/v3/myTrades'): 20,
+}
+
+
+def endpoint_weight(method, path, params=None):
+    """Weight của 1 request (một số endpoint phụ thuộc tham số)"""
+    method = method.upper()
+    params = params if isinstance(params, dict) else dict(params or [])
+    has_symbol = 'symbol' in params or 'symbols' in params
+
+    if path == '/api/v3/depth':
+        limit = int(params.get('limit', 100))
+        return 5 if limit <= 100 else 25 if limit <= 500 else 50 if limit <= 1000 else 250
+    if path in ('/api/v3/ticker/price', '/api/v3/ticker/bookTicker'):
+        return 2 if has_symbol else 4
+    if path == '/api/v3/ticker/24hr':
+        return 2 if has_symbol else 80
+    if path == '/api/v3/openOrders':
+        return 6 if method == 'GET' and has_symbol else 80 if method == 'GET' else 1
+    return ENDPOINT_WEIGHTS.get((method, path), 1)
+
+
+def endpoint_priority(method, path):
+    """Độ ưu tiên mặc định theo endpoint (có thể ghi đè bằng WeightRateLimiter.priority)"""
+    method = method.upper()
+    if method == 'DELETE':
+        return PRIORITY_CRITICAL
+    if method == 'POST' and path.startswith(('/api/v3/order', '/api/v3/orderList')):
+        return PRIORITY_HIGH
+    if path in ('/api/v3/account', '/api/v3/order', '/api/v3/openOrders', '/api/v3/allOrders', '/api/v3/orderList'):
+        return PRIORITY_NORMAL
+    return PRIORITY_LOW
+
+
+class WeightRateLimiter:
+    def __init__(self, weight_limit=6000, safety=0.9):
+        """
+        Args:
+            weight_limit: Giới hạn weight/phút của Binance (REQUEST_WEIGHT 1m)
+            safety: Tỷ lệ ngân sách được dùng (chừa khoảng trống cho sai lệch với server)
+        """
+        self.budget = weight_limit * safety
+        self.used_weight = 0
+        self.window = self._current_window()
+        self.blocked_until = 0  # time.time() - không gửi request trước thời điểm này (429/418)
+        self.waiting = {p: 0 for p in PRIORITY_SHARES}
+        self.local = threading.local()
+        self.stats = {'requests': 0, 'weight': 0, 'waits': 0, 'wait_seconds': 0.0, 'rate_limited': 0, 'banned': 0}
+        self.condition = threading.Condition()
+
+    @staticmethod
+    def _current_window():
+        return int(time.time() // 60)
+
+    def _roll_window(self):
+        window = self._current_window()
+        if window != self.window:
+            self.window = window
+            self.used_weight = 0
+
+    @contextmanager
+    def priority(self, level):
+        """Ghi đè độ ưu tiên cho các request gửi từ thread hiện tại trong khối with"""
+        previous = getattr(self.local, 'priority', None)
+        self.local.priority = level
+        try:
+            yield
+        finally:
+            self.local.priority = previous
+
+    def current_priority(self, default):
+        level = getattr(self.local, 'priority', None)
+        return default if level is None else level
+
+    def _can_send(self, weight, level):
+        if time.time() < self.blocked_until:
+            return False
+        if any(self.waiting[p] for p in self.waiting if p < level):
+            return False  # Nhường request ưu tiên cao hơn đang chờ
+        return self.used_weight + weight <= self.budget * PRIORITY_SHARES[level]
+
+    def acquire(self, weight, level=PRIORITY_NORMAL):
+        """Chờ đến khi gửi được request rồi trừ weight vào ngân sách phút hiện tại"""
+        started = None
+        with self.condition:
+            self._roll_window()
+            while not self._can_send(weight, level):
+                if started is None:
+                    started = time.monotonic()
+                    self.stats['waits'] += 1
+                self.waiting[level] += 1
+                now = time.time()
+                timeout = self.blocked_until - now if now < self.blocked_until else 60 - now % 60
+                self.condition.wait(min(timeout, 0.5))
+                self.waiting[level] -= 1
+                self._roll_window()
+            self.used_weight += weight
+            self.stats['requests'] += 1
+            self.stats['weight'] += weight
+            if started is not None:
+                self.stats['wait_seconds'] += time.monotonic() - started
+            self.condition.notify_all()
+
+    def update_from_response(self, response):
+        """Đồng bộ weight đã dùng với header của server, xử lý 429/418"""
+        headers = response.headers
+        with self.condition:
+            self._roll_window()
+            used = headers.get('X-MBX-USED-WEIGHT-1M') or headers.get('X-MBX-USED-WEIGHT')
+            if used is not None:
+                self.used_weight = max(self.used_weight, int(used))
+
+            if response.status_code in (429, 418):
+                retry_after = float(headers.get('Retry-After', 60))
+                self.blocked_until = max(self.blocked_until, time.time() + retry_after)
+                self.stats['banned' if response.status_code == 418 else 'rate_limited'] += 1
+                print(f"🚫 Binance {response.status_code} - tạm dừng request {retry_after:.0f}s")
+            self.condition.notify_all()
+
+    def get_status(self):
+        with self.condition:
+            self._roll_window()
+            return {
+                'used_weight': self.used_weight,
+                'budget': self.budget,
+                'blocked_for': max(0.0, self.blocked_until - time.time()),
+                **self.stats
+            }
+
+
+class RateLimitedClient(Client):
+    """Client gửi mọi request REST qua WeightRateLimiter, tự thử lại khi gặp 429"""
+
+    def __init__(self, *args, limiter=None, max_retries=2, **kwargs):
+        # Gán trước super().__init__ vì Client ping server ngay khi khởi tạo
+        self.limiter = limiter or WeightRateLimiter()
+        self.max_retries = max_retries
+        super().__init__(*args, **kwargs)
+
+    def _request(self, method, uri, signed, force_params=False, **kwargs):
+        path = urlparse(uri).path
+        weight = endpoint_weight(method, path, kwargs.get('data') or kwargs.get('params'))
+        level = self.limiter.current_priority(endpoint_priority(method, path))
+
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire(weight, level)
+            try:
+                return super()._request(method, uri, signed, force_params, **kwargs)
+            except BinanceAPIException as e:
+                # 429 = request bị từ chối (chưa thực hiện) nên gửi lại an toàn; 418 = bị ban IP, không thử lại
+                if e.status_code != 429 or attempt == self.max_retries:
+                    raise
+
@@ -0,0 +1,793 @@
+#!/usr/bin/env python3
+"""
+Replay - Chạy lại pipeline scan-and-trade thật của app trên dữ liệu lịch sử, không cần mạng
+
+Dữ liệu thị trường đi qua ReplayMarketData (nguồn dữ liệu có thể thay thế), lệnh đi vào
+SimulatedExchange (engine khớp lệnh giả lập có cùng interface với python-binance Client).
+"""
+
+import contextlib
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+import config
+import trading_config
+from candle_store import INTERVAL_MS
+from position_storage import create_position_storage
+
+# Số mức giá của sổ lệnh tổng hợp khi không có snapshot
+SYNTHETIC_BOOK_LEVELS = 20
+# Spread của sổ lệnh tổng hợp (tỷ lệ so với giá)
+SYNTHETIC_BOOK_SPREAD = 0.0005
+# orderListId đầu tiên của sàn giả lập (dải riêng, không trùng orderId)
+ORDER_LIST_ID_START = 1000000
+
+
+class SimulatedOrderError(Exception):
+    """Lỗi từ chối lệnh của sàn giả lập (nội dung giống thông báo lỗi Binance)"""
+
+
+class ReplayMarketData:
+    """
+    Nguồn dữ liệu lịch sử cho replay
+
+    Đọc file nến cùng format với CandleStore ({SYMBOL}_{interval}.json, list klines thô của Binance)
+    và snapshot sổ lệnh tùy chọn ({SYMBOL}_orderbook.json, list {'time', 'bids', 'asks'}).
+    Mọi nguồn khác chỉ cần cung cấp các hàm symbols/get_klines/last_candle/get_order_book/time_range.
+    """
+
+    def __init__(self, data_dir=None, symbols=None):
+        self.klines = {}  # (symbol, interval) -> list klines thô, sắp theo open_time
+        self.order_books = {}  # symbol -> list snapshot sắp theo time
+        self.derived = {}  # (symbol, interval) -> klines gộp từ khung nhỏ hơn
+        self.open_times = {}  # (symbol, interval) -> list open_time để tìm kiếm nhị phân
+        if data_dir:
+            self.load_directory(data_dir, symbols)
+
+    def load_directory(self, data_dir, symbols=None):
+        """Đọc toàn bộ file nến và sổ lệnh trong thư mục"""
+        pattern = re.compile(r'^([A-Z0-9]+)_([0-9]+[mhdwM]|orderbook)\.json$')
+        for file_name in sorted(os.listdir(data_dir)):
+            match = pattern.match(file_name)
+            if not match:
+                continue
+            symbol, interval = match.groups()
+            if symbols and symbol not in symbols:
+                continue
+            try:
+                with open(os.path.join(data_dir, file_name), 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except Exception as e:
+                print(f"⚠️ Lỗi đọc replay file {file_name}: {e}")
+                continue
+            if interval == 'orderbook':
+                self.add_order_book_snapshots(symbol, data)
+            else:
+                self.add_klines(symbol, interval, data)
+
+    def add_klines(self, symbol, interval, klines):
+        self.klines[(symbol, interval)] = sorted(klines, key=lambda k: k[0])
+        self.derived = {key: value for key, value in self.derived.items() if key[0] != symbol}
+        self.open_times = {key: value for key, value in self.open_times.items() if key[0] != symbol}
+
+    def add_order_book_snapshots(self, symbol, snapshots):
+        self.order_books[symbol] = sorted(snapshots, key=lambda s: s['time'])
+
+    def symbols(self):
+        return sorted({symbol for symbol, _ in self.klines})
+
+    def base_interval(self, symbol):
+        """Khung thời gian nhỏ nhất có dữ liệu của symbol (dùng cho giá và khớp lệnh)"""
+        intervals = [interval for sym, interval in self.klines if sym == symbol]
+        if not intervals:
+            return None
+        return min(intervals, key=lambda interval: INTERVAL_MS.get(interval, float('inf')))
+
+    def _series(self, symbol, interval):
+        """Klines của khung yêu cầu, tự gộp từ khung nhỏ hơn nếu không có sẵn"""
+        key = (symbol, interval)
+        if key in self.klines:
+            return self.klines[key]
+        if key in self.derived:
+            return self.derived[key]
+
+        target_ms = INTERVAL_MS.get(interval)
+        base = self.base_interval(symbol)
+        if target_ms is None or base is None or target_ms % INTERVAL_MS[base] != 0:
+            return []
+
+        aggregated = []
+        for kline in self.klines[(symbol, base)]:
+            open_time = kline[0] - kline[0] % target_ms
+            if aggregated and aggregated[-1][0] == open_time:
+                bar = aggregated[-1]
+                bar[2] = max(bar[2], float(kline[2]))
+                bar[3] = min(bar[3], float(kline[3]))
+                bar[4] = float(kline[4])
+                bar[5] += float(kline[5])
+            else:
+                aggregated.append([open_time, float(kline[1]), float(kline[2]), float(kline[3]),
+                                   float(kline[4]), float(kline[5]), open_time + target_ms - 1])
+        # Đưa về đúng format klines thô của Binance (12 cột, giá dạng chuỗi)
+        result = [
+            [bar[0], str(bar[1]), str(bar[2]), str(bar[3]), str(bar[4]), str(bar[5]),
+             bar[6], '0', 0, '0', '0', '0']
+            for bar in aggregated
+        ]
+        self.derived[key] = result
+        return result
+
+    def _open_times(self, symbol, interval):
+        key = (symbol, interval)
+        if key not in self.open_times:
+            self.open_times[key] = [kline[0] for kline in self._series(symbol, interval)]
+        return self.open_times[key]
+
+    def get_klines(self, symbol, interval, start_ms=None, end_ms=None):
+        """Các nến đã đóng hoàn toàn trước end_ms (không nhìn trước tương lai)"""
+        interval_ms = INTERVAL_MS.get(interval, 60 * 1000)
+        series = self._series(symbol, interval)
+        open_times = self._open_times(symbol, interval)
+        first = bisect_left(open_times, start_ms) if start_ms is not None else 0
+        last = bisect_right(open_times, end_ms - interval_ms) if end_ms is not None else len(series)
+        return series[first:last]
+
+    def candles_between(self, symbol, start_ms, end_ms):
+        """Nến khung nhỏ nhất đóng trong khoảng (start_ms, end_ms] - dùng cho engine khớp lệnh"""
+        interval = self.base_interval(symbol)
+        if interval is None:
+            return []
+        interval_ms = INTERVAL_MS[interval]
+        return self.get_klines(symbol, interval, start_ms - interval_ms + 1, end_ms)
+
+    def last_candle(self, symbol, clock_ms):
+        """Nến khung nhỏ nhất đóng gần nhất tại thời điểm clock_ms"""
+        interval = self.base_interval(symbol)
+        if interval is None:
+            return None
+        interval_ms = INTERVAL_MS[interval]
+        index = bisect_right(self._open_times(symbol, interval), clock_ms - interval_ms)
+        return self.klines[(symbol, interval)][index - 1] if index > 0 else None
+
+    def get_order_book(self, symbol, clock_ms, limit=20):
+        """Snapshot sổ lệnh gần nhất, hoặc sổ lệnh tổng hợp từ nến cuối nếu không có snapshot"""
+        snapshot = None
+        for item in self.order_books.get(symbol, []):
+            if item['time'] > clock_ms:
+                break
+            snapshot = item
+        if snapshot is not None:
+            return {'lastUpdateId': snapshot['time'], 'bids': snapshot['bids'][:limit], 'asks': snapshot['asks'][:limit]}
+
+        candle = self.last_candle(symbol, clock_ms)
+        if candle is None:
+            return {'lastUpdateId': clock_ms, 'bids': [], 'asks': []}
+
+        price = float(candle[4])
+        levels = min(limit, SYNTHETIC_BOOK_LEVELS)
+        level_qty = max(float(candle[5]) / (2 * levels), 1e-8)
+        half_spread = price * SYNTHETIC_BOOK_SPREAD / 2
+        bids = [[f"{price - half_spread * (2 * i + 1):.8f}", f"{level_qty:.8f}"] for i in range(levels)]
+        asks = [[f"{price + half_spread * (2 * i + 1):.8f}", f"{level_qty:.8f}"] for i in range(levels)]
+        return {'lastUpdateId': clock_ms, 'bids': bids, 'asks': asks}
+
+    def time_range(self):
+        """(open_time nhỏ nhất, close_time lớn nhất) của toàn bộ dữ liệu"""
+        starts, ends = [], []
+        for (symbol, interval), klines in self.klines.items():
+            if klines:
+                starts.append(klines[0][0])
+                ends.append(klines[-1][0] + INTERVAL_MS.get(interval, 60 * 1000))
+        if not starts:
+            return None, None
+        return min(starts), max(ends)
+
+
+class SimulatedExchange:
+    """
+    Sàn giả lập có cùng các hàm python-binance Client mà app đang dùng
+
+    Lệnh market khớp ngay tại giá nến cuối (cộng/trừ slippage), lệnh limit và OCO khớp
+    theo high/low của các nến khung nhỏ nhất khi đồng hồ tiến lên. Nếu trong cùng 1 nến
+    chạm cả TP lẫn stop thì coi như stop khớp trước (giả định bi quan).
+    Phí tính bằng đồng quote. Không kiểm tra stepSize/tickSize khi đặt lệnh.
+    """
+
+    def __init__(self, market_data, initial_balances=None, fee=None, slippage=None, quote_asset='JPY'):
+        self.market_data = market_data
+        self.fee = config.TRADING_FEE if fee is None else fee
+        self.slippage = trading_config.TRADING_CONFIG.get('slippage', 0.001) if slippage is None else slippage
+        self.quote_asset = quote_asset
+        self.balances = {}
+        for asset, amount in (initial_balances or {quote_asset: 100000}).items():
+            self.balances[asset] = {'free': float(amount), 'locked': 0.0}
+        self.clock_ms = 0
+        self.orders = {}  # orderId -> order dict (format Binance)
+        self.order_lists = {}  # orderListId -> [orderId, orderId]
+        self.next_order_id = 1
+        self.next_order_list_id = ORDER_LIST_ID_START
+        self.trades = []  # Lịch sử khớp lệnh
+        self.request_count = 0
+
+    # ===== Đồng hồ và engine khớp lệnh =====
+
+    def set_clock(self, clock_ms):
+        self.clock_ms = int(clock_ms)
+
+    def advance_to(self, clock_ms):
+        """Tiến đồng hồ và khớp các lệnh đang mở theo các nến đóng trong khoảng thời gian đó"""
+        clock_ms = int(clock_ms)
+        open_symbols = {order['symbol'] for order in self.orders.values() if order['status'] == 'NEW'}
+        for symbol in open_symbols:
+            for candle in self.market_data.candles_between(symbol, self.clock_ms, clock_ms):
+                self._match_candle(symbol, candle)
+        self.clock_ms = clock_ms
+
+    def _match_candle(self, symbol, candle):
+        high = float(candle[2])
+        low = float(candle[3])
+        fill_time = candle[0]
+
+        # Stop trước (bi quan), sau đó mới tới limit
+        for order in list(self.orders.values()):
+            if order['symbol'] != symbol or order['status'] != 'NEW':
+                continue
+            if order['type'] == 'STOP_LOSS_LIMIT' and low <= order['stop_price']:
+                self._fill_order(order, min(order['limit_price'], order['stop_price']), fill_time)
+
+        for order in list(self.orders.values()):
+            if order['symbol'] != symbol or order['status'] != 'NEW':
+                continue
+            if order['type'] in ('LIMIT', 'LIMIT_MAKER'):
+                if order['side'] == 'SELL' and high >= order['limit_price']:
+                    self._fill_order(order, order['limit_price'], fill_time)
+                elif order['side'] == 'BUY' and low <= order['limit_price']:
+                    self._fill_order(order, order['limit_price'], fill_time)
+
+    def _fill_order(self, order, price, fill_time):
+        base_asset = order['symbol'][:-len(self.quote_asset)]
+        quantity = order['orig_qty']
+        quote_amount = quantity * price
+
+        if order['side'] == 'SELL':
+            self._balance(base_asset)['locked'] -= quantity
+            self._balance(self.quote_asset)['free'] += quote_amount * (1 - self.fee)
+        else:
+            self._balance(self.quote_asset)['locked'] -= order['reserved_quote']
+            self._balance(self.quote_asset)['free'] += order['reserved_quote'] - quote_amount * (1 + self.fee)
+            self._balance(base_asset)['free'] += quantity
+
+        order['status'] = 'FILLED'
+        order['executed_qty'] = quantity
+        order['cumulative_quote'] = quote_amount
+        order['avg_price'] = price
+        order['update_time'] = fill_time
+        self._record_trade(order, price, quantity, fill_time)
+
+        # OCO: 1 chân khớp thì huỷ chân còn lại (số dư khoá đã dùng cho chân vừa khớp)
+        list_id = order.get('order_list_id', -1)
+        if list_id != -1:
+            for other_id in self.order_lists.get(list_id, []):
+                other = self.orders[other_id]
+                if other['status'] == 'NEW':
+                    other['status'] = 'CANCELED'
+                    other['update_time'] = fill_time
+
+    def _record_trade(self, order, price, quantity, trade_time):
+        self.trades.append({
+            'time': trade_time,
+            'symbol': order['symbol'],
+            'side': order['side'],
+            'type': order['type'],
+            'price': price,
+            'quantity': quantity,
+            'fee': quantity * price * self.fee,
+            'orderId': order['orderId']
+        })
+
+    def _balance(self, asset):
+        if asset not in self.balances:
+            self.balances[asset] = {'free': 0.0, 'locked': 0.0}
+        return self.balances[asset]
+
+    def _release(self, order):
+        """Trả lại số dư đang bị khoá của lệnh bị huỷ"""
+        base_asset = order['symbol'][:-len(self.quote_asset)]
+        if order['side'] == 'SELL':
+            self._balance(base_asset)['locked'] -= order['orig_qty']
+            self._balance(base_asset)['free'] += order['orig_qty']
+        else:
+            self._balance(self.quote_asset)['locked'] -= order['reserved_quote']
+            self._balance(self.quote_asset)['free'] += order['reserved_quote']
+
+    def _price(self, symbol):
+        candle = self.market_data.last_candle(symbol, self.clock_ms)
+        if candle is None:
+            raise SimulatedOrderError(f"Invalid symbol: {symbol}")
+        return float(candle[4])
+
+    def _new_order(self, symbol, side, order_type, quantity, limit_price=None, stop_price=None, order_list_id=-1):
+        order = {
+            'orderId': self.next_order_id,
+            'symbol': symbol,
+            'side': side,
+            'type': order_type,
+            'orig_qty': float(quantity),
+            'executed_qty': 0.0,
+            'cumulative_quote': 0.0,
+            'limit_price': float(limit_price) if limit_price is not None else 0.0,
+            'stop_price': float(stop_price) if stop_price is not None else 0.0,
+            'avg_price': 0.0,
+            'reserved_quote': 0.0,
+            'status': 'NEW',
+            'time': self.clock_ms,
+            'update_time': self.clock_ms,
+            'order_list_id': order_list_id
+        }
+        self.next_order_id += 1
+        self.orders[order['orderId']] = order
+        return order
+
+    def _order_response(self, order):
+        """Format giống response get_order của Binance"""
+        return {
+            'symbol': order['symbol'],
+            'orderId': order['orderId'],
+            'orderListId': order['order_list_id'],
+            'price': f"{order['limit_price']:.8f}",
+            'origQty': f"{order['orig_qty']:.8f}",
+            'executedQty': f"{order['executed_qty']:.8f}",
+            'cummulativeQuoteQty': f"{order['cumulative_quote']:.8f}",
+            'status': order['status'],
+            'timeInForce': 'GTC',
+            'type': order['type'],
+            'side': order['side'],
+            'stopPrice': f"{order['stop_price']:.8f}",
+            'time': order['time'],
+            'updateTime': order['update_time']
+        }
+
+    def _market_order(self, symbol, side, quantity):
+        quantity = float(quantity)
+        if quantity <= 0:
+            raise SimulatedOrderError("Invalid quantity.")
+
+        base_asset = symbol[:-len(self.quote_asset)]
+        last_price = self._price(symbol)
+        price = last_price * (1 + self.slippage) if side == 'BUY' else last_price * (1 - self.slippage)
+        quote_amount = quantity * price
+
+        if side == 'BUY':
+            if self._balance(self.quote_asset)['free'] < quote_amount * (1 + self.fee):
+                raise SimulatedOrderError("Account has insufficient balance for requested action.")
+            self._balance(self.quote_asset)['free'] -= quote_amount * (1 + self.fee)
+            self._balance(base_asset)['free'] += quantity
+        else:
+            if self._balance(base_asset)['free'] < quantity - 1e-12:
+                raise SimulatedOrderError("Account has insufficient balance for requested action.")
+            self._balance(base_asset)['free'] -= quantity
+            self._balance(self.quote_asset)['free'] += quote_amount * (1 - self.fee)
+
+        order = self._new_order(symbol, side, 'MARKET', quantity)
+        order.update({'status': 'FILLED', 'executed_qty': quantity, 'cumulative_quote': quote_amount, 'avg_price': price})
+        self._record_trade(order, price, quantity, self.clock_ms)
+
+        response = self._order_response(order)
+        response['fills'] = [{
+            'price': f"{price:.8f}",
+            'qty': f"{quantity:.8f}",
+            'commission': f"{quote_amount * self.fee:.8f}",
+            'commissionAsset': self.quote_asset
+        }]
+        return response
+
+    def _lock_for_order(self, symbol, side, quantity, price):
+        base_asset = symbol[:-len(self.quote_asset)]
+        if side == 'SELL':
+            balance = self._balance(base_asset)
+            if balance['free'] < quantity - 1e-12:
+                raise SimulatedOrderError("Account has insufficient balance for requested action.")
+            balance['free'] -= quantity
+            balance['locked'] += quantity
+            return 0.0
+
+        reserved = quantity * price * (1 + self.fee)
+        balance = self._balance(self.quote_asset)
+        if balance['free'] < reserved:
+            raise SimulatedOrderError("Account has insufficient balance for requested action.")
+        balance['free'] -= reserved
+        balance['locked'] += reserved
+        return reserved
+
+    # ===== Các hàm tương thích python-binance Client =====
+
+    def get_server_time(self):
+        return {'serverTime': self.clock_ms}
+
+    def get_exchange_info(self):
+        self.request_count += 1
+        symbols = []
+        for symbol in self.market_data.symbols():
+            symbols.append({
+                'symbol': symbol,
+                'status': 'TRADING',
+                'baseAsset': symbol[:-len(self.quote_asset)],
+                'quoteAsset': self.quote_asset,
+                'ocoAllowed': True,
+                'permissions': ['SPOT'],
+                'filters': [
+                    {'filterType': 'PRICE_FILTER', 'minPrice': '0.00100000', 'maxPrice': '100000000.00000000', 'tickSize': '0.00100000'},
+                    {'filterType': 'LOT_SIZE', 'minQty': '0.00010000', 'maxQty': '9000000.00000000', 'stepSize': '0.00010000'},
+                    {'filterType': 'NOTIONAL', 'minNotional': '100.00000000', 'maxNotional': '900000000.00000000'}
+                ]
+            })
+        return {'timezone': 'UTC', 'serverTime': self.clock_ms, 'symbols': symbols}
+
+    def get_symbol_ticker(self, symbol=None):
+        self.request_count += 1
+        if symbol is None:
+            return [{'symbol': s, 'price': f"{self._price(s):.8f}"} for s in self.market_data.symbols()]
+        return {'symbol': symbol, 'price': f"{self._price(symbol):.8f}"}
+
+    def get_all_tickers(self):
+        return self.get_symbol_ticker()
+
+    def get_order_book(self, symbol, limit=100):
+        self.request_count += 1
+        return self.market_data.get_order_book(symbol, self.clock_ms, limit)
+
+    def get_klines(self, symbol, interval, startTime=None, endTime=None, limit=500):
+        self.request_count += 1
+        end_ms = self.clock_ms if endTime is None else min(int(endTime) + 1, self.clock_ms)
+        klines = self.market_data.get_klines(symbol, interval, startTime, end_ms)
+        return klines[:limit] if startTime is not None else klines[-limit:]
+
+    def get_historical_klines(self, symbol, interval, start_str, end_str=None, limit=1000):
+        """Hỗ trợ start_str dạng 'N minutes/hours/days ago UTC' theo đồng hồ giả lập hoặc timestamp ms"""
+        self.request_count += 1
+        start_ms = self._parse_time(start_str)
+        end_ms = self.clock_ms if end_str is None else min(self._parse_time(end_str), self.clock_ms)
+        return self.market_data.get_klines(symbol, interval, start_ms, end_ms)
+
+    def _parse_time(self, value):
+        if isinstance(value, (int, float)):
+            return int(value)
+        match = re.match(r'^\s*(\d+)\s+(minute|hour|day|week)s?\s+ago', str(value))
+        if not match:
+            raise SimulatedOrderError(f"Unsupported time string: {value}")
+        unit_ms = {'minute': 60 * 1000, 'hour': 60 * 60 * 1000, 'day': 24 * 60 * 60 * 1000, 'week': 7 * 24 * 60 * 60 * 1000}
+        return self.clock_ms - int(match.group(1)) * unit_ms[match.group(2)]
+
+    def get_account(self):
+        self.request_count += 1
+        return {
+            'canTrade': True,
+            'updateTime': self.clock_ms,
+            'balances': [
+                {'asset': asset, 'free': f"{max(b['free'], 0):.8f}", 'locked': f"{max(b['locked'], 0):.8f}"}
+                for asset, b in self.balances.items()
+            ]
+        }
+
+    def get_asset_balance(self, asset):
+        balance = self._balance(asset)
+        return {'asset': asset, 'free': f"{balance['free']:.8f}", 'locked': f"{balance['locked']:.8f}"}
+
+    def order_market_buy(self, symbol, quantity, **kwargs):
+        self.request_count += 1
+        return self._market_order(symbol, 'BUY', quantity)
+
+    def order_market_sell(self, symbol, quantity, **kwargs):
+        self.request_count += 1
+        return self._market_order(symbol, 'SELL', quantity)
+
+    def create_order(self, symbol, side, type, quantity, price=None, stopPrice=None, timeInForce=None, **kwargs):
+        self.request_count += 1
+        if type == 'MARKET':
+            return self._market_order(symbol, side, quantity)
+        if type not in ('LIMIT', 'LIMIT_MAKER'):
+            raise SimulatedOrderError(f"Unsupported order type: {type}")
+
+        quantity = float(quantity)
+        price = float(price)
+        reserved = self._lock_for_order(symbol, side, quantity, price)
+        order = self._new_order(symbol, side, type, quantity, limit_price=price)
+        order['reserved_quote'] = reserved
+        return self._order_response(order)
+
+    def order_limit_sell(self, symbol, quantity, price, **kwargs):
+        return self.create_order(symbol, 'SELL', 'LIMIT', quantity, price=price)
+
+    def order_limit_buy(self, symbol, quantity, price, **kwargs):
+        return self.create_order(symbol, 'BUY', 'LIMIT', quantity, price=price)
+
+    def create_oco_order(self, symbol, side, quantity, price, stopPrice, stopLimitPrice=None, **kwargs):
+        self.request_count += 1
+        if side != 'SELL':
+            raise SimulatedOrderError("Only SELL OCO orders are supported in replay")
+
+        quantity = float(quantity)
+        self._lock_for_order(symbol, side, quantity, float(price))
+        order_list_id = self.next_order_list_id
+        self.next_order_list_id += 1
+        stop_limit = float(stopLimitPrice) if stopLimitPrice is not None else float(stopPrice)
+        stop_order = self._new_order(symbol, side, 'STOP_LOSS_LIMIT', quantity,
+                                     limit_price=stop_limit, stop_price=stopPrice, order_list_id=order_list_id)
+        limit_order = self._new_order(symbol, side, 'LIMIT_MAKER', quantity,
+                                      limit_price=price, order_list_id=order_list_id)
+        self.order_lists[order_list_id] = [stop_order['orderId'], limit_order['orderId']]
+
+        response = self._order_list_response(order_list_id)
+        response['orderReports'] = [self._order_response(o) for o in (stop_order, limit_order)]
+        return response
+
+    def _order_list_response(self, order_list_id):
+        """Format giống response GET /api/v3/orderList của Binance"""
+        legs = [self.orders[order_id] for order_id in self.order_lists[order_list_id]]
+        executing = any(leg['status'] == 'NEW' for leg in legs)
+        return {
+            'orderListId': order_list_id,
+            'contingencyType': 'OCO',
+            'listStatusType': 'EXEC_STARTED' if executing else 'ALL_DONE',
+            'listOrderStatus': 'EXECUTING' if executing else 'ALL_DONE',
+            'transactionTime': max(leg['update_time'] for leg in legs),
+            'symbol': legs[0]['symbol'],
+            'orders': [{'symbol': leg['symbol'], 'orderId': leg['orderId']} for leg in legs]
+        }
+
+    def v3_get_order_list(self, orderListId=None, **kwargs):
+        self.request_count += 1
+        if orderListId is None or int(orderListId) not in self.order_lists:
+            raise SimulatedOrderError("Order list does not exist.")
+        return self._order_list_response(int(orderListId))
+
+    def get_order(self, symbol, orderId=None, **kwargs):
+        self.request_count += 1
+        order = self.orders.get(int(orderId))
+        if order is None or order['symbol'] != symbol:
+            raise SimulatedOrderError("Order does not exist.")
+        return self._order_response(order)
+
+    def get_open_orders(self, symbol=None, **kwargs):
+        self.request_count += 1
+        return [
+            self._order_response(order) for order in self.orders.values()
+            if order['status'] == 'NEW' and (symbol is None or order['symbol'] == symbol)
+        ]
+
+    def get_all_orders(self, symbol, **kwargs):
+        self.request_count += 1
+        return [self._order_response(order) for order in self.orders.values() if order['symbol'] == symbol]
+
+    def cancel_order(self, symbol, orderId=None, **kwargs):
+        self.request_count += 1
+        order = self.orders.get(int(orderId))
+        if order is None or order['symbol'] != symbol or order['status'] != 'NEW':
+            raise SimulatedOrderError("Unknown order sent.")
+        # Huỷ 1 chân OCO là huỷ cả danh sách - 2 chân dùng chung 1 phần số dư bị khoá
+        self._release(order)
+        list_id = order.get('order_list_id', -1)
+        legs = self.order_lists.get(list_id, [order['orderId']]) if list_id != -1 else [order['orderId']]
+        for leg_id in legs:
+            leg = self.orders[leg_id]
+            if leg['status'] == 'NEW':
+                leg['status'] = 'CANCELED'
+                leg['update_time'] = self.clock_ms
+        return self._order_response(order)
+
+    # ===== Định giá tài khoản =====
+
+    def equity(self):
+        """Tổng giá trị tài khoản quy ra đồng quote theo giá nến cuối"""
+        total = 0.0
+        for asset, balance in self.balances.items():
+            amount = balance['free'] + balance['locked']
+            if asset == self.quote_asset:
+                total += amount
+            elif amount > 0:
+                try:
+                    total += amount * self._price(asset + self.quote_asset)
+                except SimulatedOrderError:
+                    pass
+        return total
+
+
+@contextlib.contextmanager
+def replay_environment(exchange):
+    """
+    Chuyển app sang sàn giả lập trong khối with, khôi phục nguyên trạng khi ra khỏi khối
+
+    Mọi request của app đi vào exchange (không cần mạng), file lệnh/position/log nằm trong
+    thư mục tạm (giá trị trả về của with), email tắt, không chạy thread monitor.
+    """
+    import app
+    from position_manager import position_manager
+
+    work_dir = tempfile.mkdtemp(prefix='replay_')
+
+    # Lưu lại trạng thái app để khôi phục sau khi replay
+    saved_app = {name: getattr(app, name) for name in (
+        'binance', 'CANDLE_STORE', 'MARKET_SCANNER', 'MARKET_STREAM', 'EXCHANGE_METADATA', 'ACTIVE_ORDERS',
+        'ACTIVE_ORDERS_FILE', 'MONITOR_RUNNING', 'ORDER_MONITORING_INITIALIZED', 'AUTO_RETRADING_ENABLED', 'BOT_RUNNING',
+        'MODEL_CACHE'
+    )}
+    saved_trading_config = dict(app.TRADING_CONFIG)
+    saved_notification_config = dict(trading_config.NOTIFICATION_CONFIG)
+    # Giá trị thô (chưa đọc thì vẫn là None) - replay không tạo/đọc file position thật
+    saved_positions = (position_manager._storage, position_manager.file_path, position_manager._positions, position_manager.sell_order_index)
+    saved_metrics = (app.cycle_metrics.metrics_file, app.cycle_metrics.request_counter)
+
+    try:
+        app.binance = exchange
+        app.CANDLE_STORE = None
+        app.MARKET_STREAM = None
+        app.EXCHANGE_METADATA = app.ExchangeMetadataCache(config.EXCHANGE_METADATA_TTL)
+        app.MARKET_SCANNER = app.MarketScanner(config.SCANNER_MAX_WORKERS)
+        app.MODEL_CACHE = app.ModelCache(config.MODEL_CACHE_SIZE)  # Chỉ trong bộ nhớ, không dùng kết quả của lần chạy thật
+        app.ACTIVE_ORDERS = {}
+        app.ACTIVE_ORDERS_FILE = os.path.join(work_dir, 'active_orders.json')
+        app.MONITOR_RUNNING = True  # Không khởi động thread monitor thật - mỗi chu kỳ tự kiểm tra lệnh
+        app.ORDER_MONITORING_INITIALIZED = True  # Không đọc file lệnh thật
+        app.AUTO_RETRADING_ENABLED = False
+        app.BOT_RUNNING = True
+        app.TRADING_CONFIG.update({
+            'log_file': os.path.join(work_dir, 'trading_log.txt'),
+            'error_retry_delay': 0,
+            'send_error_emails': False
+        })
+        trading_config.NOTIFICATION_CONFIG['enabled'] = False
+        position_manager.storage = create_position_storage(
+            app.TRADING_CONFIG.get('position_storage', 'json'),
+            os.path.join(work_dir, 'position_data.json'),
+            os.path.join(work_dir, 'position_data.db')
+        )
+        position_manager.file_path = position_manager.storage.file_path
+        position_manager.positions = {}
+        position_manager.sell_order_index = {}
+        # Thống kê giai đoạn chỉ tính cho lần replay này, request lấy từ sàn giả lập
+        app.cycle_metrics.reset()
+        app.cycle_metrics.metrics_file = None
+        app.cycle_metrics.request_counter = lambda: {'simulated': exchange.request_count}
+
+        yield work_dir
+    finally:
+        # Ghi nốt log vào work_dir trước khi xoá
+        app.event_logger.flush()
+        for name, value in saved_app.items():
+            setattr(app, name, value)
+        app.TRADING_CONFIG.clear()
+        app.TRADING_CONFIG.update(saved_trading_config)
+        trading_config.NOTIFICATION_CONFIG.clear()
+        trading_config.NOTIFICATION_CONFIG.update(saved_notification_config)
+        position_manager.storage, position_manager.file_path, position_manager.positions, position_manager.sell_order_index = saved_positions
+        app.cycle_metrics.metrics_file, app.cycle_metrics.request_counter = saved_metrics
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def run_replay(market_data, mode='systematic', start_ms=None, end_ms=None, cycle_interval=None,
+               initial_balances=None, warmup_days=7, max_cycles=None, seed=42, verbose=False):
+    """
+    Chạy lại chu kỳ trading của app trên dữ liệu lịch sử
+
+    Args:
+        market_data: Nguồn dữ liệu (ReplayMarketData hoặc object cùng interface)
+        mode: 'systematic' (execute_systematic_trading) hoặc 'scalping' (execute_scalping_trading)
+        start_ms, end_ms: Khoảng thời gian replay (mặc định: toàn bộ dữ liệu sau warmup_days)
+        cycle_interval: Khoảng cách giữa 2 chu kỳ (mặc định 30m cho systematic, 15m cho scalping)
+        initial_balances: Số dư ban đầu (mặc định ¥100,000)
+        max_cycles: Giới hạn số chu kỳ (None = không giới hạn)
+        seed: Seed cho các phần ngẫu nhiên của app để kết quả lặp lại được
+        verbose: In toàn bộ log của app
+
+    Returns:
+        dict: Thống kê throughput (cycles/sec) và PnL
+    """
+    import app
+
+    if mode not in ('systematic', 'scalping'):
+        raise ValueError(f"mode không hợp lệ: {mode}")
+    cycle_function = app.execute_systematic_trading if mode == 'systematic' else app.execute_scalping_trading
+    cycle_interval = cycle_interval or ('30m' if mode == 'systematic' else '15m')
+    cycle_ms = INTERVAL_MS[cycle_interval]
+
+    data_start, data_end = market_data.time_range()
+    if data_start is None:
+        raise ValueError("Không có dữ liệu nến để replay")
+    start_ms = start_ms if start_ms is not None else data_start + warmup_days * 24 * 60 * 60 * 1000
+    start_ms -= start_ms % cycle_ms
+    end_ms = end_ms if end_ms is not None else data_end
+
+    exchange = SimulatedExchange(market_data, initial_balances)
+    exchange.set_clock(start_ms)
+    start_equity = exchange.equity()
+
+    np.random.seed(seed)
+
+    cycles = 0
+    errors = 0
+    cycle_times = []
+    started_at = time.perf_counter()
+    with replay_environment(exchange):
+        clock_ms = start_ms
+        while clock_ms <= end_ms and (max_cycles is None or cycles < max_cycles):
+            exchange.advance_to(clock_ms)
+            # Lệnh có thể đã khớp khi tua thời gian - không dùng lại số dư của chu kỳ trước
+            app.balance_snapshot.invalidate()
+            cycle_start = time.perf_counter()
+            output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+            try:
+                with output, app.cycle_metrics.cycle(f"replay_{mode}"):
+                    cycle_function()
+            except Exception as e:
+                errors += 1
+                print(f"⚠️ Lỗi chu kỳ replay tại {clock_ms}: {e}")
+            cycle_times.append(time.perf_counter() - cycle_start)
+            cycles += 1
+            clock_ms += cycle_ms
+
+        exchange.advance_to(min(clock_ms, end_ms))
+
+    elapsed = time.perf_counter() - started_at
+    end_equity = exchange.equity()
+    buys = [t for t in exchange.trades if t['side'] == 'BUY']
+    sells = [t for t in exchange.trades if t['side'] == 'SELL']
+
+    return {
+        'mode': mode,
+        'cycles': cycles,
+        'errors': errors,
+        'elapsed_seconds': elapsed,
+        'cycles_per_second': cycles / elapsed if elapsed > 0 else 0,
+        'avg_cycle_ms': float(np.mean(cycle_times)) * 1000 if cycle_times else 0,
+        'start_ms': start_ms,
+        'end_ms': exchange.clock_ms,
+        'start_equity': start_equity,
+        'end_equity': end_equity,
+        'pnl': end_equity - start_equity,
+        'pnl_percent': (end_equity / start_equity - 1) * 100 if start_equity > 0 else 0,
+        'buy_count': len(buys),
+        'sell_count': len(sells),
+        'fees_paid': sum(t['fee'] for t in exchange.trades),
+        'requests': exchange.request_count,
+        'stages': app.cycle_metrics.snapshot()['stages'],
+        'trades': exchange.trades
+    }
+
+
+def print_replay_report(report):
+    print("📊 KẾT QUẢ REPLAY")
+    print("=" * 60)
+    print(f"⚙️ Mode: {report['mode']} | Chu kỳ: {report['cycles']} | Lỗi: {report['errors']}")
+    print(f"⏱️ Thời gian: {report['elapsed_seconds']:.2f}s | {report['cycles_per_second']:.2f} cycles/s | TB {report['avg_cycle_ms']:.1f} ms/chu kỳ")
+    print(f"💰 Vốn: ¥{report['start_equity']:,.2f} → ¥{report['end_equity']:,.2f}")
+    print(f"📈 PnL: ¥{report['pnl']:+,.2f} ({report['pnl_percent']:+.2f}%) | Phí: ¥{report['fees_paid']:,.2f}")
+    print(f"🔄 Lệnh khớp: {report['buy_count']} mua / {report['sell_count']} bán | Requests: {report['requests']}")
+    stages = sorted(report.get('stages', {}).items(), key=lambda item: -item[1]['p95_ms'])
+    for stage, stats in stages[:8]:
+        print(f"   ⏱️ {stage:<28} n={stats['count']:<5} p50 {stats['p50_ms']:8.2f} | p95 {stats['p95_ms']:8.2f} | p99 {stats['p99_ms']:8.2f} ms")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay chu kỳ trading trên dữ liệu lịch sử")
+    parser.add_argument('--data-dir', default=config.CANDLE_STORE_DIR, help="Thư mục chứa file nến/sổ lệnh")
+    parser.add_argument('--mode', default='systematic', choices=['systematic', 'scalping'])
+    parser.add_argument('--balance', type=float, default=100000, help="Số dư JPY ban đầu")
+    parser.add_argument('--max-cycles', type=int, default=None)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    data = ReplayMarketData(args.data_dir)
+    result = run_replay(data, mode=args.mode, initial_balances={'JPY': args.balance},
+                        max_cycles=args.max_cycles, verbose=args.verbose)
+    print_replay_report(result)
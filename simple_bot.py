@@ -1,19 +1,14 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from binance.client import Client
-import trading_config
+from client_registry import get_client
 import pandas as pd
 import time
 
 def get_jpy_pairs():
     """Lấy danh sách cặp USDT có sẵn"""
     try:
-        client = Client(
-            api_key=trading_config.BINANCE_CONFIG['api_key'],
-            api_secret=trading_config.BINANCE_CONFIG['api_secret'],
-            testnet=trading_config.BINANCE_CONFIG['testnet']
-        )
+        client = get_client()
         
         exchange_info = client.get_exchange_info()
         symbols = [s['symbol'] for s in exchange_info['symbols'] if s['status'] == 'TRADING']
@@ -39,11 +34,7 @@ def get_jpy_pairs():
 def get_crypto_data(symbol, timeframe='30m', limit=500):
     """Lấy dữ liệu giá"""
     try:
-        client = Client(
-            api_key=trading_config.BINANCE_CONFIG['api_key'],
-            api_secret=trading_config.BINANCE_CONFIG['api_secret'],
-            testnet=trading_config.BINANCE_CONFIG['testnet']
-        )
+        client = get_client()
         
         # Convert symbol
         if '/JPY' in symbol:
@@ -52,7 +43,7 @@ def get_crypto_data(symbol, timeframe='30m', limit=500):
         else:
             binance_symbol = symbol.replace('/', '')
         
-        interval = Client.KLINE_INTERVAL_30MINUTE
+        interval = '30m'
         # Use "limit days ago UTC" instead of minutes
         klines = client.get_historical_klines(binance_symbol, interval, "30 days ago UTC")
         
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Stop Loss Engine - Kích hoạt SL theo từng tick giá thay vì chờ chu kỳ trading
+
+Giá SL được index theo symbol trong list đã sắp xếp: mỗi tick chỉ cần 1 phép so sánh
+với mức SL cao nhất, và lấy ra toàn bộ lệnh bị chạm bằng tìm kiếm nhị phân.
+"""
+
+import queue
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import deque
+
+import numpy as np
+
+
+class StopLossEngine:
+    def __init__(self, execute_stop, price_fetcher=None, poll_interval=2.0):
+        """
+        Args:
+            execute_stop: Hàm (order_id, symbol, trigger_price) thực hiện huỷ TP + bán market
+            price_fetcher: Hàm (symbols) -> {symbol: price} cho chế độ poll nhanh
+            poll_interval: Chu kỳ poll giá (giây)
+        """
+        self.execute_stop = execute_stop
+        self.price_fetcher = price_fetcher
+        self.poll_interval = poll_interval
+        self.stop_prices = {}  # symbol -> list [(stop_price, order_id)] tăng dần
+        self.order_index = {}  # order_id -> (symbol, stop_price)
+        self.lock = threading.Lock()
+        self.jobs = queue.Queue()
+        self.running = False
+        self.worker_thread = None
+        self.poll_thread = None
+        self.latencies = deque(maxlen=1000)  # Thời gian trigger -> fill (giây)
+        self.triggered_count = 0
+
+    # ===== Index giá SL =====
+
+    def add_stop(self, order_id, symbol, stop_price):
+        order_id = str(order_id)
+        with self.lock:
+            self._remove(order_id)
+            insort(self.stop_prices.setdefault(symbol, []), (float(stop_price), order_id))
+            self.order_index[order_id] = (symbol, float(stop_price))
+
+    def remove_stop(self, order_id):
+        with self.lock:
+            self._remove(str(order_id))
+
+    def _remove(self, order_id):
+        entry = self.order_index.pop(order_id, None)
+        if entry is None:
+            return
+        symbol, stop_price = entry
+        stops = self.stop_prices.get(symbol, [])
+        index = bisect_left(stops, (stop_price, order_id))
+        if index < len(stops) and stops[index] == (stop_price, order_id):
+            del stops[index]
+        if not stops:
+            self.stop_prices.pop(symbol, None)
+
+    def sync(self, active_orders):
+        """Đồng bộ index với ACTIVE_ORDERS (chỉ các lệnh TAKE_PROFIT có giá SL)"""
+        wanted = {}
+        for order_id, order_info in list(active_orders.items()):
+            stop_price = order_info.get('stop_loss_price')
+            if order_info.get('order_type') == 'TAKE_PROFIT' and stop_price:
+                wanted[str(order_id)] = (order_info['symbol'], float(stop_price))
+
+        with self.lock:
+            for order_id in [oid for oid in self.order_index if self.order_index[oid] != wanted.get(oid)]:
+                self._remove(order_id)
+            for order_id, (symbol, stop_price) in wanted.items():
+                if order_id not in self.order_index:
+                    insort(self.stop_prices.setdefault(symbol, []), (stop_price, order_id))
+                    self.order_index[order_id] = (symbol, stop_price)
+
+    def symbols(self):
+        with self.lock:
+            return list(self.stop_prices)
+
+    # ===== Xử lý tick giá =====
+
+    def on_price(self, symbol, price, synchronous=False):
+        """
+        Gọi mỗi khi có giá mới của symbol
+
+        Returns:
+            int: Số lệnh SL bị kích hoạt ở tick này
+        """
+        tick_time = time.perf_counter()
+        with self.lock:
+            stops = self.stop_prices.get(symbol)
+            # Nhanh: giá còn cao hơn mức SL cao nhất thì không có gì để làm
+            if not stops or price > stops[-1][0]:
+                return 0
+            # Các mức SL >= giá hiện tại nằm ở cuối list
+            index = bisect_left(stops, (price, ''))
+            triggered = stops[index:]
+            del stops[index:]
+            for _, order_id in triggered:
+                del self.order_index[order_id]
+            if not stops:
+                del self.stop_prices[symbol]
+
+        for _, order_id in triggered:
+            job = (order_id, symbol, price, tick_time)
+            if synchronous or not self.running:
+                self._execute(job)
+            else:
+                self.jobs.put(job)
+        return len(triggered)
+
+    def _execute(self, job):
+        order_id, symbol, price, tick_time = job
+        try:
+            self.execute_stop(order_id, symbol, price)
+        except Exception as e:
+            print(f"❌ Lỗi xử lý SL cho lệnh {order_id}: {e}")
+        latency = time.perf_counter() - tick_time
+        self.latencies.append(latency)
+        self.triggered_count += 1
+        print(f"⏱️ SL {symbol} trigger → fill: {latency * 1000:.1f} ms")
+
+    def poll_once(self, synchronous=False):
+        """Lấy giá tất cả symbol có SL và đánh giá 1 tick"""
+        if self.price_fetcher is None:
+            return 0
+        symbols = self.symbols()
+        if not symbols:
+            return 0
+        triggered = 0
+        for symbol, price in self.price_fetcher(symbols).items():
+            if price:
+                triggered += self.on_price(symbol, price, synchronous=synchronous)
+        return triggered
+
+    # ===== Thread worker + poll =====
+
+    def _worker_loop(self):
+        while self.running:
+            try:
+                job = self.jobs.get(timeout=1)
+            except queue.Empty:
+                continue
+            self._execute(job)
+
+    def _poll_loop(self):
+        while self.running:
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"⚠️ Lỗi poll giá SL: {e}")
+            time.sleep(self.poll_interval)
+
+    def start(self, poll=True):
+        if self.running:
+            return
+        self.running = True
+        self.worker_thread = threading.Thread(target=self._worker_loop, daemon=True)
+        self.worker_thread.start()
+        if poll and self.price_fetcher is not None:
+            self.poll_thread = threading.Thread(target=self._poll_loop, daemon=True)
+            self.poll_thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def get_latency_stats(self):
+        """Thống kê thời gian trigger -> fill (ms)"""
+        if not self.latencies:
+            return {'count': self.triggered_count, 'avg_ms': 0, 'p50_ms': 0, 'p95_ms': 0, 'max_ms': 0}
+        values = np.array(self.latencies) * 1000
+        return {
+            'count': self.triggered_count,
+            'avg_ms': float(values.mean()),
+            'p50_ms': float(np.percentile(values, 50)),
+            'p95_ms': float(np.percentile(values, 95)),
+            'max_ms': float(values.max())
+        }
+
@@ -0,0 +1,72 @@
+import pytest
+
+from account_info import JPY_PER_USD, get_account_info, value_portfolio
+
+TICKERS = [
+    {'symbol': 'ETHUSDT', 'price': '2500.0'},
+    {'symbol': 'ETHJPY', 'price': '375000.0'},
+    {'symbol': 'XRPJPY', 'price': '90.0'},
+    {'symbol': 'BTCUSDT', 'price': '60000.0'}
+]
+
+
+class StubClient:
+    def __init__(self, balances):
+        self.balances = balances
+        self.ticker_calls = 0
+
+    def get_account(self):
+        return {'balances': self.balances}
+
+    def get_all_tickers(self):
+        self.ticker_calls += 1
+        return TICKERS
+
+    def get_open_orders(self):
+        return []
+
+
+def balance_row(asset, free, locked='0.0'):
+    return {'asset': asset, 'free': free, 'locked': locked}
+
+
+def test_get_account_info_values_every_asset_from_one_ticker_call():
+    client = StubClient([
+        balance_row('JPY', '15000.0'),
+        balance_row('USDT', '100.0'),
+        balance_row('ETH', '0.5', '0.5'),   # có giá USDT
+        balance_row('XRP', '150.0'),        # chỉ có cặp JPY trực tiếp
+        balance_row('FOO', '42.0'),         # không có giá nào
+        balance_row('BTC', '0.0'),          # số dư 0 (coin airdrop testnet) bị bỏ qua
+    ])
+
+    valuation = get_account_info(binance=client)
+
+    assert client.ticker_calls == 1
+    assert valuation['fiat_value'] == pytest.approx(100 + 15000 / JPY_PER_USD)
+    assert valuation['assets']['ETH'] == {'free': 0.5, 'used': 0.5, 'total': 1.0, 'price_usd': 2500.0, 'value_usd': 2500.0}
+    assert valuation['assets']['XRP']['price_usd'] == pytest.approx(90.0 / JPY_PER_USD)
+    assert valuation['crypto_value'] == pytest.approx(2500.0 + 150 * 90.0 / JPY_PER_USD)
+    assert valuation['total_value'] == pytest.approx(valuation['fiat_value'] + valuation['crypto_value'])
+    assert valuation['unpriced'] == ['FOO']
+    assert set(valuation['assets']) == {'ETH', 'XRP'}
+
+
+def test_get_account_info_skips_ticker_call_for_fiat_only_account():
+    client = StubClient([balance_row('JPY', '3000.0'), balance_row('BTC', '0.0')])
+
+    valuation = get_account_info(binance=client)
+
+    assert client.ticker_calls == 0
+    assert valuation['total_value'] == pytest.approx(3000 / JPY_PER_USD)
+
+
+def test_value_portfolio_prefers_usdt_price_over_jpy():
+    balance = {'free': {'ETH': 2.0}, 'used': {}, 'total': {'ETH': 2.0, 'XRP': -1.0}}
+    prices = {t['symbol']: float(t['price']) for t in TICKERS}
+
+    valuation = value_portfolio(balance, prices)
+
+    assert valuation['assets']['ETH']['price_usd'] == 2500.0
+    assert valuation['crypto_value'] == 5000.0
+    assert valuation['unpriced'] == [] and 'XRP' not in valuation['assets']
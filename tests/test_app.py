@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import app
+import replay
+from event_logger import event_logger
+from test_replay import make_exchange
+
+SYMBOLS = ['ETH/JPY', 'XRP/JPY', 'SUI/JPY']
+
+
+def make_frame(rows=500, timeframe_minutes=30):
+    end = pd.Timestamp(int(time.time()), unit='s').floor(f'{timeframe_minutes}min')
+    index = pd.date_range(end=end, periods=rows, freq=f'{timeframe_minutes}min')
+    close = np.linspace(100.0, 110.0, rows)
+    return pd.DataFrame({'open': close, 'high': close + 1, 'low': close - 1, 'close': close, 'volume': 10.0}, index=index)
+
+
+def fake_signals(df, signal_mode='strict'):
+    close = df['close']
+    return df.assign(Signal=1, SMA_20=close - 1, SMA_50=close - 2, RSI=50.0, MACD=0.1,
+                     BB_high=close + 2, BB_low=close - 2, Stoch=50.0, Volatility=1.0)
+
+
+@pytest.fixture
+def optimize_calls(monkeypatch):
+    calls = []
+
+    def fake_optimize(df, symbol=None, timeframe=None, **kwargs):
+        calls.append((symbol, len(df)))
+        return 0.0, 0.0, None  # Không có bộ tham số nào - buộc đi hết thang điều chỉnh
+
+    monkeypatch.setattr(app, 'vectorbt_optimize', fake_optimize)
+    return calls
+
+
+def test_auto_adjust_ladder_fetches_once_and_optimizes_once_per_window(monkeypatch, optimize_calls):
+    fetches = Counter()
+    lock = threading.Lock()
+
+    def fake_get_crypto_data(symbol, timeframe='1h', limit=5000):
+        with lock:
+            fetches[(symbol, limit)] += 1
+        return make_frame()
+
+    monkeypatch.setattr(app, 'get_jpy_pairs', lambda: list(SYMBOLS))
+    monkeypatch.setattr(app, 'get_crypto_data', fake_get_crypto_data)
+    monkeypatch.setattr(app, 'calculate_trend_indicators', lambda df: df)
+    monkeypatch.setattr(app, 'apply_trend_signals', fake_signals)
+    monkeypatch.setattr(app, 'predict_price_lstm', lambda df, symbol=None: df['close'].iloc[-1] * 1.05)
+    monkeypatch.setattr(app.config, 'AUTO_ADJUST_ENABLED', True)
+
+    assert app.find_coins_with_auto_adjust_silent('30m') == []
+
+    # Cả thang (8 bước) chỉ tải dữ liệu 1 lần cho mỗi symbol
+    assert fetches == {(symbol, 500): 1 for symbol in SYMBOLS}
+    # Tối ưu 1 lần cho mỗi (symbol, limit): cửa sổ 500 nến (strict/flexible) và 200 nến (lstm_only/emergency)
+    calls = Counter(optimize_calls)
+    assert set(calls.values()) == {1}
+    assert Counter(symbol for symbol, _ in calls) == {symbol: 2 for symbol in SYMBOLS}
+
+
+def test_evaluate_best_coin_reuses_cached_optimization(monkeypatch):
+    calls = []
+
+    def fake_optimize(df, symbol=None, timeframe=None, **kwargs):
+        calls.append(symbol)
+        return 55.0, 1.5, {'rsi_buy': 60}
+
+    monkeypatch.setattr(app, 'vectorbt_optimize', fake_optimize)
+    analyzed_df = fake_signals(make_frame())
+    cache = {}
+
+    first = app.evaluate_best_coin_silent('ETH/JPY', analyzed_df, 40, 0.3, 'strict',
+                                          optimize_cache=cache, optimize_key=('ETH/JPY', 500), timeframe='30m')
+    second = app.evaluate_best_coin_silent('ETH/JPY', analyzed_df, 30, 0.2, 'flexible',
+                                           optimize_cache=cache, optimize_key=('ETH/JPY', 500), timeframe='30m')
+
+    assert calls == ['ETH/JPY']
+    assert cache == {('ETH/JPY', 500): (55.0, 1.5, {'rsi_buy': 60})}
+    assert first['win_rate'] == second['win_rate'] == 55.0
+    assert first['best_params'] == {'rsi_buy': 60}
+    # Kết quả tối ưu trong cache vẫn bị lọc theo ngưỡng win rate của từng bước
+    assert app.evaluate_best_coin_silent('ETH/JPY', analyzed_df, 60, 0.3, 'strict',
+                                         optimize_cache=cache, optimize_key=('ETH/JPY', 500)) is None
+    assert calls == ['ETH/JPY']
+
+
+def test_torn_only_journal_is_compacted_on_startup(monkeypatch, tmp_path):
+    orders_file = str(tmp_path / 'active_orders.json')
+    with open(orders_file + '.journal', 'w', encoding='utf-8') as f:
+        f.write('{"op":"put","id":"9","ord')
+    monkeypatch.setattr(app, 'ACTIVE_ORDERS_FILE', orders_file)
+    monkeypatch.setattr(app, 'ORDER_JOURNAL', None)
+    monkeypatch.setattr(app, 'ACTIVE_ORDERS', {})
+
+    app.load_active_orders_from_file()
+    assert app.ACTIVE_ORDERS == {}
+
+    # Bản ghi đầu tiên sau khi khởi động không bị nối vào dòng ghi dở
+    app.ACTIVE_ORDERS['1'] = {'symbol': 'ETH/JPY', 'order_type': 'TAKE_PROFIT', 'stop_loss_price': 0}
+    app.journal_order_change('1')
+    assert app.OrderJournal(orders_file).load() == app.ACTIVE_ORDERS
+
+
+@pytest.mark.parametrize('use_oco', [False, True])
+def test_simulated_buy_logs_buy_and_sell_placed_events(use_oco):
+    exchange = make_exchange([(99000, 101000)] * 3)
+    with replay.replay_environment(exchange):
+        app.TRADING_CONFIG['use_oco_orders'] = use_oco
+        logged_before = len(event_logger.recent(event='order'))
+
+        result = app.place_buy_order_with_sl_tp('ETH/JPY', 0.2, 100000, 95000, 105000)
+        events = event_logger.recent(event='order')[logged_before:]
+
+    assert result['status'] == 'success'
+    assert [e['action'] for e in events] == ['BUY', 'SELL_PLACED']
+    buy, sell_placed = events
+    assert buy['order_id'] == result['buy_order']['orderId']
+    assert buy['quantity'] == 0.2 and buy['symbol'] == 'ETH/JPY'
+    sell_order = result['sl_tp_orders'][0]
+    if use_oco:
+        # SL và TP là 2 chân của cùng 1 order list
+        assert sell_placed['sl_order_id'] == sell_placed['tp1_order_id'] == sell_order['orderListId']
+        assert sell_order['orderListId'] == replay.ORDER_LIST_ID_START
+    else:
+        # Chỉ có lệnh TP trên sàn, SL do SL engine theo dõi
+        assert sell_placed['sl_order_id'] == 'N/A'
+        assert sell_placed['tp1_order_id'] == sell_order['orderId']
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import backtester
+from backtester import build_parameter_grid, build_signal_matrices, optimize_parameters, simulate_trades
+
+FEE = 0.001
+
+NEUTRAL = {'SMA_20': 101.0, 'SMA_50': 100.0, 'MACD': 0.0, 'MACD_signal': 1.0, 'RSI': 50.0}
+BUY = {'SMA_20': 101.0, 'SMA_50': 100.0, 'MACD': 1.0, 'MACD_signal': 0.0, 'RSI': 50.0}
+SELL = {'SMA_20': 100.0, 'SMA_50': 101.0, 'MACD': 0.0, 'MACD_signal': 1.0, 'RSI': 70.0}
+
+
+def make_indicator_frame(rows):
+    """rows: danh sách (close, điều kiện) - các cột còn lại không chặn tín hiệu nào"""
+    records = [dict(state, close=close, BB_upper=200.0, BB_lower=0.0, Stoch_K=50.0, Volatility=1.0)
+               for close, state in rows]
+    return pd.DataFrame(records)
+
+
+# Nến 0: mua | 1: +1% chốt lời | 2: mua lại | 3: tín hiệu bán RSI | 4: -0.4% cắt lỗ
+HAND_ROWS = [(100.0, BUY), (101.0, NEUTRAL), (100.9, BUY), (100.9, SELL), (100.5, NEUTRAL)]
+
+
+def test_signal_matrices_follow_rsi_threshold_and_exit_rules():
+    grid = build_parameter_grid([45, 60], [40], [5], [0.003])
+    entries, exits = build_signal_matrices(make_indicator_frame(HAND_ROWS), grid, FEE)
+
+    # RSI 50 chỉ dưới ngưỡng mua 60, không dưới 45
+    assert entries.tolist() == [[False] * 5, [True, False, True, False, False]]
+    # Thoát: chốt lời (101 >= 100 * 1.005), tín hiệu bán (RSI 70 > 40), cắt lỗ (100.5 <= 100.9 * 0.997)
+    assert exits.tolist() == [[False, True, False, True, True]] * 2
+
+
+def test_signal_matrices_drop_entries_above_volatility_threshold():
+    frame = make_indicator_frame(HAND_ROWS).assign(Volatility=6.0)
+    entries, _ = build_signal_matrices(frame, build_parameter_grid([60], [40], [5, 7], [0.003]), FEE)
+
+    assert not entries[0].any()
+    assert entries[1].tolist() == [True, False, True, False, False]
+
+
+def test_simulate_trades_counts_wins_fees_and_open_position():
+    close = np.array([100.0, 110.0, 100.0, 90.0, 95.0, 100.0])
+    entries = np.array([
+        [True, False, True, False, True, False],   # thắng, thua, rồi giữ vị thế tới cuối
+        [False] * 6,                               # không có lệnh
+        [True, False, False, False, False, False]  # entry và exit cùng nến -> bỏ qua
+    ])
+    exits = np.array([
+        [False, True, False, True, False, False],
+        [False] * 6,
+        [True, False, False, False, False, False]
+    ])
+
+    stats = simulate_trades(close, entries, exits, FEE, init_cash=1000)
+
+    first_exit = 1000 / (100 * (1 + FEE)) * 110 * (1 - FEE)
+    second_exit = first_exit / (100 * (1 + FEE)) * 90 * (1 - FEE)
+    open_value = second_exit / (95 * (1 + FEE)) * 100
+    assert stats['win_rate'].tolist() == [50.0, 0.0, 0.0]
+    assert stats['trade_count'].tolist() == [3, 0, 0]
+    assert stats['total_profit'][0] == pytest.approx(open_value - 1000)
+    assert stats['total_profit'][1:].tolist() == [0.0, 0.0]
+
+
+def test_simulate_trades_deducts_fee_on_both_sides():
+    close = np.array([100.0, 100.0])
+    entries = np.array([[True, False]])
+    exits = np.array([[False, True]])
+
+    no_fee = simulate_trades(close, entries, exits, 0.0, init_cash=1000)
+    with_fee = simulate_trades(close, entries, exits, FEE, init_cash=1000)
+
+    assert no_fee['total_profit'][0] == pytest.approx(0.0)
+    assert with_fee['total_profit'][0] == pytest.approx(1000 * (1 - FEE) / (1 + FEE) - 1000)
+    # Giá không đổi nhưng mất phí -> lệnh thua
+    assert with_fee['win_rate'][0] == 0.0
+
+
+def test_optimize_parameters_picks_best_win_rate(monkeypatch):
+    frame = make_indicator_frame(HAND_ROWS + [(100.5, NEUTRAL)] * 45)
+    monkeypatch.setattr(backtester, 'get_indicator_frame', lambda df: frame)
+
+    win_rate, profit, params = optimize_parameters(frame, [45, 60], [40], [5], [0.003], fee=FEE, init_cash=1000)
+
+    after_tp = 1000 / (100 * (1 + FEE)) * 101 * (1 - FEE)
+    after_rsi_exit = after_tp / (100.9 * (1 + FEE)) * 100.9 * (1 - FEE)
+    assert win_rate == 50.0
+    assert profit == pytest.approx(after_rsi_exit - 1000)
+    assert params == {'rsi_buy': 60, 'rsi_sell': 40, 'volatility_threshold': 5, 'take_profit': 0.003}
+
+
+def test_optimize_parameters_falls_back_without_entries(monkeypatch):
+    frame = make_indicator_frame(HAND_ROWS + [(100.5, NEUTRAL)] * 45)
+    monkeypatch.setattr(backtester, 'get_indicator_frame', lambda df: frame)
+
+    # Không bộ tham số nào có tín hiệu mua (RSI 50 không dưới 45)
+    assert optimize_parameters(frame, [45], [40], [5], [0.003]) == (0, 0, None)
+    # Quá ít nến để tối ưu
+    monkeypatch.setattr(backtester, 'get_indicator_frame', lambda df: frame.head(10))
+    assert optimize_parameters(frame, [60], [40], [5], [0.003]) == (0, 0, None)
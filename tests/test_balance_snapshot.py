@@ -0,0 +1,34 @@
+from balance_snapshot import BalanceSnapshot
+
+
+class FakeClient:
+    def __init__(self, jpy='10000.0'):
+        self.calls = 0
+        self.jpy = jpy
+
+    def get_account(self):
+        self.calls += 1
+        return {'balances': [{'asset': 'JPY', 'free': self.jpy, 'locked': '0.0'},
+                             {'asset': 'ETH', 'free': '0.5', 'locked': '0.1'}]}
+
+
+def test_snapshot_is_shared_until_invalidated():
+    client = FakeClient()
+    snapshot = BalanceSnapshot(ttl=60)
+    for _ in range(8):
+        snapshot.get_free(client, 'JPY')
+    assert client.calls == 1 and snapshot.get_balances(client)['ETH']['locked'] == 0.1
+
+    snapshot.invalidate()
+    assert snapshot.get_free(client, 'ETH') == 0.5 and client.calls == 2
+    assert snapshot.stats == {'requests': 2, 'hits': 8, 'invalidations': 1}
+
+
+def test_snapshot_is_not_reused_across_clients():
+    live, simulated = FakeClient('10000.0'), FakeClient('250.0')
+    snapshot = BalanceSnapshot(ttl=60)
+
+    assert snapshot.get_free(live, 'JPY') == 10000.0
+    assert snapshot.get_free(simulated, 'JPY') == 250.0
+    assert snapshot.get_free(live, 'JPY') == 10000.0
+    assert live.calls == 2 and simulated.calls == 1
@@ -0,0 +1,24 @@
+from benchmarks.fixtures import FIXTURE_DIR, generate_synthetic_fixtures, load_market_data, read_manifest
+from benchmarks.run import compare_with_baseline
+
+
+def test_committed_fixtures_are_labelled_with_their_source():
+    market_data, source = load_market_data(FIXTURE_DIR)
+    assert source == read_manifest(FIXTURE_DIR)['source']
+    assert len(market_data.get_klines('ETHJPY', '30m')) >= 500
+
+
+def test_generated_fixtures_are_reproducible(tmp_path):
+    generate_synthetic_fixtures(str(tmp_path / 'a'), days=2)
+    generate_synthetic_fixtures(str(tmp_path / 'b'), days=2)
+    assert read_manifest(str(tmp_path / 'a'))['source'] == 'synthetic'
+    assert (tmp_path / 'a' / 'ETHJPY_15m.json').read_bytes() == (tmp_path / 'b' / 'ETHJPY_15m.json').read_bytes()
+
+
+def test_baseline_is_scaled_by_machine_speed():
+    baseline = {'analyze_trends': {'ops_per_sec': 100.0, 'peak_kb': 100.0}}
+    current = {'analyze_trends': {'ops_per_sec': 60.0, 'peak_kb': 100.0}}
+
+    assert compare_with_baseline(current, baseline)
+    # Máy hiện tại chậm bằng nửa máy tạo baseline: 60 ops/s vẫn trong tolerance của 50 ops/s
+    assert compare_with_baseline(current, baseline, speed_ratio=0.5) == []
@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from candle_store import INTERVAL_MS, CandleStore
+
+STEP = INTERVAL_MS['30m']
+START = 1735689600000
+
+
+def kline(index, close=100.0):
+    open_time = START + index * STEP
+    return [open_time, '100', '101', '99', str(close), '10', open_time + STEP - 1, '0', 0, '0', '0', '0']
+
+
+class FakeClient:
+    """Sàn giả: có nến 0..count-1, nến cuối là nến đang chạy (close đổi được)"""
+
+    def __init__(self, count):
+        self.count = count
+        self.forming_close = 100.0
+        self.requests = []
+
+    def get_klines(self, symbol, interval, startTime, limit):
+        self.requests.append(startTime)
+        first = max(0, -(-(startTime - START) // STEP))
+        last = min(self.count, first + limit)
+        return [kline(i, self.forming_close if i == self.count - 1 else 100.0) for i in range(first, last)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CandleStore(str(tmp_path), max_candles=6000)
+    store.saves = 0
+    original = store._save
+
+    def counting_save(*args):
+        store.saves += 1
+        original(*args)
+
+    store._save = counting_save
+    return store
+
+
+def test_first_call_backfills_window_with_paging(store, tmp_path):
+    client = FakeClient(2500)
+    klines = store.get_klines(client, 'ETHJPY', '30m', START)
+
+    assert len(klines) == 2500 and len(client.requests) == 3  # 1000 + 1000 + 500
+    assert store.saves == 1
+    with open(tmp_path / 'ETHJPY_30m.json', encoding='utf-8') as f:
+        assert len(json.load(f)) == 2500
+
+
+def test_incremental_sync_fetches_only_tail_and_saves_on_new_candle(store):
+    client = FakeClient(100)
+    store.get_klines(client, 'ETHJPY', '30m', START)
+    client.requests.clear()
+
+    # Không có nến mới: chỉ tải lại nến đang chạy, không ghi disk
+    store.get_klines(client, 'ETHJPY', '30m', START)
+    assert client.requests == [START + 99 * STEP] and store.saves == 1
+
+    # Mở thêm 2 nến: tải từ nến cuối đã có, ghi disk 1 lần
+    client.count = 102
+    klines = store.get_klines(client, 'ETHJPY', '30m', START)
+    assert client.requests[-1] == START + 99 * STEP
+    assert [k[0] for k in klines[-3:]] == [START + i * STEP for i in (99, 100, 101)]
+    assert store.saves == 2
+
+
+def test_forming_candle_is_replaced_not_duplicated(store):
+    client = FakeClient(50)
+    store.get_klines(client, 'ETHJPY', '30m', START)
+    client.forming_close = 123.0
+
+    klines = store.get_klines(client, 'ETHJPY', '30m', START)
+    assert len(klines) == 50 and klines[-1][4] == '123.0'
+    assert len({k[0] for k in klines}) == 50
+
+
+def test_history_is_trimmed_to_max_candles(tmp_path):
+    store = CandleStore(str(tmp_path), max_candles=300)
+    client = FakeClient(250)
+    store.get_klines(client, 'ETHJPY', '30m', START)
+
+    client.count = 400
+    klines = store.get_klines(client, 'ETHJPY', '30m', START)
+    assert len(klines) == 300 and klines[-1][0] == START + 399 * STEP
+    with open(tmp_path / 'ETHJPY_30m.json', encoding='utf-8') as f:
+        assert len(json.load(f)) == 300
@@ -0,0 +1,109 @@
+import threading
+import time
+
+import pytest
+
+requests = pytest.importorskip('requests')
+pytest.importorskip('binance')
+
+import client_registry
+from client_registry import ClientRegistry, LazyClient
+from rate_limiter import WeightRateLimiter
+
+
+class StubClient:
+    """Thay RateLimitedClient - không ping server khi khởi tạo"""
+    created = []
+
+    def __init__(self, api_key, api_secret, testnet=False, limiter=None):
+        self.credentials = (api_key, api_secret, testnet)
+        self.limiter = limiter
+        self.session = requests.Session()
+        StubClient.created.append(self)
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    StubClient.created = []
+    monkeypatch.setattr(client_registry, 'RateLimitedClient', StubClient)
+    monkeypatch.setattr(WeightRateLimiter, '_current_window', staticmethod(lambda: 0))
+    return ClientRegistry(pool_size=4, limiter=WeightRateLimiter(weight_limit=100, safety=1.0))
+
+
+def make_response(method, url, used_weight):
+    response = requests.Response()
+    response.status_code = 200
+    response.headers['X-MBX-USED-WEIGHT-1M'] = str(used_weight)
+    response.request = requests.Request(method, url, params={'timestamp': 1}).prepare()
+    return response
+
+
+def test_get_client_reuses_one_client_per_credential_set(registry):
+    first = registry.get_client('key', 'secret', testnet=True)
+
+    assert registry.get_client('key', 'secret', testnet=True) is first
+    assert registry.get_client('key', 'secret', testnet=False) is not first
+    assert registry.get_client('other', 'secret', testnet=True) is not first
+    assert len(StubClient.created) == 3
+    assert all(client.limiter is registry.limiter for client in StubClient.created)
+
+    adapter = first.session.get_adapter('https://testnet.binance.vision')
+    assert adapter._pool_maxsize == 4
+    assert first.session.headers['Connection'] == 'keep-alive'
+
+
+def test_session_hook_counts_requests_per_endpoint(registry):
+    session = registry.get_client('key', 'secret').session
+
+    for method, url, used in [('GET', 'https://api.binance.com/api/v3/account', 20),
+                              ('GET', 'https://api.binance.com/api/v3/account', 40),
+                              ('POST', 'https://api.binance.com/api/v3/order', 41)]:
+        requests.hooks.dispatch_hook('response', session.hooks, make_response(method, url, used))
+
+    # Đường dẫn không kèm query string; weight đồng bộ theo header của server
+    assert registry.get_request_counts() == {'GET /api/v3/account': 2, 'POST /api/v3/order': 1}
+    assert registry.limiter.get_status()['used_weight'] == 41
+
+    registry.reset_request_counts()
+    assert registry.get_request_counts() == {}
+
+
+def test_lazy_client_creates_client_once_on_first_use():
+    calls = []
+
+    class Target:
+        def ping(self):
+            return 'pong'
+
+    def factory():
+        calls.append(1)
+        time.sleep(0.05)
+        return Target()
+
+    lazy = LazyClient(factory)
+    assert calls == []
+
+    threads = [threading.Thread(target=lazy.ping) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert lazy.ping() == 'pong'
+
+
+def test_lazy_client_retries_after_failed_creation():
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError('offline')
+        return 'client'
+
+    lazy = LazyClient(factory)
+    with pytest.raises(ConnectionError):
+        lazy.resolve()
+    assert lazy.resolve() == 'client'
+    assert len(attempts) == 2
@@ -0,0 +1,34 @@
+import glob
+import json
+import os
+
+import trading_config
+from event_logger import EventLogger
+
+
+def test_writes_every_record_and_rotates_by_size(tmp_path, monkeypatch):
+    log_path = str(tmp_path / 'trading_log.txt')
+    for key, value in {'log_file': log_path, 'max_log_size_mb': 0.05, 'log_trades': True}.items():
+        monkeypatch.setitem(trading_config.TRADING_CONFIG, key, value)
+
+    logger = EventLogger(buffer_size=100, flush_interval=0.05)
+    for i in range(2000):
+        logger.log('order', action='BUY', symbol='ADA/JPY', quantity=1.5, price=110 + i, order_id=i)
+    logger.log('cycle', cycle=1, duration_ms=123.4)
+    assert logger.flush(10)
+
+    files = glob.glob(log_path + '*')  # File hiện tại + các backup
+    records = [json.loads(line) for path in files for line in open(path, encoding='utf-8')]
+    assert len(records) == 2001 and logger.stats['rotations'] >= 1
+    assert all(os.path.getsize(path) <= 0.05 * 1024 * 1024 for path in files)
+
+
+def test_recent_keeps_last_buffer_size_events(tmp_path, monkeypatch):
+    monkeypatch.setitem(trading_config.TRADING_CONFIG, 'log_file', str(tmp_path / 'trading_log.txt'))
+    logger = EventLogger(buffer_size=100, flush_interval=0.05)
+    for i in range(150):
+        logger.log('order', action='BUY', symbol='ADA/JPY', order_id=i)
+    logger.log('cycle', cycle=1, duration_ms=123.4)
+    assert logger.flush(10)
+
+    assert logger.recent(1, 'cycle')[0]['duration_ms'] == 123.4 and len(logger.recent()) == 100
@@ -0,0 +1,65 @@
+import threading
+import time
+
+from exchange_metadata import ExchangeMetadataCache
+
+
+class FakeClient:
+    def __init__(self, delay=0):
+        self.calls = 0
+        self.delay = delay
+
+    def get_exchange_info(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return {'symbols': [{
+            'symbol': 'ETHJPY', 'status': 'TRADING', 'baseAsset': 'ETH', 'quoteAsset': 'JPY', 'ocoAllowed': True,
+            'filters': [
+                {'filterType': 'PRICE_FILTER', 'minPrice': '1', 'maxPrice': '100000000', 'tickSize': '1'},
+                {'filterType': 'LOT_SIZE', 'minQty': '0.0001', 'maxQty': '9000', 'stepSize': '0.0001'},
+                {'filterType': 'NOTIONAL', 'minNotional': '1000'}
+            ]
+        }, {'symbol': 'OLDJPY', 'status': 'BREAK', 'filters': []}]}
+
+
+def test_parses_filters_and_rounds_to_steps():
+    client = FakeClient()
+    cache = ExchangeMetadataCache(ttl=60)
+
+    info = cache.get(client, 'ETH/JPY')
+    assert info['step_size'] == 0.0001 and info['min_notional'] == 1000 and info['oco_allowed']
+    assert cache.round_quantity(client, 'ETH/JPY', 0.123456789) == 0.1234
+    assert cache.round_price(client, 'ETHJPY', 400123.7) == 400123
+    assert cache.trading_symbols(client) == {'ETHJPY'} and cache.get(client, 'XRP/JPY') is None
+
+
+def test_exchange_info_is_loaded_once_within_ttl():
+    client = FakeClient()
+    cache = ExchangeMetadataCache(ttl=60)
+    for _ in range(1000):
+        cache.get(client, 'ETH/JPY')
+    assert client.calls == 1
+
+    cache.invalidate()
+    cache.get(client, 'ETH/JPY')
+    assert client.calls == 2
+
+
+def test_only_one_thread_refreshes_when_ttl_expires():
+    client = FakeClient(delay=0.1)
+    cache = ExchangeMetadataCache(ttl=60)
+    start = threading.Barrier(8)
+    results = []
+
+    def worker():
+        start.wait()
+        results.append(cache.get(client, 'ETH/JPY'))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert client.calls == 1
+    assert len(results) == 8 and all(info['symbol'] == 'ETHJPY' for info in results)
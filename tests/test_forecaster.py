@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+import forecaster
+from forecaster import ReturnForecaster, forecast_next_close
+
+
+@pytest.fixture
+def series():
+    """AR(1) trên log return để model có tín hiệu thật"""
+    rng = np.random.default_rng(7)
+    count = 400
+    returns = np.zeros(count)
+    for i in range(1, count):
+        returns[i] = 0.3 * returns[i - 1] + rng.normal(0, 0.002)
+    closes = 100 * np.exp(np.cumsum(returns))
+    times = 1735689600000 + np.arange(count, dtype=np.int64) * 1800000
+    return times, closes
+
+
+def test_incremental_updates_match_full_fit(series):
+    times, closes = series
+    incremental = ReturnForecaster(order=5, window=120)
+    incremental.fit(times[:200], closes[:200])
+    for end in range(201, 320):
+        assert incremental.update(times[:end], closes[:end]) in ('incremental', 'fit')
+
+    full = ReturnForecaster(order=5, window=120)
+    full.fit(times[:319], closes[:319])
+    assert np.allclose(incremental.coef, full.coef) and abs(incremental.predict() - full.predict()) < 1e-9
+    assert abs(incremental.coef[1] - 0.3) < 0.2
+
+
+def test_forming_candle_is_replaced_then_cached(series):
+    times, closes = series
+    model = ReturnForecaster(order=5, window=120)
+    model.fit(times[:319], closes[:319])
+    assert model.update(times[:320], closes[:320]) == 'incremental'
+
+    # Nến cuối chưa đóng: cùng open time, close khác
+    forming = closes[:320].copy()
+    forming[-1] *= 1.001
+    assert model.update(times[:320], forming) == 'incremental'
+    full = ReturnForecaster(order=5, window=120)
+    full.fit(times[:320], forming)
+    assert np.allclose(model.coef, full.coef)
+    assert model.update(times[:320], forming) == 'cached'
+
+
+def test_refits_on_gaps_and_needs_enough_rows(series):
+    times, closes = series
+    model = ReturnForecaster(order=5, window=120)
+    model.fit(times[:320], closes[:320])
+    # Khung nến khác / dữ liệu không liền mạch -> fit lại
+    assert model.update(times[::2], closes[::2]) == 'fit'
+    assert ReturnForecaster(order=5).fit(times[:10], closes[:10]) == 'fit'
+    assert ReturnForecaster(order=5).predict() is None
+
+
+def test_forecast_next_close_reuses_model_per_symbol(series, monkeypatch):
+    times, closes = series
+    monkeypatch.setattr(forecaster, 'predictor_cache', forecaster.ModelCache(8))
+    for end in range(320, 330):
+        prediction = forecast_next_close('TEST/JPY', times[:end], closes[:end], order=10)
+        assert prediction is not None and abs(prediction / closes[end - 1] - 1) < 0.05
+    assert forecaster.predictor_cache.stats() == {'entries': 1, 'hits': 9, 'misses': 1}
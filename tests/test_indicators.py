@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import indicators
+
+
+def make_candles(length, seed=42):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, length)))
+    spread = np.abs(rng.normal(0, 0.005, length)) * close
+    return pd.DataFrame({
+        'open': close * (1 + rng.normal(0, 0.002, length)),
+        'high': close + spread,
+        'low': close - spread,
+        'close': close,
+        'volume': rng.uniform(1, 1000, length)
+    }, index=pd.date_range('2024-01-01', periods=length, freq='30min'))
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    indicators._indicator_cache.clear()
+    yield
+    indicators._indicator_cache.clear()
+
+
+@pytest.mark.parametrize('length', [30, 60, 200, 500, 5000])
+def test_kernel_matches_ta(length):
+    pytest.importorskip('ta')
+    report = indicators.check_parity_with_ta(make_candles(length, seed=length))
+    failed = {col: report[col] for col in indicators.INDICATOR_COLUMNS if not report[col]['passed']}
+    assert not failed
+    assert set(indicators.INDICATOR_COLUMNS) <= set(report)
+
+
+def test_cache_reuses_frame_for_copies():
+    df = make_candles(200)
+    frame = indicators.get_indicator_frame(df)
+    assert indicators.get_indicator_frame(df.copy()) is frame
+
+
+@pytest.mark.parametrize('column', ['open', 'high', 'low', 'close', 'volume'])
+def test_cache_key_changes_with_any_ohlcv_column(column):
+    df = make_candles(200)
+    frame = indicators.get_indicator_frame(df)
+
+    changed = df.copy()
+    changed.iloc[100, changed.columns.get_loc(column)] *= 1.01
+    changed_frame = indicators.get_indicator_frame(changed)
+
+    assert changed_frame is not frame
+    pd.testing.assert_frame_equal(changed_frame, indicators.compute_indicators(changed))
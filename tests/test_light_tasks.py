@@ -0,0 +1,77 @@
+from light_tasks import ID_TYPE_ORDER, ID_TYPE_ORDER_LIST, fetch_order_statuses, format_order_status, order_id_type
+from test_replay import START, STEP, make_exchange, place_oco
+
+
+def track(order_id, id_type, order_type='OCO (SL/TP)'):
+    return {str(order_id): {'symbol': 'ETH/JPY', 'order_type': order_type, 'id_type': id_type}}
+
+
+def test_open_oco_is_reported_under_its_list_id():
+    exchange = make_exchange([(99, 101)] * 3)
+    list_id = str(place_oco(exchange)['orderListId'])
+
+    status = fetch_order_statuses(exchange, track(list_id, ID_TYPE_ORDER_LIST))[list_id]
+
+    assert status['id'] == list_id and status['status'] == 'open'
+    assert status['type'] == 'limit_maker' and status['filled'] == 0
+
+
+def test_filled_oco_resolves_executed_leg_through_order_list():
+    exchange = make_exchange([(99, 101), (99, 101), (100, 112)])
+    oco = place_oco(exchange)
+    list_id = str(oco['orderListId'])
+    exchange.advance_to(START + 3 * STEP)
+
+    status = fetch_order_statuses(exchange, track(list_id, ID_TYPE_ORDER_LIST))[list_id]
+
+    assert status['id'] == list_id and status['status'] == 'closed'
+    assert status['type'] == 'limit_maker' and status['filled'] == 1.0 and status['average'] == 110
+    assert status['leg_id'] == str(oco['orders'][1]['orderId'])
+
+
+def test_canceled_oco_without_fill_is_canceled():
+    exchange = make_exchange([(99, 101)] * 3)
+    oco = place_oco(exchange)
+    list_id = str(oco['orderListId'])
+    exchange.cancel_order(symbol='ETHJPY', orderId=oco['orders'][0]['orderId'])
+
+    # File lệnh cũ chưa có 'id_type' - nhận ra lệnh OCO theo order_type
+    tracked = {list_id: {'symbol': 'ETH/JPY', 'order_type': 'OCO (SL/TP)'}}
+    assert order_id_type(tracked[list_id]) == ID_TYPE_ORDER_LIST
+    assert fetch_order_statuses(exchange, tracked)[list_id]['status'] == 'canceled'
+
+
+def test_plain_order_is_not_matched_by_list_id():
+    exchange = make_exchange([(99, 101), (99, 101), (100, 112)])
+    order = exchange.order_limit_sell(symbol='ETHJPY', quantity=0.5, price=111)
+    order_id = str(order['orderId'])
+    tracked = track(order_id, ID_TYPE_ORDER, order_type='TAKE_PROFIT')
+
+    assert fetch_order_statuses(exchange, tracked)[order_id]['status'] == 'open'
+    exchange.advance_to(START + 3 * STEP)
+    status = fetch_order_statuses(exchange, tracked)[order_id]
+    assert status['id'] == order_id and status['status'] == 'closed' and status['filled'] == 0.5
+
+
+def binance_order(**overrides):
+    order = {'orderId': 42, 'status': 'FILLED', 'type': 'MARKET', 'side': 'SELL', 'origQty': '2.00000000',
+             'executedQty': '2.00000000', 'price': '0.00000000', 'cummulativeQuoteQty': '221.00000000',
+             'time': 1735689600000}
+    order.update(overrides)
+    return order
+
+
+def test_average_is_quote_over_executed_quantity():
+    # Lệnh market: price = 0, giá trung bình lấy từ cummulativeQuoteQty / executedQty
+    status = format_order_status(binance_order(), 'ADA/JPY')
+    assert status['status'] == 'closed' and status['price'] is None and status['average'] == 110.5
+
+    # Lệnh limit khớp 1 phần ở giá tốt hơn giá đặt
+    status = format_order_status(binance_order(type='LIMIT', status='PARTIALLY_FILLED', price='110.00000000',
+                                               executedQty='1.00000000', cummulativeQuoteQty='111.00000000'), 'ADA/JPY')
+    assert status['status'] == 'open' and status['price'] == 110 and status['average'] == 111
+    assert status['remaining'] == 1.0
+
+    status = format_order_status(binance_order(status='NEW', executedQty='0.00000000',
+                                               cummulativeQuoteQty='0.00000000'), 'ADA/JPY')
+    assert status['average'] is None and status['datetime'] == '2025-01-01 00:00:00'
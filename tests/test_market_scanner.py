@@ -0,0 +1,45 @@
+import threading
+import time
+
+from market_scanner import MarketScanner
+
+SYMBOLS = ['ETH/JPY', 'XRP/JPY', 'SUI/JPY', 'SOL/JPY', 'XLM/JPY']
+
+
+def slow_fetcher(delay):
+    def fetch(symbol):
+        time.sleep(delay)
+        return symbol
+    return fetch
+
+
+def test_fetch_all_runs_every_request_in_one_round_trip():
+    # Mỗi request chờ ở barrier cho tới khi đủ 10 request cùng chạy (2 đợt thì barrier hết hạn)
+    barrier = threading.Barrier(10, timeout=5)
+    lock = threading.Lock()
+    in_flight = {'now': 0, 'peak': 0}
+
+    def fetch(symbol):
+        with lock:
+            in_flight['now'] += 1
+            in_flight['peak'] = max(in_flight['peak'], in_flight['now'])
+        try:
+            barrier.wait()
+            return symbol
+        finally:
+            with lock:
+                in_flight['now'] -= 1
+
+    results = MarketScanner().fetch_all(SYMBOLS, {'df': fetch, 'order_book': fetch})
+
+    assert in_flight['peak'] == 10
+    assert all(result == {'df': symbol, 'order_book': symbol} for symbol, result in results.items())
+
+
+def test_fetch_all_caps_workers_and_reports_errors_as_none():
+    def broken(symbol):
+        raise RuntimeError('boom')
+
+    scanner = MarketScanner(max_workers=2)
+    results = scanner.fetch_all(SYMBOLS[:2], {'df': slow_fetcher(0), 'order_book': broken})
+    assert results['XRP/JPY'] == {'df': 'XRP/JPY', 'order_book': None}
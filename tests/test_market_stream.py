@@ -0,0 +1,36 @@
+from candle_store import INTERVAL_MS
+from market_stream import MarketStream
+
+
+def make_stream(bid_levels=20, ask_levels=20):
+    stream = MarketStream()
+    stream.start(['ETHJPY'], ['15m'])
+    feed = stream.feed
+    feed.push_book_ticker('ETHJPY', 400000, 400040, 1.5, 2.0)
+    feed.push_depth('ETHJPY',
+                    [[str(400000 - i), '1.0'] for i in range(bid_levels)],
+                    [[str(400040 + i), '1.0'] for i in range(ask_levels)])
+    return stream
+
+
+def test_cache_serves_price_depth_and_klines():
+    stream = make_stream()
+    open_time = 1700000100000 - 1700000100000 % INTERVAL_MS['15m']
+    for i in range(3):
+        t = open_time + i * INTERVAL_MS['15m']
+        stream.feed.push_kline('ETHJPY', '15m', [t, '400000', '400100', '399900', str(400000 + i), '12.5',
+                                                 t + INTERVAL_MS['15m'] - 1])
+
+    assert stream.get_price('ETHJPY') == 400020
+    assert len(stream.get_order_book('ETHJPY', 20)['bids']) == 20
+    assert stream.get_order_book('ETHJPY', 50) is None
+    assert [k[4] for k in stream.get_recent_klines('ETHJPY', '15m')] == ['400000', '400001', '400002']
+    assert stream.get_price('XRPJPY') is None
+
+
+def test_order_book_requires_enough_levels_on_both_sides():
+    # Thiếu mức giá ở 1 phía thì trả về None để gọi REST thay vì dùng sổ lệnh bị cụt
+    assert make_stream(bid_levels=20, ask_levels=5).get_order_book('ETHJPY', 20) is None
+    assert make_stream(bid_levels=5, ask_levels=20).get_order_book('ETHJPY', 20) is None
+    book = make_stream(bid_levels=25, ask_levels=20).get_order_book('ETHJPY', 20)
+    assert len(book['bids']) == 20 and len(book['asks']) == 20
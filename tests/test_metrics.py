@@ -0,0 +1,59 @@
+import json
+import os
+import time
+import urllib.request
+from collections import Counter
+
+import pytest
+
+import trading_config
+from event_logger import event_logger
+from metrics import CycleMetrics, percentile
+
+
+@pytest.fixture
+def metrics(tmp_path, monkeypatch):
+    monkeypatch.setitem(trading_config.TRADING_CONFIG, 'log_file', str(tmp_path / 'trading_log.txt'))
+    calls = Counter()
+    metrics = CycleMetrics(window=100, metrics_file=str(tmp_path / 'metrics.json'), request_counter=lambda: dict(calls))
+
+    @metrics.timed('get_crypto_data')
+    def fetch(symbol):
+        calls['GET /api/v3/klines'] += 1
+        time.sleep(0.002)
+
+    for _ in range(3):
+        with metrics.cycle('test'):
+            for symbol in ('ADA', 'ETH', 'XRP'):
+                fetch(symbol)
+            with metrics.stage('analyze_trends'):
+                time.sleep(0.001)
+
+    metrics.profile_next_cycle(str(tmp_path))
+    with metrics.cycle('profiled'):
+        fetch('BTC')
+    yield metrics
+    event_logger.flush()  # Ghi xong log chu kỳ vào tmp_path trước khi trả lại log_file
+
+
+def test_stages_requests_and_profile_are_recorded(metrics):
+    assert os.path.exists(metrics.last_cycle['profile'])
+    snapshot = metrics.snapshot()
+    assert snapshot['stages']['get_crypto_data']['count'] == 10 and snapshot['cycles'] == 4
+    assert snapshot['stages']['analyze_trends']['count'] == 3
+    assert metrics.last_cycle['rest_calls'] == {'GET /api/v3/klines': 1}
+    with open(metrics.metrics_file, encoding='utf-8') as f:
+        assert json.load(f)['cycles'] == 4
+
+
+def test_http_endpoint_serves_snapshot(metrics):
+    server = metrics.serve(0)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as response:
+            assert json.load(response)['stages']['cycle']['count'] == 4
+    finally:
+        server.shutdown()
+
+
+def test_percentile():
+    assert percentile(list(range(1, 101)), 95) == 95 and percentile([5], 99) == 5
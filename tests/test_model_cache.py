@@ -0,0 +1,41 @@
+from model_cache import ModelCache, grid_hash
+
+PARAMS = grid_hash([60, 70], [30, 40], {'fee': 0.001})
+
+
+def test_grid_hash_is_stable_and_sensitive():
+    assert PARAMS == grid_hash([60, 70], [30, 40], {'fee': 0.001})
+    assert PARAMS != grid_hash([60, 70], [30, 45], {'fee': 0.001})
+    assert grid_hash({'a': 1, 'b': 2}) == grid_hash({'b': 2, 'a': 1})
+
+
+def test_get_or_compute_calls_compute_once():
+    cache = ModelCache(max_entries=3)
+    calls = []
+
+    def optimize():
+        calls.append(1)
+        return [55.0, 120.5, {'rsi_buy': 65}]
+
+    key = ModelCache.make_key('optimize', 'ETH/JPY', '30m', 1735689600000, PARAMS)
+    assert cache.get_or_compute(key, optimize) == cache.get_or_compute(key, optimize)
+    assert len(calls) == 1 and cache.stats() == {'entries': 1, 'hits': 1, 'misses': 1}
+
+
+def test_lru_eviction_and_persistence(tmp_path):
+    path = str(tmp_path / 'model_cache.json')
+    cache = ModelCache(max_entries=3, persist_path=path)
+    key = ModelCache.make_key('optimize', 'ETH/JPY', '30m', 1735689600000, PARAMS)
+    cache.put(key, [55.0, 120.5, {'rsi_buy': 65}], persist=True)
+
+    # Model (object) chỉ giữ trong bộ nhớ, LRU bỏ mục dùng lâu nhất
+    cache.put(('predictor', 'ETH/JPY', '30m', 0, 'x'), object())
+    cache.put(('optimize', 'XRP/JPY', '30m', 1, PARAMS), [1, 2, None], persist=True)
+    cache.get(key)
+    cache.put(('optimize', 'SOL/JPY', '30m', 1, PARAMS), [3, 4, None], persist=True)
+    assert cache.get(('predictor', 'ETH/JPY', '30m', 0, 'x')) is None and cache.get(key) is not None
+    cache.save()
+
+    reloaded = ModelCache(max_entries=3, persist_path=path)
+    assert reloaded.get(key) == [55.0, 120.5, {'rsi_buy': 65}]
+    assert reloaded.stats()['entries'] == 3
@@ -0,0 +1,140 @@
+import email
+import email.policy
+import smtplib
+import socketserver
+import threading
+
+import pytest
+
+import trading_config
+from notification_dispatcher import NotificationDispatcher
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """SMTP tối thiểu (HELO/EHLO, MAIL, RCPT, DATA, RSET, NOOP, QUIT) - lưu email nhận được vào server.messages"""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode('ascii'))
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply('220 localhost ESMTP test')
+        envelope = {}
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('ascii', 'replace').strip()
+            verb = command[:4].upper()
+            if verb in ('HELO', 'EHLO'):
+                self.reply('250 localhost')
+            elif verb == 'MAIL':
+                envelope = {'from': command.split(':', 1)[1].strip(' <>')}
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                envelope.setdefault('to', []).append(command.split(':', 1)[1].strip(' <>'))
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data = []
+                for data_line in iter(self.rfile.readline, b''):
+                    if data_line == b'.\r\n':
+                        break
+                    data.append(data_line[1:] if data_line.startswith(b'..') else data_line)
+                envelope['message'] = email.message_from_bytes(b''.join(data), policy=email.policy.default)
+                self.server.messages.append(envelope)
+                envelope = {}
+                self.reply('250 OK')
+            elif verb in ('RSET', 'NOOP'):
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.server.quits += 1
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    monkeypatch.setitem(trading_config.NOTIFICATION_CONFIG, 'email_sender', 'bot@localhost')
+    monkeypatch.setitem(trading_config.NOTIFICATION_CONFIG, 'email_recipient', 'trader@localhost')
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), SMTPHandler)
+    server.daemon_threads = True
+    server.messages, server.connections, server.quits = [], 0, 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_dispatcher(server, **kwargs):
+    host, port = server.server_address
+    return NotificationDispatcher(smtp_factory=lambda: smtplib.SMTP(host, port, timeout=5),
+                                  retry_delay=0.01, **kwargs)
+
+
+def test_urgent_email_arrives_at_smtp_server(smtp_server):
+    dispatcher = make_dispatcher(smtp_server, digest_window=0.2)
+
+    assert dispatcher.submit("🚨 Lỗi hệ thống", "Chi tiết lỗi", urgent=True)
+    assert dispatcher.shutdown(5)
+
+    assert len(smtp_server.messages) == 1
+    received = smtp_server.messages[0]
+    assert received['from'] == 'bot@localhost' and received['to'] == ['trader@localhost']
+    assert received['message']['Subject'] == "🚨 Lỗi hệ thống"
+    assert "Chi tiết lỗi" in received['message'].get_body().get_content()
+
+
+def test_shutdown_drains_queue_as_one_digest_over_one_session(smtp_server):
+    dispatcher = make_dispatcher(smtp_server, digest_window=0.5)
+    for i in range(5):
+        dispatcher.submit(f"Thông báo {i}", f"Nội dung {i}")
+
+    assert dispatcher.shutdown(5)
+    assert dispatcher.queue.unfinished_tasks == 0
+
+    assert len(smtp_server.messages) == 1 and dispatcher.stats['digests'] == 1
+    body = smtp_server.messages[0]['message'].get_body().get_content()
+    assert all(f"Thông báo {i}" in body for i in range(5))
+    # Phiên SMTP được đóng (QUIT) khi shutdown, submit sau đó kết nối lại
+    assert smtp_server.connections == 1 and smtp_server.quits == 1 and dispatcher.smtp is None
+    dispatcher.submit("Sau khi dừng", "...", urgent=True)
+    assert dispatcher.shutdown(5) and len(smtp_server.messages) == 2 and smtp_server.connections == 2
+
+
+class FlakySMTP:
+    """Phiên SMTP giả: làm lỗi fail_next lần gửi đầu tiên như khi server đóng kết nối"""
+    connections = 0
+    sent = []
+    fail_next = 0
+
+    def __init__(self):
+        FlakySMTP.connections += 1
+
+    def sendmail(self, sender, recipient, text):
+        if FlakySMTP.fail_next:
+            FlakySMTP.fail_next -= 1
+            raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+        FlakySMTP.sent.append(text)
+
+    def quit(self):
+        pass
+
+
+def test_reconnects_after_disconnect_and_gives_up_after_max_retries(monkeypatch):
+    monkeypatch.setattr(FlakySMTP, 'connections', 0)
+    monkeypatch.setattr(FlakySMTP, 'sent', [])
+    dispatcher = NotificationDispatcher(smtp_factory=FlakySMTP, digest_window=0.1, retry_delay=0.01)
+
+    # Phiên bị đóng giữa chừng: kết nối lại và gửi lại
+    FlakySMTP.fail_next = 1
+    dispatcher.submit("Sau khi mất kết nối", "...", urgent=True)
+    assert dispatcher.flush(5) and dispatcher.stats['retries'] == 1 and FlakySMTP.connections == 2
+    assert len(FlakySMTP.sent) == 1
+
+    # Lỗi liên tục: bỏ cuộc sau max_retries, không treo thread
+    FlakySMTP.fail_next = 10
+    dispatcher.submit("Server hỏng", "...", urgent=True)
+    assert dispatcher.flush(5) and dispatcher.stats['failed'] == 1
@@ -0,0 +1,68 @@
+import os
+
+from order_journal import OrderJournal
+
+
+def make_journal(tmp_path, count=200):
+    path = str(tmp_path / 'active_orders.json')
+    journal = OrderJournal(path, compact_every=1000, fsync=False)
+    orders = {}
+    for i in range(count):
+        orders[str(i)] = {'symbol': 'ETH/JPY', 'order_type': 'TAKE_PROFIT', 'last_filled': 0}
+        journal.put(i, orders[str(i)])
+    return path, journal, orders
+
+
+def test_replays_puts_updates_and_removals(tmp_path):
+    path, journal, orders = make_journal(tmp_path)
+    orders['5']['last_filled'] = 0.5
+    journal.put(5, orders['5'])
+    del orders['7']
+    journal.remove(7)
+
+    assert OrderJournal(path).load() == orders
+
+
+def test_ignores_torn_last_line(tmp_path):
+    path, journal, orders = make_journal(tmp_path)
+    # Giả lập bị kill khi đang ghi dở 1 dòng
+    with open(journal.journal_path, 'a', encoding='utf-8') as f:
+        f.write('{"op":"put","id":"9","ord')
+
+    assert OrderJournal(path).load() == orders
+
+
+def test_torn_only_journal_is_repaired_before_next_put(tmp_path):
+    path = str(tmp_path / 'active_orders.json')
+    with open(path + '.journal', 'w', encoding='utf-8') as f:
+        f.write('{"op":"put","id":"9","ord')
+
+    journal = OrderJournal(path, fsync=False)
+    orders = journal.load()
+    assert orders == {} and journal.records == 0 and journal.needs_repair()
+
+    journal.compact(orders)
+    order = {'symbol': 'ETH/JPY', 'order_type': 'TAKE_PROFIT', 'last_filled': 0}
+    journal.put(1, order)
+
+    assert OrderJournal(path).load() == {'1': order}
+
+
+def test_line_without_newline_marks_journal_torn(tmp_path):
+    path = str(tmp_path / 'active_orders.json')
+    with open(path + '.journal', 'w', encoding='utf-8') as f:
+        f.write('{"op":"remove","id":"9"}')
+
+    journal = OrderJournal(path, fsync=False)
+    journal.load()
+    assert journal.torn
+    journal.compact({})
+    assert not journal.torn and not journal.needs_repair()
+
+
+def test_compact_writes_snapshot_and_drops_journal(tmp_path):
+    path, journal, orders = make_journal(tmp_path)
+    journal.compact(orders)
+
+    assert not os.path.exists(journal.journal_path)
+    assert OrderJournal(path).load() == orders
@@ -0,0 +1,115 @@
+import pytest
+
+import position_manager
+from balance_snapshot import BalanceSnapshot
+from position_manager import PositionManager
+from position_storage import JsonPositionStorage
+
+
+class FakeExchange:
+    def __init__(self, open_orders, orders, balances, prices):
+        self.open_orders = open_orders
+        self.orders = orders  # order_id -> kết quả get_order (thiếu = lệnh không tồn tại)
+        self.balances = balances
+        self.prices = prices
+        self.calls = {'get_open_orders': 0, 'get_account': 0}
+        self.order_lookups = []
+
+    def get_open_orders(self):
+        self.calls['get_open_orders'] += 1
+        return self.open_orders
+
+    def get_order(self, symbol, orderId):
+        self.order_lookups.append(orderId)
+        if orderId not in self.orders:
+            raise Exception('APIError(code=-2013): Order does not exist.')
+        return self.orders[orderId]
+
+    def get_account(self):
+        self.calls['get_account'] += 1
+        return {'balances': [{'asset': asset, 'free': str(free), 'locked': '0'} for asset, free in self.balances.items()]}
+
+    def get_symbol_ticker(self, symbol):
+        return {'symbol': symbol, 'price': str(self.prices[symbol])}
+
+
+@pytest.fixture
+def manager(monkeypatch, tmp_path):
+    monkeypatch.setattr(position_manager, 'balance_snapshot', BalanceSnapshot(ttl=60))
+    manager = PositionManager(storage=JsonPositionStorage(str(tmp_path / 'position_data.json')))
+    manager.add_buy_order('ADA/JPY', 100, 110.0, 'b1')
+    manager.add_buy_order('ADA/JPY', 50, 115.0, 'b2')
+    manager.add_buy_order('XRP/JPY', 1000, 90.0, 'b3')
+    manager.add_buy_order('ETH/JPY', 1, 400000.0, 'b4')
+    manager.add_sell_order_tracking('ADA/JPY', 1, 'TAKE_PROFIT', 50, 120.0)   # còn mở
+    manager.add_sell_order_tracking('ADA/JPY', 2, 'TAKE_PROFIT', 50, 125.0)   # đã khớp
+    manager.add_sell_order_tracking('XRP/JPY', 3, 'TAKE_PROFIT', 600, 95.0)   # biến mất, số dư giảm
+    manager.add_sell_order_tracking('ETH/JPY', 4, 'STOP_LOSS', 1, 390000.0)   # biến mất, số dư không đổi
+    manager.add_sell_order_tracking('ETH/JPY', 5, 'OCO', 1, 410000.0)         # OCO còn mở (theo orderListId)
+    return manager
+
+
+def make_exchange():
+    return FakeExchange(
+        open_orders=[{'orderId': 1, 'orderListId': -1}, {'orderId': 77, 'orderListId': 5}],
+        orders={'2': {'status': 'FILLED', 'executedQty': '50', 'cummulativeQuoteQty': '6000', 'price': '125'}},
+        balances={'XRP': 400.0, 'ETH': 1.0},
+        prices={'XRPJPY': 92.0}
+    )
+
+
+def sell_order(manager, coin, order_id):
+    return next(o for o in manager.positions[coin]['active_sell_orders'] if o['order_id'] == order_id)
+
+
+def test_sync_checks_only_orders_missing_from_one_open_orders_call(manager):
+    exchange = make_exchange()
+
+    result = manager.check_and_sync_with_exchange(exchange)
+
+    assert exchange.calls['get_open_orders'] == 1
+    assert exchange.order_lookups == ['2', '3', '4']
+    # 2 lệnh biến mất chỉ dùng 1 snapshot số dư
+    assert exchange.calls['get_account'] == 1
+    assert result['updated_positions'] == ['ADA', 'XRP']
+    assert [i['action'] for i in result['manual_interventions']] == ['SELL', 'CANCEL']
+
+
+def test_sync_applies_fills_and_drops_finished_orders_from_index(manager):
+    manager.check_and_sync_with_exchange(make_exchange())
+
+    # Khớp 50 ADA @ 120 (cummulativeQuoteQty / executedQty) - FIFO trừ vào lô b1
+    assert manager.positions['ADA']['total_quantity'] == 100
+    assert sell_order(manager, 'ADA', '2')['status'] == 'FILLED'
+    assert sell_order(manager, 'ADA', '2')['filled_price'] == 120.0
+    assert manager.positions['XRP']['total_quantity'] == 400
+    assert sell_order(manager, 'XRP', '3')['status'] == 'MANUAL_FILLED'
+    assert sell_order(manager, 'ETH', '4')['status'] == 'MANUAL_CANCELED'
+    assert manager.sell_order_index == {'1': 'ADA', '5': 'ETH'}
+
+
+def test_next_sync_does_not_recheck_finished_orders(manager):
+    exchange = make_exchange()
+    manager.check_and_sync_with_exchange(exchange)
+    manager.check_and_sync_with_exchange(exchange)
+
+    assert exchange.calls['get_open_orders'] == 2
+    assert exchange.order_lookups == ['2', '3', '4']
+
+
+def test_index_is_rebuilt_from_storage_after_reload(manager):
+    manager.check_and_sync_with_exchange(make_exchange())
+
+    reloaded = PositionManager(storage=manager.storage)
+    assert reloaded.sell_order_index == {}
+    assert set(reloaded.positions) == {'ADA', 'XRP', 'ETH'}
+    assert reloaded.sell_order_index == {'1': 'ADA', '5': 'ETH'}
+
+
+def test_find_sell_order_drops_stale_index_entries(manager):
+    del manager.positions['ETH']
+
+    assert manager._find_sell_order('4') is None
+    assert '4' not in manager.sell_order_index
+    coin, _, order = manager._find_sell_order('1')
+    assert coin == 'ADA' and order['order_type'] == 'TAKE_PROFIT'
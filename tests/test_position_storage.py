@@ -0,0 +1,47 @@
+from position_storage import JsonPositionStorage, SqlitePositionStorage, create_position_storage
+
+
+def write_json_positions(tmp_path):
+    json_path = str(tmp_path / 'position_data.json')
+    JsonPositionStorage(json_path).save_all({'ADA': {
+        'symbol': 'ADA/JPY', 'total_quantity': 150, 'total_cost': 16800.0, 'average_price': 112.0,
+        'buy_orders': [{'quantity': 100, 'price': 110.5, 'timestamp': 't1', 'order_id': 'o1'},
+                       {'quantity': 50, 'price': 115.0, 'timestamp': 't2', 'order_id': 'o2'}],
+        'active_sell_orders': [{'order_id': '9', 'order_type': 'TAKE_PROFIT', 'status': 'ACTIVE', 'created_at': 't3'}],
+        'created_at': 't1', 'updated_at': 't2'
+    }})
+    return json_path
+
+
+def test_default_backend_is_json(tmp_path):
+    json_path = write_json_positions(tmp_path)
+    storage = create_position_storage(json_path=json_path, db_path=str(tmp_path / 'position_data.db'))
+    assert isinstance(storage, JsonPositionStorage)
+    assert not (tmp_path / 'position_data.db').exists()
+
+
+def test_sqlite_imports_existing_json_on_first_run(tmp_path):
+    json_path = write_json_positions(tmp_path)
+    db_path = str(tmp_path / 'position_data.db')
+
+    positions = create_position_storage('sqlite', json_path, db_path).load()
+    assert positions['ADA']['buy_orders'][1]['price'] == 115.0 and len(positions['ADA']['active_sell_orders']) == 1
+
+    # Lần chạy sau không nhập lại
+    assert SqlitePositionStorage(db_path).import_json(json_path) == 0
+
+
+def test_sqlite_keeps_closed_buy_orders_in_history(tmp_path):
+    storage = create_position_storage('sqlite', write_json_positions(tmp_path), str(tmp_path / 'position_data.db'))
+    positions = storage.load()
+
+    # Bán FIFO hết lô đầu: lô bị đóng nhưng vẫn còn trong lịch sử
+    positions['ADA']['buy_orders'] = positions['ADA']['buy_orders'][1:]
+    storage.save_position(positions, 'ADA')
+    assert len(storage.load()['ADA']['buy_orders']) == 1 and len(storage.buy_order_history('ADA')) == 2
+
+    for i in range(100):
+        order = {'quantity': 1, 'price': 100 + i, 'timestamp': 't', 'order_id': f"b{i}"}
+        positions['ADA']['buy_orders'].append(order)
+        storage.add_buy_order(positions, 'ADA', order)
+    assert len(storage.load()['ADA']['buy_orders']) == 101
@@ -0,0 +1,50 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('binance')
+
+import rate_limiter
+from rate_limiter import (PRIORITY_CRITICAL, PRIORITY_LOW, WeightRateLimiter, endpoint_priority,
+                          endpoint_weight)
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    # Giữ cố định cửa sổ 1 phút để weight không bị reset giữa chừng
+    monkeypatch.setattr(rate_limiter.WeightRateLimiter, '_current_window', staticmethod(lambda: 0))
+    return WeightRateLimiter(weight_limit=100, safety=1.0)
+
+
+def test_endpoint_weights_and_priorities():
+    assert endpoint_weight('GET', '/api/v3/depth', {'symbol': 'ETHJPY', 'limit': 20}) == 5
+    assert endpoint_weight('GET', '/api/v3/openOrders', {}) == 80
+    assert endpoint_weight('GET', '/api/v3/openOrders', {'symbol': 'ETHJPY'}) == 6
+    assert endpoint_priority('DELETE', '/api/v3/order') == PRIORITY_CRITICAL
+
+
+def test_critical_requests_bypass_waiting_scans(limiter):
+    limiter.update_from_response(FakeResponse(headers={'X-MBX-USED-WEIGHT-1M': '69'}))
+    limiter.acquire(1, PRIORITY_LOW)  # 70 <= 70% ngân sách
+
+    # Quét thị trường phải chờ, trong khi lệnh SL vẫn đi ngay
+    low_done = threading.Event()
+    threading.Thread(target=lambda: (limiter.acquire(2, PRIORITY_LOW), low_done.set()), daemon=True).start()
+    time.sleep(0.1)
+    started = time.perf_counter()
+    with limiter.priority(PRIORITY_CRITICAL):
+        limiter.acquire(1, limiter.current_priority(PRIORITY_LOW))
+    assert (time.perf_counter() - started) * 1000 < 50
+    assert not low_done.is_set()
+
+
+def test_429_blocks_requests(limiter):
+    limiter.update_from_response(FakeResponse(429, {'Retry-After': '1'}))
+    assert limiter.get_status()['blocked_for'] > 0 and limiter.stats['rate_limited'] == 1
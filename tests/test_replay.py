@@ -0,0 +1,65 @@
+import pytest
+
+from replay import ORDER_LIST_ID_START, ReplayMarketData, SimulatedExchange, SimulatedOrderError
+
+START = 1735689600000
+STEP = 30 * 60 * 1000
+
+
+def make_exchange(lows_highs):
+    """Sàn giả lập ETHJPY với nến 30m (low, high) cho sẵn, có 1 ETH để đặt OCO bán"""
+    klines = []
+    for i, (low, high) in enumerate(lows_highs):
+        open_time = START + i * STEP
+        close = (low + high) / 2
+        klines.append([open_time, str(close), str(high), str(low), str(close), '10',
+                       open_time + STEP - 1, '0', 0, '0', '0', '0'])
+    market_data = ReplayMarketData()
+    market_data.add_klines('ETHJPY', '30m', klines)
+    exchange = SimulatedExchange(market_data, initial_balances={'JPY': 100000, 'ETH': 1.0}, fee=0.0, slippage=0.0)
+    exchange.set_clock(START + STEP)
+    return exchange
+
+
+def place_oco(exchange):
+    return exchange.create_oco_order(symbol='ETHJPY', side='SELL', quantity=1.0,
+                                     price=110, stopPrice=90, stopLimitPrice=89)
+
+
+def test_order_list_id_is_separate_from_leg_order_ids():
+    exchange = make_exchange([(99, 101)] * 3)
+    first = place_oco(exchange)
+    leg_ids = {order['orderId'] for order in first['orders']}
+
+    assert first['orderListId'] == ORDER_LIST_ID_START
+    assert first['orderListId'] not in leg_ids
+    exchange.cancel_order(symbol='ETHJPY', orderId=min(leg_ids))
+    assert place_oco(exchange)['orderListId'] == ORDER_LIST_ID_START + 1
+
+
+def test_get_order_rejects_order_list_id():
+    exchange = make_exchange([(99, 101)] * 3)
+    oco = place_oco(exchange)
+
+    with pytest.raises(SimulatedOrderError):
+        exchange.get_order(symbol='ETHJPY', orderId=oco['orderListId'])
+    with pytest.raises(SimulatedOrderError):
+        exchange.v3_get_order_list(orderListId=oco['orders'][0]['orderId'])
+
+
+def test_order_list_reports_executed_leg():
+    exchange = make_exchange([(99, 101), (99, 101), (100, 112)])
+    oco = place_oco(exchange)
+
+    order_list = exchange.v3_get_order_list(orderListId=oco['orderListId'])
+    assert order_list['listOrderStatus'] == 'EXECUTING'
+    assert [leg['orderId'] for leg in order_list['orders']] == [leg['orderId'] for leg in oco['orders']]
+
+    exchange.advance_to(START + 3 * STEP)
+    order_list = exchange.v3_get_order_list(orderListId=oco['orderListId'])
+    assert order_list['listOrderStatus'] == 'ALL_DONE'
+    statuses = {leg['orderId']: exchange.get_order(symbol='ETHJPY', orderId=leg['orderId'])
+                for leg in order_list['orders']}
+    assert sorted((s['type'], s['status']) for s in statuses.values()) == [
+        ('LIMIT_MAKER', 'FILLED'), ('STOP_LOSS_LIMIT', 'CANCELED')
+    ]
@@ -0,0 +1,35 @@
+from stop_loss_engine import StopLossEngine
+
+
+def make_engine(count=10000):
+    fired = []
+    engine = StopLossEngine(lambda order_id, symbol, price: fired.append((order_id, price)))
+    for i in range(count):
+        engine.add_stop(f"o{i}", 'ETHJPY', 1000 - i * 0.01)
+    return engine, fired
+
+
+def test_tick_above_all_stops_fires_nothing():
+    engine, fired = make_engine()
+    assert engine.on_price('ETHJPY', 2000) == 0
+    assert fired == []
+
+
+def test_falling_price_fires_highest_stops_first_and_once():
+    engine, fired = make_engine()
+    assert engine.on_price('ETHJPY', 999.995) == 1 and fired[-1][0] == 'o0'
+    assert engine.on_price('ETHJPY', 999.5) == 50
+    assert engine.on_price('ETHJPY', 999.5) == 0
+    assert len(fired) == 51
+
+
+def test_remove_and_sync_rebuild_index():
+    engine, fired = make_engine()
+    engine.remove_stop('o100')
+    engine.sync({
+        'o200': {'symbol': 'ETHJPY', 'order_type': 'TAKE_PROFIT', 'stop_loss_price': 998},
+        'o300': {'symbol': 'ETHJPY', 'order_type': 'OCO (SL/TP)', 'stop_loss_price': 999}
+    })
+    assert engine.symbols() == ['ETHJPY']
+    assert engine.on_price('ETHJPY', 997) == 1 and fired == [('o200', 997)]
+    assert engine.get_latency_stats()
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from windowing import MinMaxTransform, sliding_windows
+
+
+@pytest.fixture
+def close():
+    rng = np.random.default_rng(42)
+    return 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 50)))
+
+
+def test_min_max_transform_round_trips(close):
+    transform = MinMaxTransform()
+    scaled = transform.fit_transform(close)
+    assert abs(scaled.min()) < 1e-12 and abs(scaled.max() - 1) < 1e-12
+    assert np.allclose(transform.inverse_transform(scaled), close)
+    assert np.allclose(transform.transform(close[-10:].reshape(-1, 1)).ravel(), scaled[-10:])
+
+
+def test_constant_input_maps_to_low():
+    assert np.all(MinMaxTransform().fit_transform(np.full(20, 5.0)) == 0)
+
+
+def test_matches_sklearn_min_max_scaler(close):
+    preprocessing = pytest.importorskip('sklearn.preprocessing')
+    reference = preprocessing.MinMaxScaler(feature_range=(0, 1)).fit_transform(close.reshape(-1, 1)).ravel()
+    assert np.allclose(reference, MinMaxTransform().fit_transform(close))
+
+
+def test_sliding_windows_match_loop_and_share_memory(close):
+    scaled = MinMaxTransform().fit_transform(close)
+    look_back = 10
+    X, y = sliding_windows(scaled, look_back)
+
+    # Cùng kết quả với vòng lặp cũ, X/y là view của scaled
+    X_loop = np.array([scaled[i - look_back:i] for i in range(look_back, len(scaled))])
+    y_loop = np.array([scaled[i] for i in range(look_back, len(scaled))])
+    assert np.array_equal(X, X_loop) and np.array_equal(y, y_loop)
+    assert np.shares_memory(X, scaled) and np.shares_memory(y, scaled)
+    assert sliding_windows(scaled[:look_back], look_back)[0].shape == (0, look_back)
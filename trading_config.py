@@ -42,7 +42,7 @@ TRADING_CONFIG = {
     'trading_fee': 0.001,  # 0.1% trading fee Binance
     
     # Stop Loss và Take Profit
-    'use_oco_orders': True,  # Sử dụng OCO orders (One-Cancels-Other)
+    'use_oco_orders': False,  # Sử dụng OCO orders (One-Cancels-Other) - theo dõi bằng orderListId
     'stop_loss_buffer': 0.005,  # 0.5% buffer cho stop loss
     'take_profit_buffer': 0.002,  # 0.2% buffer cho take profit
     
@@ -67,6 +67,10 @@ TRADING_CONFIG = {
     'max_log_size_mb': 50,  # Backup log khi vượt quá 50MB
     'cleanup_check_interval': 86400,  # Kiểm tra cleanup mỗi 24 giờ
     
+    # Lưu trữ position
+    'position_storage': 'json',  # 'json' (position_data.json) hoặc 'sqlite' (bảng có index, giữ lịch sử)
+    'position_db_file': 'position_data.db',  # Database SQLite - lần đầu tự nhập dữ liệu từ position_data.json
+    
     # System reliability và error handling
     'auto_restart_on_error': True,  # Tự động restart khi có lỗi hệ thống
     'max_error_retries': 3,  # Số lần thử lại tối đa
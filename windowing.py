@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Windowing - Cửa sổ trượt và chuẩn hoá min-max bằng NumPy cho dữ liệu dự đoán giá (thay MinMaxScaler của sklearn)
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class MinMaxTransform:
+    """Chuẩn hoá về [low, high] theo min/max lúc fit, đảo ngược được (cùng công thức với MinMaxScaler)"""
+
+    def __init__(self, feature_range=(0, 1)):
+        self.feature_range = feature_range
+        self.data_min = None
+        self.data_max = None
+        self.scale = None
+        self.offset = None
+
+    def fit(self, values):
+        values = np.asarray(values, dtype=float)
+        low, high = self.feature_range
+        self.data_min = float(np.nanmin(values))
+        self.data_max = float(np.nanmax(values))
+        data_range = self.data_max - self.data_min
+        # Dữ liệu không đổi: giữ scale 1 (mọi giá trị về low) thay vì chia cho 0
+        self.scale = (high - low) / data_range if data_range > 0 else 1.0
+        self.offset = low - self.data_min * self.scale
+        return self
+
+    def transform(self, values, out=None):
+        """values * scale + offset - out=values để biến đổi tại chỗ (mảng float)"""
+        values = np.asarray(values, dtype=float)
+        if out is None:
+            out = np.empty_like(values)
+        np.multiply(values, self.scale, out=out)
+        out += self.offset
+        return out
+
+    def fit_transform(self, values):
+        """Fit rồi biến đổi trên 1 bản sao float duy nhất"""
+        scaled = np.array(values, dtype=float)
+        self.fit(scaled)
+        return self.transform(scaled, out=scaled)
+
+    def inverse_transform(self, values):
+        values = np.asarray(values, dtype=float)
+        return (values - self.offset) / self.scale
+
+
+def sliding_windows(values, look_back):
+    """
+    Cửa sổ look_back phần tử liên tiếp và giá trị ngay sau mỗi cửa sổ - view trên values, không copy
+
+    Returns:
+        tuple: (X shape (n - look_back, look_back), y shape (n - look_back,))
+    """
+    values = np.asarray(values)
+    if len(values) <= look_back:
+        return values[:0].reshape(0, look_back), values[:0]
+    return sliding_window_view(values[:-1], look_back), values[look_back:]
+